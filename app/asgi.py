@@ -8,18 +8,41 @@ def create_app() -> "Litestar":
     from litestar.channels import ChannelsPlugin
     from litestar.channels.backends.memory import MemoryChannelsBackend
     from litestar.di import Provide
+    from litestar.exceptions import ImproperlyConfiguredException
     from litestar.openapi.config import OpenAPIConfig
     from litestar.openapi.plugins import (
         JsonRenderPlugin,
         ScalarRenderPlugin,
     )
 
-    from .config import sqlite
+    from .config import settings, sqlite
     from .domain.accounts.dependencies import provide_current_user
     from .domain.accounts.guards import auth
+    from .domain.chat.archive import message_archival_lifespan
+    from .domain.chat.autocomplete import search_autocomplete_lifespan
+    from .domain.chat.retention import deleted_messages_purge_lifespan
+    from .domain.chat.search import search_index_maintenance_lifespan
+    from .domain.chat.sync import conversation_events_compaction_lifespan
+    from .domain.chat.typing import typing_tracker_lifespan
+    from .domain.gateway.sessions import gateway_sessions_lifespan
+    from .lib.channels import SQLiteChannelsBackend
     from .server import routers
+    from .server.idempotency import idempotency_keys_lifespan
     from .server.plugins import MigratorCLIPlugin
     from .server.plugins.database import SQLitePoolPlugin
+    from .server.responses import NegotiatedResponse
+
+    match settings.app.CHANNELS_BACKEND:
+        case "memory":
+            channels_backend = MemoryChannelsBackend()
+        case "sqlite":
+            channels_backend = SQLiteChannelsBackend(
+                settings.app.CHANNELS_DATABASE_PATH
+            )
+        case backend:
+            raise ImproperlyConfiguredException(
+                f"Unknown channels backend {backend!r}, expected memory or sqlite"
+            )
 
     pyproject = tomllib.loads(
         (Path(__file__).parent.parent / "pyproject.toml").read_text()
@@ -31,6 +54,17 @@ def create_app() -> "Litestar":
             "current_user": Provide(provide_current_user, sync_to_thread=False),
         },
         on_app_init=[auth.on_app_init],
+        response_class=NegotiatedResponse,
+        lifespan=[
+            gateway_sessions_lifespan,
+            typing_tracker_lifespan,
+            conversation_events_compaction_lifespan,
+            search_index_maintenance_lifespan,
+            search_autocomplete_lifespan,
+            deleted_messages_purge_lifespan,
+            message_archival_lifespan,
+            idempotency_keys_lifespan,
+        ],
         openapi_config=OpenAPIConfig(
             title=pyproject["project"]["name"],  # pyright: ignore[reportAny]
             version=pyproject["project"]["version"],  # pyright: ignore[reportAny]
@@ -42,7 +76,7 @@ def create_app() -> "Litestar":
         ),
         plugins=[
             ChannelsPlugin(
-                MemoryChannelsBackend(),
+                channels_backend,
                 arbitrary_channels_allowed=True,  # each user will have their own channel
             ),
             MigratorCLIPlugin(),
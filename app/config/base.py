@@ -19,6 +19,109 @@ class AppSettings:
     OPENROUTER_API_KEY: str | None = field(
         default_factory=lambda: os.environ.get("OPENROUTER_API_KEY")
     )
+    METRICS_TOKEN: str | None = field(
+        default_factory=lambda: os.environ.get("METRICS_TOKEN")
+    )
+    CHANNELS_BACKEND: str = field(
+        default_factory=lambda: os.environ.get("CHANNELS_BACKEND", "memory")
+    )
+    CHANNELS_DATABASE_PATH: str = field(
+        default_factory=lambda: os.environ.get(
+            "CHANNELS_DATABASE_PATH", "data/channels.sqlite3"
+        )
+    )
+    GATEWAY_REPLAY_BUFFER_SIZE: int = field(
+        default_factory=lambda: int(os.environ.get("GATEWAY_REPLAY_BUFFER_SIZE", "500"))
+    )
+    GATEWAY_RESUME_TIMEOUT: float = field(
+        default_factory=lambda: float(os.environ.get("GATEWAY_RESUME_TIMEOUT", "120"))
+    )
+    GATEWAY_SEND_QUEUE_SIZE: int = field(
+        default_factory=lambda: int(os.environ.get("GATEWAY_SEND_QUEUE_SIZE", "256"))
+    )
+    GATEWAY_HEARTBEAT_INTERVAL: float = field(
+        default_factory=lambda: float(
+            os.environ.get("GATEWAY_HEARTBEAT_INTERVAL", "30")
+        )
+    )
+    GATEWAY_IDLE_TIMEOUT: float = field(
+        default_factory=lambda: float(os.environ.get("GATEWAY_IDLE_TIMEOUT", "75"))
+    )
+    GATEWAY_WRITER_WORKERS: int = field(
+        default_factory=lambda: int(os.environ.get("GATEWAY_WRITER_WORKERS", "32"))
+    )
+    GATEWAY_SEND_TIMEOUT: float = field(
+        default_factory=lambda: float(os.environ.get("GATEWAY_SEND_TIMEOUT", "10"))
+    )
+    TYPING_DEBOUNCE_INTERVAL: float = field(
+        default_factory=lambda: float(os.environ.get("TYPING_DEBOUNCE_INTERVAL", "8"))
+    )
+    PRESENCE_OFFLINE_DELAY: float = field(
+        default_factory=lambda: float(os.environ.get("PRESENCE_OFFLINE_DELAY", "15"))
+    )
+    PRESENCE_BATCH_INTERVAL: float = field(
+        default_factory=lambda: float(os.environ.get("PRESENCE_BATCH_INTERVAL", "1"))
+    )
+    CONVERSATION_EVENTS_RETENTION_DAYS: float = field(
+        default_factory=lambda: float(
+            os.environ.get("CONVERSATION_EVENTS_RETENTION_DAYS", "30")
+        )
+    )
+    CONVERSATION_EVENTS_COMPACTION_INTERVAL: float = field(
+        default_factory=lambda: float(
+            os.environ.get("CONVERSATION_EVENTS_COMPACTION_INTERVAL", "3600")
+        )
+    )
+    DELETED_MESSAGES_RETENTION_DAYS: float = field(
+        default_factory=lambda: float(
+            os.environ.get("DELETED_MESSAGES_RETENTION_DAYS", "7")
+        )
+    )
+    DELETED_MESSAGES_PURGE_INTERVAL: float = field(
+        default_factory=lambda: float(
+            os.environ.get("DELETED_MESSAGES_PURGE_INTERVAL", "3600")
+        )
+    )
+    IDEMPOTENCY_KEY_TTL_HOURS: float = field(
+        default_factory=lambda: float(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+    )
+    IDEMPOTENCY_CACHE_SIZE: int = field(
+        default_factory=lambda: int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", "1000"))
+    )
+    IDEMPOTENCY_KEYS_PURGE_INTERVAL: float = field(
+        default_factory=lambda: float(
+            os.environ.get("IDEMPOTENCY_KEYS_PURGE_INTERVAL", "3600")
+        )
+    )
+    MESSAGE_ARCHIVE_PATH: str = field(
+        default_factory=lambda: os.environ.get("MESSAGE_ARCHIVE_PATH", "data/archive")
+    )
+    MESSAGE_ARCHIVE_AFTER_DAYS: float = field(
+        default_factory=lambda: float(
+            os.environ.get("MESSAGE_ARCHIVE_AFTER_DAYS", "180")
+        )
+    )
+    MESSAGE_ARCHIVE_INTERVAL: float = field(
+        default_factory=lambda: float(
+            os.environ.get("MESSAGE_ARCHIVE_INTERVAL", "86400")
+        )
+    )
+    SEARCH_INDEX_MAINTENANCE_INTERVAL: float = field(
+        default_factory=lambda: float(
+            os.environ.get("SEARCH_INDEX_MAINTENANCE_INTERVAL", "600")
+        )
+    )
+    SEARCH_INDEX_IDLE_TIME: float = field(
+        default_factory=lambda: float(os.environ.get("SEARCH_INDEX_IDLE_TIME", "60"))
+    )
+    SEARCH_INDEX_MERGE_PAGES: int = field(
+        default_factory=lambda: int(os.environ.get("SEARCH_INDEX_MERGE_PAGES", "16"))
+    )
+    SEARCH_AUTOCOMPLETE_CONVERSATIONS: int = field(
+        default_factory=lambda: int(
+            os.environ.get("SEARCH_AUTOCOMPLETE_CONVERSATIONS", "1000")
+        )
+    )
 
 
 @dataclass
@@ -1,4 +1,3 @@
-from contextlib import AbstractAsyncContextManager
 from datetime import datetime
 from typing import TYPE_CHECKING
 
@@ -62,26 +61,51 @@ class TokenDenylistQueries(aiosql.queries.Queries):
         self, connection: "aiosqlite.Connection", *, token: str
     ) -> None: ...
 
+class IdempotencyKeyQueries(aiosql.queries.Queries):
+    async def get(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        user_id: int,
+        method: str,
+        path: str,
+        key: str,
+        after: datetime,
+    ) -> "aiosqlite.Row | None": ...
+    async def insert(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        user_id: int,
+        method: str,
+        path: str,
+        key: str,
+        request_hash: bytes,
+        status_code: int,
+        content_type: str | None,
+        body: bytes,
+        created_at: datetime,
+    ) -> int: ...
+    async def delete_before(
+        self, connection: "aiosqlite.Connection", *, before: datetime, limit: int
+    ) -> int: ...
+
 class ChatQueries(aiosql.queries.Queries):
     async def get_conversation(
         self, connection: "aiosqlite.Connection", *, conversation_id: int, user_id: int
     ) -> "aiosqlite.Row | None": ...
+    async def get_conversation_event_seq(
+        self, connection: "aiosqlite.Connection", *, conversation_id: int, user_id: int
+    ) -> int | None: ...
     async def get_conversations_by_user(
         self,
         connection: "aiosqlite.Connection",
         *,
         user_id: int,
+        before_activity_at: datetime | None,
+        before_id: int | None,
         limit: int,
-        offset: int,
     ) -> list["aiosqlite.Row"]: ...
-    def get_conversations_by_user_cursor(
-        self,
-        connection: "aiosqlite.Connection",
-        *,
-        user_id: int,
-        limit: int,
-        offset: int,
-    ) -> AbstractAsyncContextManager["aiosqlite.Cursor"]: ...
     async def get_direct_conversation_with_recipient(
         self,
         connection: "aiosqlite.Connection",
@@ -97,6 +121,33 @@ class ChatQueries(aiosql.queries.Queries):
         name: str | None,
         description: str | None,
     ) -> "aiosqlite.Row": ...
+    async def get_conversation_summaries_by_user(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        user_id: int,
+    ) -> list["aiosqlite.Row"]: ...
+    async def update_conversation_last_message(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_id: int,
+        message_id: int,
+    ) -> int: ...
+    async def reset_conversation_last_message(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        message_id: int,
+    ) -> None: ...
+    async def insert_direct_conversation(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_id: int,
+        user_id: int,
+        recipient_id: int,
+    ) -> "aiosqlite.Row | None": ...
     async def delete_conversation(
         self,
         connection: "aiosqlite.Connection",
@@ -122,6 +173,34 @@ class ChatQueries(aiosql.queries.Queries):
         added_by_user_id: int,
         role: str,
     ) -> int: ...
+    async def update_conversation_participant_last_read_message(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_id: int,
+        user_id: int,
+        message_id: int,
+        created_at: datetime,
+    ) -> int: ...
+    async def update_conversation_participant_unread_count(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_id: int,
+        user_id: int,
+    ) -> int | None: ...
+    async def increment_conversation_participant_unread_counts(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        message_id: int,
+    ) -> None: ...
+    async def decrement_conversation_participant_unread_counts(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        message_id: int,
+    ) -> None: ...
     async def delete_conversation_participant(
         self,
         connection: "aiosqlite.Connection",
@@ -135,6 +214,18 @@ class ChatQueries(aiosql.queries.Queries):
         *,
         user_id: int,
     ) -> list["aiosqlite.Row"]: ...
+    async def get_conversation_participants_in_user_conversations(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        user_id: int,
+    ) -> list["aiosqlite.Row"]: ...
+    async def get_conversation_participants_by_conversations(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_ids: str,
+    ) -> list["aiosqlite.Row"]: ...
     async def get_attachment_content(
         self,
         connection: "aiosqlite.Connection",
@@ -143,22 +234,38 @@ class ChatQueries(aiosql.queries.Queries):
         message_id: int,
         attachment_id: int,
     ) -> bytes | None: ...
-    async def insert_attachment(
+    async def insert_attachments(
         self,
         connection: "aiosqlite.Connection",
-        *,
-        message_id: int,
-        filename: str,
-        content_type: str,
-        file_size: int,
-        content: bytes,
-    ) -> "aiosqlite.Row": ...
+        parameters: list[dict[str, object]],
+    ) -> None: ...
+    async def get_attachments_by_message(
+        self, connection: "aiosqlite.Connection", *, message_id: int
+    ) -> list["aiosqlite.Row"]: ...
     async def get_message(
         self,
         connection: "aiosqlite.Connection",
         *,
         id: int,
     ) -> list["aiosqlite.Row"]: ...
+    async def get_last_messages_by_user(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        user_id: int,
+    ) -> list["aiosqlite.Row"]: ...
+    async def get_last_messages_by_conversations(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_ids: str,
+    ) -> list["aiosqlite.Row"]: ...
+    async def get_messages_by_ids(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        message_ids: str,
+    ) -> list["aiosqlite.Row"]: ...
     async def get_messages_before(
         self,
         connection: "aiosqlite.Connection",
@@ -191,7 +298,7 @@ class ChatQueries(aiosql.queries.Queries):
         reply_to_id: int | None,
         user_id: int,
         content: str | None,
-    ) -> "aiosqlite.Row": ...
+    ) -> "aiosqlite.Row | None": ...
     async def delete_message(
         self,
         connection: "aiosqlite.Connection",
@@ -204,16 +311,121 @@ class ChatQueries(aiosql.queries.Queries):
         *,
         conversation_id: int,
         query: str,
+        before_id: int | None,
         limit: int,
-        offset: int,
     ) -> list["aiosqlite.Row"]: ...
-    async def count_messages_matching_query(
+    async def count_message_search_matches(
         self,
         connection: "aiosqlite.Connection",
         *,
         conversation_id: int,
         query: str,
     ) -> int: ...
+    async def search_messages_by_user(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        user_id: int,
+        query: str,
+        before_id: int | None,
+        limit: int,
+    ) -> list["aiosqlite.Row"]: ...
+    async def search_messages_in_conversations(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_ids: str,
+        query: str,
+        before_id: int | None,
+        limit: int,
+    ) -> list["aiosqlite.Row"]: ...
+    async def get_latest_message_created_at(
+        self, connection: "aiosqlite.Connection"
+    ) -> datetime | None: ...
+    async def merge_message_search_index(
+        self, connection: "aiosqlite.Connection", *, pages: int
+    ) -> None: ...
+    async def get_message_search_terms(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_id: int,
+        prefix: str,
+        prefix_end: str,
+    ) -> list["aiosqlite.Row"]: ...
+    async def get_expired_deleted_messages(
+        self, connection: "aiosqlite.Connection", *, before: datetime, limit: int
+    ) -> list["aiosqlite.Row"]: ...
+    async def delete_message_attachments_by_messages(
+        self, connection: "aiosqlite.Connection", *, message_ids: str
+    ) -> int: ...
+    async def purge_messages(
+        self, connection: "aiosqlite.Connection", *, message_ids: str
+    ) -> int: ...
+    async def redact_messages(
+        self, connection: "aiosqlite.Connection", *, message_ids: str
+    ) -> int: ...
+    async def increment_conversation_event_seq(
+        self, connection: "aiosqlite.Connection", *, conversation_id: int
+    ) -> int: ...
+    async def insert_conversation_event(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_id: int,
+        seq: int,
+        type: str,
+        data: str,
+    ) -> int: ...
+    async def get_conversation_event_ranges_by_user(
+        self, connection: "aiosqlite.Connection", *, user_id: int
+    ) -> list["aiosqlite.Row"]: ...
+    async def get_conversation_events_since(
+        self, connection: "aiosqlite.Connection", *, positions: str, limit: int
+    ) -> list["aiosqlite.Row"]: ...
+    async def delete_conversation_events_before(
+        self, connection: "aiosqlite.Connection", *, before: datetime, limit: int
+    ) -> int: ...
+    async def create_message_archive(
+        self, connection: "aiosqlite.Connection"
+    ) -> None: ...
+    async def get_archivable_messages(
+        self, connection: "aiosqlite.Connection", *, before: datetime, limit: int
+    ) -> list["aiosqlite.Row"]: ...
+    async def copy_messages_to_archive(
+        self, connection: "aiosqlite.Connection", *, message_ids: str
+    ) -> int: ...
+    async def copy_message_attachments_to_archive(
+        self, connection: "aiosqlite.Connection", *, message_ids: str
+    ) -> int: ...
+    async def upsert_message_archive(
+        self, connection: "aiosqlite.Connection", *, period: str, message_ids: str
+    ) -> int: ...
+    async def upsert_message_archive_conversations(
+        self, connection: "aiosqlite.Connection", *, period: str, message_ids: str
+    ) -> int: ...
+    async def get_message_archive_periods_by_conversation(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_id: int,
+        before: float | None,
+        after: float | None,
+    ) -> list["aiosqlite.Row"]: ...
+    async def get_message_archive_periods_by_message(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        conversation_id: int,
+        message_id: int,
+    ) -> list["aiosqlite.Row"]: ...
+    async def get_message_archive_conversations_by_user(
+        self,
+        connection: "aiosqlite.Connection",
+        *,
+        user_id: int,
+        before_id: int | None,
+    ) -> list["aiosqlite.Row"]: ...
 
 class QuizQueries(aiosql.queries.Queries):
     async def insert_quiz(
@@ -325,6 +537,7 @@ class Queries(aiosql.queries.Queries):
     user: UserQueries
     oauth2_account: OAuth2AccountQueries
     token_denylist: TokenDenylistQueries
+    idempotency_keys: IdempotencyKeyQueries
     chat: ChatQueries
     quiz: QuizQueries
     tasks: TasksQueries
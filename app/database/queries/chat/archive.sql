@@ -0,0 +1,139 @@
+-- name: create_message_archive#
+-- Create the tables of the archive database attached as `archive`, unless it has them
+-- already. Archived messages are read-only, so only inserts need to be indexed.
+CREATE TABLE IF NOT EXISTS archive.messages (
+    id INTEGER PRIMARY KEY,
+    conversation_id INTEGER NOT NULL,
+    reply_to_id INTEGER,
+    user_id INTEGER NOT NULL,
+    content TEXT,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    edited_at TIMESTAMP,
+    deleted_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS archive.idx_messages_conversation_created
+ON messages (conversation_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS archive.message_attachments (
+    id INTEGER PRIMARY KEY,
+    message_id INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    content BLOB NOT NULL,
+    created_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS archive.idx_message_attachments_message
+ON message_attachments (message_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS archive.message_search_index USING fts5(
+    content,
+    content=messages,
+    content_rowid=id,
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS archive.create_message_in_index
+AFTER INSERT ON messages
+BEGIN
+    INSERT INTO message_search_index (rowid, content) VALUES (NEW.id, NEW.content);
+END;
+
+-- name: get_archivable_messages(before, limit)
+-- Get up to `limit` messages sent before `before`, oldest first, with the month they
+-- were sent in. Conversations' last messages stay, and so do messages that newer ones
+-- reply to, so that nothing left behind points into an archive.
+SELECT m.id, strftime('%Y-%m', m.created_at) AS period
+FROM messages m
+WHERE
+    m.created_at < :before
+    AND m.deleted_at IS NULL
+    AND m.id NOT IN (
+        SELECT last_message_id FROM conversations WHERE last_message_id IS NOT NULL
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM messages r WHERE r.reply_to_id = m.id AND r.created_at >= :before
+    )
+ORDER BY m.id
+LIMIT :limit;
+
+-- name: copy_messages_to_archive(message_ids)!
+-- Copy the messages given as a JSON array of IDs into the archive database attached as
+-- `archive`. Messages copied before are skipped.
+INSERT OR IGNORE INTO archive.messages (
+    id, conversation_id, reply_to_id, user_id, content, created_at, updated_at, edited_at, deleted_at
+)
+SELECT id, conversation_id, reply_to_id, user_id, content, created_at, updated_at, edited_at, deleted_at
+FROM main.messages
+WHERE id IN (SELECT value FROM json_each(:message_ids));
+
+-- name: copy_message_attachments_to_archive(message_ids)!
+-- Copy the attachments of the messages given as a JSON array of IDs into the archive
+-- database attached as `archive`. Attachments copied before are skipped.
+INSERT OR IGNORE INTO archive.message_attachments (
+    id, message_id, filename, content_type, file_size, content, created_at
+)
+SELECT id, message_id, filename, content_type, file_size, content, created_at
+FROM main.message_attachments
+WHERE message_id IN (SELECT value FROM json_each(:message_ids));
+
+-- name: upsert_message_archive(period, message_ids)!
+-- Record that the messages given as a JSON array of IDs were archived in `period`.
+INSERT INTO message_archives (period, first_message_id, last_message_id)
+SELECT :period, MIN(value), MAX(value)
+FROM json_each(:message_ids)
+WHERE true
+ON CONFLICT (period) DO UPDATE SET
+    first_message_id = MIN(first_message_id, excluded.first_message_id),
+    last_message_id = MAX(last_message_id, excluded.last_message_id),
+    updated_at = CURRENT_TIMESTAMP;
+
+-- name: upsert_message_archive_conversations(period, message_ids)!
+-- Record the range of messages each conversation has in the archive of `period`, from
+-- the messages given as a JSON array of IDs, before they're deleted.
+INSERT INTO message_archive_conversations (
+    conversation_id, period, first_message_id, last_message_id, first_created_at, last_created_at
+)
+SELECT conversation_id, :period, MIN(id), MAX(id), MIN(created_at), MAX(created_at)
+FROM main.messages
+WHERE id IN (SELECT value FROM json_each(:message_ids))
+GROUP BY conversation_id
+ON CONFLICT (conversation_id, period) DO UPDATE SET
+    first_message_id = MIN(first_message_id, excluded.first_message_id),
+    last_message_id = MAX(last_message_id, excluded.last_message_id),
+    first_created_at = MIN(first_created_at, excluded.first_created_at),
+    last_created_at = MAX(last_created_at, excluded.last_created_at);
+
+-- name: get_message_archive_periods_by_conversation(conversation_id, before, after)
+-- Get the months whose archive has messages of the conversation sent no later than
+-- `before` and no earlier than `after`, as unix timestamps, if given, latest first.
+SELECT period
+FROM message_archive_conversations
+WHERE
+    conversation_id = :conversation_id
+    AND (:before IS NULL OR unixepoch(first_created_at) <= :before)
+    AND (:after IS NULL OR unixepoch(last_created_at) >= :after)
+ORDER BY period DESC;
+
+-- name: get_message_archive_periods_by_message(conversation_id, message_id)
+-- Get the months whose archive may have the conversation's message, latest first.
+SELECT period
+FROM message_archive_conversations
+WHERE
+    conversation_id = :conversation_id
+    AND :message_id BETWEEN first_message_id AND last_message_id
+ORDER BY period DESC;
+
+-- name: get_message_archive_conversations_by_user(user_id, before_id)
+-- Get the conversations that the user is a participant of with messages before
+-- before_id, if given, in each month's archive, latest first.
+SELECT a.period, a.conversation_id
+FROM conversation_participants p
+JOIN message_archive_conversations a ON a.conversation_id = p.conversation_id
+WHERE
+    p.user_id = :user_id
+    AND (:before_id IS NULL OR a.first_message_id < :before_id)
+ORDER BY a.period DESC;
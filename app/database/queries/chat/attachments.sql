@@ -5,8 +5,14 @@ FROM message_attachments ma
 JOIN messages m ON ma.message_id = m.id
 WHERE m.conversation_id = :conversation_id AND ma.message_id = :message_id AND ma.id = :attachment_id;
 
--- name: insert_attachment(message_id, filename, content_type, file_size, content)^
--- Insert an attachment
+-- name: insert_attachments*!
+-- Insert attachments, all in one go.
 INSERT INTO message_attachments (message_id, filename, content_type, file_size, content)
-VALUES (:message_id, :filename, :content_type, :file_size, :content)
-RETURNING id, message_id, filename, content_type, file_size;
+VALUES (:message_id, :filename, :content_type, :file_size, :content);
+
+-- name: get_attachments_by_message(message_id)
+-- Get the message's attachments, without their content.
+SELECT id, filename, content_type, file_size
+FROM message_attachments
+WHERE message_id = :message_id
+ORDER BY id;
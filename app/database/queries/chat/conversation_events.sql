@@ -0,0 +1,51 @@
+-- name: increment_conversation_event_seq(conversation_id)$
+-- Reserve the next sequence number in the conversation's event log.
+UPDATE conversations
+SET event_seq = event_seq + 1
+WHERE id = :conversation_id
+RETURNING event_seq;
+
+-- name: insert_conversation_event(conversation_id, seq, type, data)!
+-- Append an event to the conversation's event log.
+INSERT INTO conversation_events (conversation_id, seq, type, data)
+VALUES (:conversation_id, :seq, :type, :data);
+
+-- name: get_conversation_event_ranges_by_user(user_id)
+-- Get the latest sequence number of every conversation that the user is a participant
+-- of, and the oldest one that has not been compacted away yet.
+SELECT
+    c.id AS conversation_id,
+    c.event_seq AS last_seq,
+    (
+        SELECT MIN(e.seq)
+        FROM conversation_events e
+        WHERE e.conversation_id = c.id
+    ) AS first_seq
+FROM conversations c
+JOIN conversation_participants p ON c.id = p.conversation_id
+WHERE p.user_id = :user_id;
+
+-- name: get_conversation_events_since(positions, limit)
+-- Get the events after the given positions, a JSON array of [conversation_id, seq]
+-- pairs.
+WITH positions AS (
+    SELECT
+        json_extract(value, '$[0]') AS conversation_id,
+        json_extract(value, '$[1]') AS seq
+    FROM json_each(:positions)
+)
+SELECT e.*
+FROM positions pos
+JOIN conversation_events e ON e.conversation_id = pos.conversation_id AND e.seq > pos.seq
+ORDER BY e.conversation_id, e.seq
+LIMIT :limit;
+
+-- name: delete_conversation_events_before(before, limit)!
+-- Compact away up to `limit` events older than `before`.
+DELETE FROM conversation_events
+WHERE (conversation_id, seq) IN (
+    SELECT conversation_id, seq
+    FROM conversation_events
+    WHERE created_at < :before
+    LIMIT :limit
+);
@@ -29,9 +29,71 @@ JOIN users u ON p.user_id = u.id
 WHERE p.conversation_id = :conversation_id AND p.user_id = :user_id;
 
 -- name: insert_conversation_participant(conversation_id, user_id, added_by_user_id, role)!
--- Insert a conversation participant.
-INSERT INTO conversation_participants (conversation_id, user_id, added_by_user_id, role)
-VALUES (:conversation_id, :user_id, :added_by_user_id, :role);
+-- Insert a conversation participant, who has read everything sent before they joined.
+-- Message IDs only grow, so the newest message of all is as good a read marker as the
+-- newest one in the conversation, and cheaper to find.
+INSERT INTO conversation_participants (
+    conversation_id, user_id, added_by_user_id, role, last_read_message_id, last_activity_at
+)
+VALUES (
+    :conversation_id,
+    :user_id,
+    :added_by_user_id,
+    :role,
+    (SELECT COALESCE(MAX(id), 0) FROM messages),
+    (SELECT last_activity_at FROM conversations WHERE id = :conversation_id)
+);
+
+-- name: update_conversation_participant_last_read_message(conversation_id, user_id, message_id, created_at)!
+-- Move a participant's read marker up to a message sent at `created_at`. Read markers
+-- never move backwards.
+UPDATE conversation_participants
+SET last_read_message_id = :message_id, read_at = :created_at
+WHERE
+    conversation_id = :conversation_id
+    AND user_id = :user_id
+    AND last_read_message_id < :message_id;
+
+-- name: update_conversation_participant_unread_count(conversation_id, user_id)$
+-- Recount the messages from other participants after the participant's read marker.
+-- read_at is when the last read message was sent, so that only the messages sent since
+-- are looked at, and the ID tells apart the ones sent in the same second.
+UPDATE conversation_participants AS p
+SET unread_count = (
+    SELECT COUNT(*)
+    FROM messages m
+    WHERE
+        m.conversation_id = p.conversation_id
+        AND m.created_at >= p.read_at
+        AND m.id > p.last_read_message_id
+        AND m.user_id != p.user_id
+        AND m.deleted_at IS NULL
+)
+WHERE p.conversation_id = :conversation_id AND p.user_id = :user_id
+RETURNING unread_count;
+
+-- name: increment_conversation_participant_unread_counts(message_id)!
+-- Count a new message as unread for every other participant who hasn't read past it.
+UPDATE conversation_participants AS p
+SET unread_count = p.unread_count + 1
+FROM messages m
+WHERE
+    m.id = :message_id
+    AND p.conversation_id = m.conversation_id
+    AND p.user_id != m.user_id
+    AND p.last_read_message_id < m.id;
+
+-- name: decrement_conversation_participant_unread_counts(message_id)!
+-- Stop counting a message that is about to be deleted as unread.
+UPDATE conversation_participants AS p
+SET unread_count = MAX(p.unread_count - 1, 0)
+FROM messages m
+WHERE
+    m.id = :message_id
+    AND m.deleted_at IS NULL
+    AND p.conversation_id = m.conversation_id
+    AND p.user_id != m.user_id
+    AND p.last_read_message_id < m.id;
 
 -- name: delete_conversation_participant(conversation_id, user_id)!
 DELETE FROM conversation_participants
@@ -51,3 +113,35 @@ SELECT
 FROM conversation_participants p
 JOIN users u ON p.user_id = u.id
 WHERE p.user_id = :user_id;
+
+-- name: get_conversation_participants_in_user_conversations(user_id)
+-- Get the participants of every conversation that the user is a participant of.
+SELECT
+    p.conversation_id AS participant_conversation_id,
+    p.role AS participant_role,
+    p.read_at AS participant_read_at,
+    p.created_at AS participant_created_at,
+    u.id AS user_id,
+    u.name AS user_name,
+    u.created_at AS user_created_at,
+    u.updated_at AS user_updated_at
+FROM conversation_participants p
+JOIN users u ON p.user_id = u.id
+WHERE p.conversation_id IN (
+    SELECT conversation_id FROM conversation_participants WHERE user_id = :user_id
+);
+
+-- name: get_conversation_participants_by_conversations(conversation_ids)
+-- Get the participants of every conversation in the JSON array of conversation_ids.
+SELECT
+    p.conversation_id AS participant_conversation_id,
+    p.role AS participant_role,
+    p.read_at AS participant_read_at,
+    p.created_at AS participant_created_at,
+    u.id AS user_id,
+    u.name AS user_name,
+    u.created_at AS user_created_at,
+    u.updated_at AS user_updated_at
+FROM conversation_participants p
+JOIN users u ON p.user_id = u.id
+WHERE p.conversation_id IN (SELECT value FROM json_each(:conversation_ids));
@@ -5,34 +5,92 @@ FROM conversations c
 JOIN conversation_participants p ON c.id = p.conversation_id
 WHERE id = :conversation_id AND p.user_id = :user_id;
 
--- name: get_conversations_by_user(user_id, limit, offset)
--- Get all conversations that the user is a participant of.
-SELECT c.*
-FROM conversations c
-JOIN conversation_participants p ON c.id = p.conversation_id
-WHERE p.user_id = :user_id
-ORDER BY c.updated_at DESC, c.id
-LIMIT :limit
-OFFSET :offset;
+-- name: get_conversations_by_user(user_id, before_activity_at, before_id, limit)
+-- Get a page of the conversations that the user is a participant of, most recently
+-- active first, continuing after (before_activity_at, before_id) if given. Includes the
+-- number of messages from other participants that the user has not read yet.
+SELECT
+    c.*,
+    p.unread_count
+FROM conversation_participants p
+JOIN conversations c ON c.id = p.conversation_id
+WHERE
+    p.user_id = :user_id
+    AND (
+        :before_id IS NULL
+        OR (p.last_activity_at, p.conversation_id) < (:before_activity_at, :before_id)
+    )
+ORDER BY p.last_activity_at DESC, p.conversation_id DESC
+LIMIT :limit;
 
 -- name: get_direct_conversation_with_recipient(user_id, recipient_id)^
 -- Get the direct conversation between two users.
 SELECT c.*
-FROM conversations c
-JOIN conversation_participants p1 ON c.id = p1.conversation_id AND p1.user_id = :user_id
-JOIN conversation_participants p2 ON c.id = p2.conversation_id AND p2.user_id = :recipient_id
-WHERE c.type = 'direct'
-ORDER BY c.updated_at DESC, c.id
-LIMIT 1;
+FROM direct_conversations d
+JOIN conversations c ON c.id = d.conversation_id
+WHERE
+    d.user_low = MIN(:user_id, :recipient_id)
+    AND d.user_high = MAX(:user_id, :recipient_id);
 
 -- name: insert_conversation(type, name, description)^
 -- Insert a conversation.
-INSERT INTO conversations (type, name, description)
-VALUES (:type, :name, :description)
+INSERT INTO conversations (type, name, description, last_activity_at)
+VALUES (:type, :name, :description, CURRENT_TIMESTAMP)
 RETURNING *;
 
+-- name: insert_direct_conversation(conversation_id, user_id, recipient_id)^
+-- Make a conversation the direct conversation between two users. Returns nothing if
+-- they already have one.
+INSERT INTO direct_conversations (user_low, user_high, conversation_id)
+VALUES (MIN(:user_id, :recipient_id), MAX(:user_id, :recipient_id), :conversation_id)
+ON CONFLICT DO NOTHING
+RETURNING conversation_id;
+
 -- name: delete_conversation(conversation_id)^
 -- Delete a conversation.
 DELETE FROM conversations
 WHERE id = :conversation_id
 RETURNING *;
+
+-- name: get_conversation_summaries_by_user(user_id)
+-- Get all conversations that the user is a participant of, with the number of messages
+-- from other participants that the user has not read yet.
+SELECT
+    c.*,
+    p.unread_count
+FROM conversation_participants p
+JOIN conversations c ON c.id = p.conversation_id
+WHERE p.user_id = :user_id
+ORDER BY p.last_activity_at DESC, p.conversation_id DESC;
+
+-- name: update_conversation_last_message(conversation_id, message_id)$
+-- Point the conversation at its newest message, which is also when it was last active,
+-- and reserve the sequence number of the message's event in the conversation's log.
+UPDATE conversations
+SET
+    last_message_id = :message_id,
+    last_activity_at = (SELECT created_at FROM messages WHERE id = :message_id),
+    event_seq = event_seq + 1
+WHERE id = :conversation_id
+RETURNING event_seq;
+
+-- name: reset_conversation_last_message(message_id)!
+-- Point the conversation whose newest message was message_id at its newest message that
+-- was not deleted, without changing when it was last active.
+UPDATE conversations
+SET last_message_id = (
+    SELECT id
+    FROM messages
+    WHERE conversation_id = conversations.id AND deleted_at IS NULL
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+)
+WHERE last_message_id = :message_id;
+
+-- name: get_conversation_event_seq(conversation_id, user_id)$
+-- Get the latest sequence number in the conversation's event log, if the user is a
+-- participant.
+SELECT c.event_seq
+FROM conversations c
+JOIN conversation_participants p ON p.conversation_id = c.id AND p.user_id = :user_id
+WHERE c.id = :conversation_id;
@@ -61,6 +61,53 @@ LIMIT :limit;
 
 -- name: get_messages_around(conversation_id, around, limit)
 -- Get messages around the specified date.
+SELECT * FROM (
+    SELECT
+        m.id AS message_id,
+        m.conversation_id AS message_conversation_id,
+        m.reply_to_id AS message_reply_to_id,
+        m.user_id AS message_user_id,
+        m.content AS message_content,
+        m.created_at AS message_created_at,
+        m.updated_at AS message_updated_at,
+        m.edited_at AS message_edited_at,
+        ma.id AS message_attachment_id,
+        ma.filename AS message_attachment_filename,
+        ma.content_type AS message_attachment_content_type,
+        ma.file_size AS message_attachment_file_size
+    FROM messages m
+    LEFT JOIN message_attachments ma ON m.id = ma.message_id
+    WHERE m.conversation_id = :conversation_id AND unixepoch(m.created_at) >= :around AND m.deleted_at IS NULL
+    ORDER BY m.created_at DESC
+    LIMIT ROUND(:limit / 2 + 0.5, 0)
+)
+
+UNION
+
+SELECT * FROM (
+    SELECT
+        m.id AS message_id,
+        m.conversation_id AS message_conversation_id,
+        m.reply_to_id AS message_reply_to_id,
+        m.user_id AS message_user_id,
+        m.content AS message_content,
+        m.created_at AS message_created_at,
+        m.updated_at AS message_updated_at,
+        m.edited_at AS message_edited_at,
+        ma.id AS message_attachment_id,
+        ma.filename AS message_attachment_filename,
+        ma.content_type AS message_attachment_content_type,
+        ma.file_size AS message_attachment_file_size
+    FROM messages m
+    LEFT JOIN message_attachments ma ON m.id = ma.message_id
+    WHERE m.conversation_id = :conversation_id AND unixepoch(m.created_at) < :around AND m.deleted_at IS NULL
+    ORDER BY m.created_at DESC
+    LIMIT ROUND(:limit / 2 - 0.5, 0)
+)
+ORDER BY message_created_at DESC;
+
+-- name: get_last_messages_by_user(user_id)
+-- Get the latest message of every conversation that the user is a participant of.
 SELECT
     m.id AS message_id,
     m.conversation_id AS message_conversation_id,
@@ -74,14 +121,34 @@ SELECT
     ma.filename AS message_attachment_filename,
     ma.content_type AS message_attachment_content_type,
     ma.file_size AS message_attachment_file_size
-FROM messages m
+FROM conversation_participants p
+JOIN conversations c ON c.id = p.conversation_id
+JOIN messages m ON m.id = c.last_message_id AND m.deleted_at IS NULL
 LEFT JOIN message_attachments ma ON m.id = ma.message_id
-WHERE m.conversation_id = :conversation_id AND unixepoch(m.created_at) >= :around AND m.deleted_at IS NULL
-ORDER BY m.created_at DESC
-LIMIT ROUND(:limit / 2 + 0.5, 0)
+WHERE p.user_id = :user_id;
 
-UNION
+-- name: get_last_messages_by_conversations(conversation_ids)
+-- Get the latest message of every conversation in the JSON array of conversation_ids.
+SELECT
+    m.id AS message_id,
+    m.conversation_id AS message_conversation_id,
+    m.reply_to_id AS message_reply_to_id,
+    m.user_id AS message_user_id,
+    m.content AS message_content,
+    m.created_at AS message_created_at,
+    m.updated_at AS message_updated_at,
+    m.edited_at AS message_edited_at,
+    ma.id AS message_attachment_id,
+    ma.filename AS message_attachment_filename,
+    ma.content_type AS message_attachment_content_type,
+    ma.file_size AS message_attachment_file_size
+FROM conversations c
+JOIN messages m ON m.id = c.last_message_id AND m.deleted_at IS NULL
+LEFT JOIN message_attachments ma ON m.id = ma.message_id
+WHERE c.id IN (SELECT value FROM json_each(:conversation_ids));
 
+-- name: get_messages_by_ids(message_ids)
+-- Get the messages in the JSON array of message_ids that were not deleted, latest first.
 SELECT
     m.id AS message_id,
     m.conversation_id AS message_conversation_id,
@@ -97,14 +164,28 @@ SELECT
     ma.file_size AS message_attachment_file_size
 FROM messages m
 LEFT JOIN message_attachments ma ON m.id = ma.message_id
-WHERE m.conversation_id = :conversation_id AND unixepoch(m.created_at) < :around AND m.deleted_at IS NULL
-ORDER BY m.created_at DESC
-LIMIT ROUND(:limit / 2 - 0.5, 0);
+WHERE m.id IN (SELECT value FROM json_each(:message_ids)) AND m.deleted_at IS NULL
+ORDER BY m.id DESC;
 
 -- name: insert_message(conversation_id, reply_to_id, user_id, content)^
--- Inserts a message.
+-- Inserts a message, unless the user isn't in the conversation or the message it replies
+-- to isn't in the conversation, in which case nothing is returned.
 INSERT INTO messages (conversation_id, reply_to_id, user_id, content, edited_at, deleted_at)
-VALUES (:conversation_id, :reply_to_id, :user_id, :content, NULL, NULL)
+SELECT :conversation_id, :reply_to_id, :user_id, :content, NULL, NULL
+WHERE
+    EXISTS (
+        SELECT 1
+        FROM conversation_participants
+        WHERE conversation_id = :conversation_id AND user_id = :user_id
+    )
+    AND (
+        :reply_to_id IS NULL
+        OR EXISTS (
+            SELECT 1
+            FROM messages
+            WHERE id = :reply_to_id AND conversation_id = :conversation_id AND deleted_at IS NULL
+        )
+    )
 RETURNING *;
 
 
@@ -112,8 +193,27 @@ RETURNING *;
 -- Deletes a message.
 UPDATE messages SET deleted_at = CURRENT_TIMESTAMP WHERE id = :id;
 
--- name: search_messages(conversation_id, query, limit, offset)
+-- name: search_messages(conversation_id, query, before_id, limit)
+-- Search the conversation's messages, newest first, continuing before before_id if
+-- given. Unlike ranks, IDs don't change as messages are sent, so pages never skip or
+-- repeat a match. Snippets are only made for the page.
+WITH page AS (
+    SELECT s.rowid AS id, s.rank
+    FROM message_search_index s
+    -- walk the matches and look each one up, rather than walking the conversation
+    -- and searching the index for each message
+    CROSS JOIN messages m ON s.rowid = m.id
+    WHERE
+        message_search_index MATCH :query
+        AND s.rowid < COALESCE(:before_id, 9223372036854775807)
+        AND m.conversation_id = :conversation_id
+        AND m.deleted_at IS NULL
+    ORDER BY s.rowid DESC
+    LIMIT :limit
+)
 SELECT
+    page.rank AS search_rank,
+    snippet(message_search_index, 0, '<mark>', '</mark>', '…', 16) AS search_snippet,
     m.id AS message_id,
     m.conversation_id AS message_conversation_id,
     m.reply_to_id AS message_reply_to_id,
@@ -126,16 +226,148 @@ SELECT
     ma.filename AS message_attachment_filename,
     ma.content_type AS message_attachment_content_type,
     ma.file_size AS message_attachment_file_size
-FROM message_search_index(:query) s
-JOIN messages m ON s.rowid = m.id
+FROM page
+JOIN message_search_index s ON s.rowid = page.id
+JOIN messages m ON m.id = page.id
 LEFT JOIN message_attachments ma ON m.id = ma.message_id
-WHERE m.conversation_id = :conversation_id AND m.deleted_at IS NULL
-ORDER BY m.created_at DESC
-LIMIT :limit
-OFFSET :offset;
-
--- name: count_messages_matching_query(conversation_id, query)$
-SELECT COUNT(m.id)
-FROM message_search_index(:query) s
-JOIN messages m ON s.rowid = m.id
-WHERE m.conversation_id = :conversation_id AND m.deleted_at IS NULL;
+WHERE message_search_index MATCH :query
+ORDER BY page.id DESC;
+
+-- name: count_message_search_matches(conversation_id, query)$
+-- Count the conversation's messages that match the search.
+SELECT COUNT(*)
+FROM message_search_index s
+CROSS JOIN messages m ON s.rowid = m.id
+WHERE
+    message_search_index MATCH :query
+    AND m.conversation_id = :conversation_id
+    AND m.deleted_at IS NULL;
+
+-- name: search_messages_by_user(user_id, query, before_id, limit)
+-- Search the messages of every conversation that the user is a participant of, newest
+-- first, continuing before before_id if given. The index is walked in rowid order, so
+-- a page stops reading as soon as it is full instead of ranking every match.
+WITH page AS (
+    SELECT s.rowid AS id, s.rank
+    FROM message_search_index s
+    CROSS JOIN messages m ON s.rowid = m.id
+    JOIN conversation_participants p
+        ON p.conversation_id = m.conversation_id AND p.user_id = :user_id
+    WHERE
+        message_search_index MATCH :query
+        AND s.rowid < COALESCE(:before_id, 9223372036854775807)
+        AND m.deleted_at IS NULL
+    ORDER BY s.rowid DESC
+    LIMIT :limit
+)
+SELECT
+    page.rank AS search_rank,
+    snippet(message_search_index, 0, '<mark>', '</mark>', '…', 16) AS search_snippet,
+    m.id AS message_id,
+    m.conversation_id AS message_conversation_id,
+    m.reply_to_id AS message_reply_to_id,
+    m.user_id AS message_user_id,
+    m.content AS message_content,
+    m.created_at AS message_created_at,
+    m.updated_at AS message_updated_at,
+    m.edited_at AS message_edited_at,
+    ma.id AS message_attachment_id,
+    ma.filename AS message_attachment_filename,
+    ma.content_type AS message_attachment_content_type,
+    ma.file_size AS message_attachment_file_size
+FROM page
+JOIN message_search_index s ON s.rowid = page.id
+JOIN messages m ON m.id = page.id
+LEFT JOIN message_attachments ma ON m.id = ma.message_id
+WHERE message_search_index MATCH :query
+ORDER BY page.id DESC;
+
+-- name: search_messages_in_conversations(conversation_ids, query, before_id, limit)
+-- Search the messages of the conversations given as a JSON array of IDs, newest first,
+-- continuing before before_id if given. Archives don't know who is in a conversation,
+-- so this searches them for what search_messages_by_user searches the main database.
+WITH page AS (
+    SELECT s.rowid AS id, s.rank
+    FROM message_search_index s
+    CROSS JOIN messages m ON s.rowid = m.id
+    WHERE
+        message_search_index MATCH :query
+        AND s.rowid < COALESCE(:before_id, 9223372036854775807)
+        AND m.conversation_id IN (SELECT value FROM json_each(:conversation_ids))
+        AND m.deleted_at IS NULL
+    ORDER BY s.rowid DESC
+    LIMIT :limit
+)
+SELECT
+    page.rank AS search_rank,
+    snippet(message_search_index, 0, '<mark>', '</mark>', '…', 16) AS search_snippet,
+    m.id AS message_id,
+    m.conversation_id AS message_conversation_id,
+    m.reply_to_id AS message_reply_to_id,
+    m.user_id AS message_user_id,
+    m.content AS message_content,
+    m.created_at AS message_created_at,
+    m.updated_at AS message_updated_at,
+    m.edited_at AS message_edited_at,
+    ma.id AS message_attachment_id,
+    ma.filename AS message_attachment_filename,
+    ma.content_type AS message_attachment_content_type,
+    ma.file_size AS message_attachment_file_size
+FROM page
+JOIN message_search_index s ON s.rowid = page.id
+JOIN messages m ON m.id = page.id
+LEFT JOIN message_attachments ma ON m.id = ma.message_id
+WHERE message_search_index MATCH :query
+ORDER BY page.id DESC;
+
+-- name: get_latest_message_created_at$
+SELECT created_at FROM messages ORDER BY id DESC LIMIT 1;
+
+-- name: merge_message_search_index(pages)!
+-- Merge up to `pages` pages of the search index's segments together. A negative
+-- number merges whatever segments there are, not only ones at the same level.
+INSERT INTO message_search_index (message_search_index, rank) VALUES ('merge', :pages);
+
+-- name: get_message_search_terms(conversation_id, prefix, prefix_end)
+-- Get the indexed terms in the conversation from `prefix` up to but not including
+-- `prefix_end`, with how many messages each of them is in.
+SELECT v.term, COUNT(DISTINCT v.doc) AS messages
+FROM message_search_vocab v
+JOIN messages m ON m.id = v.doc
+WHERE v.term >= :prefix AND v.term < :prefix_end AND m.conversation_id = :conversation_id
+GROUP BY v.term;
+
+-- name: get_expired_deleted_messages(before, limit)
+-- Get up to `limit` messages deleted before `before` that still have something to
+-- purge, i.e. content or attachments, or the message itself unless it's replied to.
+SELECT
+    m.id,
+    EXISTS (SELECT 1 FROM messages r WHERE r.reply_to_id = m.id) AS has_replies,
+    (
+        SELECT COALESCE(SUM(ma.file_size), 0)
+        FROM message_attachments ma
+        WHERE ma.message_id = m.id
+    ) AS attachment_bytes
+FROM messages m
+WHERE m.deleted_at < :before
+    AND (
+        m.content IS NOT NULL
+        OR EXISTS (SELECT 1 FROM message_attachments ma WHERE ma.message_id = m.id)
+        OR NOT EXISTS (SELECT 1 FROM messages r WHERE r.reply_to_id = m.id)
+    )
+LIMIT :limit;
+
+-- name: delete_message_attachments_by_messages(message_ids)!
+-- Delete the attachments of the messages given as a JSON array of IDs.
+DELETE FROM message_attachments
+WHERE message_id IN (SELECT value FROM json_each(:message_ids));
+
+-- name: purge_messages(message_ids)!
+-- Delete the messages given as a JSON array of IDs for good.
+DELETE FROM messages
+WHERE id IN (SELECT value FROM json_each(:message_ids));
+
+-- name: redact_messages(message_ids)!
+-- Clear the content of the messages given as a JSON array of IDs.
+UPDATE messages SET content = NULL
+WHERE id IN (SELECT value FROM json_each(:message_ids)) AND content IS NOT NULL;
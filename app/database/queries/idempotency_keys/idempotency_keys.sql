@@ -0,0 +1,37 @@
+-- name: get(user_id, method, path, key, after)^
+-- Get the response stored for the key, unless it was stored before `after`.
+SELECT request_hash, status_code, content_type, body, created_at
+FROM idempotency_keys
+WHERE
+    user_id = :user_id
+    AND method = :method
+    AND path = :path
+    AND key = :key
+    AND created_at >= :after;
+
+-- name: insert(user_id, method, path, key, request_hash, status_code, content_type, body, created_at)!
+-- Store the response for the key, replacing one that expired but wasn't deleted yet.
+INSERT OR REPLACE INTO idempotency_keys (
+    user_id, method, path, key, request_hash, status_code, content_type, body, created_at
+)
+VALUES (
+    :user_id,
+    :method,
+    :path,
+    :key,
+    :request_hash,
+    :status_code,
+    :content_type,
+    :body,
+    :created_at
+);
+
+-- name: delete_before(before, limit)!
+-- Delete up to `limit` responses stored before `before`.
+DELETE FROM idempotency_keys
+WHERE rowid IN (
+    SELECT rowid
+    FROM idempotency_keys
+    WHERE created_at < :before
+    LIMIT :limit
+);
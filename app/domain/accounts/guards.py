@@ -1,4 +1,3 @@
-import contextlib
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
@@ -17,14 +16,10 @@ async def current_user_from_token(
     token: Token,
     connection: ASGIConnection[Any, Any, Any, Any],  # pyright: ignore[reportExplicitAny]
 ):
-    db_conn_gen = sqlite.provide_connection(connection.app.state)
-    user_repository = provide_user_repository(await anext(db_conn_gen))
-    user = await user_repository.get(int(token.sub))
+    async with sqlite.borrow_connection(connection.app.state) as db_conn:
+        user_repository = provide_user_repository(db_conn)
 
-    with contextlib.suppress(StopAsyncIteration):
-        _ = await anext(db_conn_gen)
-
-    return user
+        return await user_repository.get(int(token.sub))
 
 
 async def check_revoked_token(
@@ -32,17 +27,13 @@ async def check_revoked_token(
     connection: ASGIConnection[Any, Any, Any, Any],  # pyright: ignore[reportExplicitAny]
 ) -> bool:
     encoded_token = token.encode(auth.token_secret, auth.algorithm)
-    db_conn_gen = sqlite.provide_connection(connection.app.state)
-    db_conn = await anext(db_conn_gen)
-    token_denylist_repository = provide_token_denylist_repository(db_conn)
-    revoked = await token_denylist_repository.get(encoded_token)
-
-    if revoked is not None and datetime.now(UTC) >= revoked.expires_at:
-        await token_denylist_repository.delete(encoded_token)
-        await db_conn.commit()
+    async with sqlite.borrow_connection(connection.app.state) as db_conn:
+        token_denylist_repository = provide_token_denylist_repository(db_conn)
+        revoked = await token_denylist_repository.get(encoded_token)
 
-    with contextlib.suppress(StopAsyncIteration):
-        _ = await anext(db_conn_gen)
+        if revoked is not None and datetime.now(UTC) >= revoked.expires_at:
+            await token_denylist_repository.delete(encoded_token)
+            await db_conn.commit()
 
     return revoked is not None
 
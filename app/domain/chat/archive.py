@@ -0,0 +1,108 @@
+import asyncio
+import contextlib
+import sqlite3
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+
+import aiosqlite
+from litestar import Litestar
+
+from app.config import settings, sqlite
+from app.domain.chat.dependencies import message_archives
+from app.domain.chat.repositories import MessagesRepositoryImpl
+from app.lib.archives import SQLiteArchives
+from app.lib.metrics import metrics
+
+archived_messages = metrics.counter(
+    "chat_messages_archived_total",
+    "Messages moved from the main database to an archive",
+)
+
+
+async def archive_messages(
+    archives: SQLiteArchives, before: datetime, batch_size: int = 500
+) -> int:
+    """
+    Move the messages sent before `before` into the archive of the month they were sent
+    in, a batch per transaction. Returns the number of messages moved.
+
+    Runs on a connection of its own, outside of the pool, since attaching a database
+    has to happen outside of a transaction and foreign keys have to be off for the
+    replies that haven't been archived yet to keep pointing at what they reply to.
+    """
+    archives.directory.mkdir(parents=True, exist_ok=True)
+    moved = 0
+
+    async with aiosqlite.connect(
+        sqlite.database_path, detect_types=sqlite3.PARSE_DECLTYPES, autocommit=True
+    ) as db_connection:
+        db_connection.row_factory = aiosqlite.Row
+        _ = await db_connection.execute("PRAGMA busy_timeout=1000")
+        _ = await db_connection.execute("PRAGMA recursive_triggers=ON")
+        messages_repository = MessagesRepositoryImpl(db_connection)
+
+        while True:
+            batch = await messages_repository.list_archivable(before, batch_size)
+
+            for period, message_ids in batch.items():
+                _ = await db_connection.execute(
+                    "ATTACH DATABASE ? AS archive", (str(archives.path(period)),)
+                )
+
+                try:
+                    # a transaction across attached databases isn't atomic in WAL
+                    # mode, so the copy is committed before anything is deleted. if
+                    # that doesn't happen, the next run copies the messages again,
+                    # which skips the ones already there
+                    _ = await db_connection.execute("BEGIN IMMEDIATE")
+                    await messages_repository.copy_to_archive(message_ids)
+                    _ = await db_connection.execute("COMMIT")
+
+                    _ = await db_connection.execute("BEGIN IMMEDIATE")
+                    await messages_repository.delete_archived(period, message_ids)
+                    _ = await db_connection.execute("COMMIT")
+                finally:
+                    if db_connection.in_transaction:
+                        _ = await db_connection.execute("ROLLBACK")
+
+                    _ = await db_connection.execute("DETACH DATABASE archive")
+
+                moved += len(message_ids)
+                archived_messages.inc(len(message_ids))
+
+                await asyncio.sleep(0)
+
+            if sum(len(message_ids) for message_ids in batch.values()) < batch_size:
+                break
+
+    return moved
+
+
+@asynccontextmanager
+async def message_archival_lifespan(
+    app: Litestar,
+) -> AsyncGenerator[None]:
+    async def archive_periodically():
+        while True:
+            await asyncio.sleep(settings.app.MESSAGE_ARCHIVE_INTERVAL)
+
+            try:
+                _ = await archive_messages(
+                    message_archives,
+                    datetime.now(UTC)
+                    - timedelta(days=settings.app.MESSAGE_ARCHIVE_AFTER_DAYS),
+                )
+            except sqlite3.OperationalError:
+                # the database was busy, there's always the next round
+                continue
+
+    task = asyncio.create_task(archive_periodically())
+
+    try:
+        yield
+    finally:
+        _ = task.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
@@ -0,0 +1,124 @@
+import re
+import unicodedata
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from litestar import Litestar
+from litestar.datastructures import State
+
+from app.config import settings
+from app.domain.chat.models import SearchTerm
+from app.domain.chat.repositories import MessagesRepository
+from app.lib.metrics import metrics
+from app.lib.trie import PrefixTrie
+
+autocomplete_hits = metrics.counter(
+    "chat_search_autocomplete_hits_total",
+    "Search term completions answered from memory",
+)
+autocomplete_misses = metrics.counter(
+    "chat_search_autocomplete_misses_total",
+    "Search term completions that had to load terms from the search index",
+)
+
+_last_word = re.compile(r"[^\W_]+$")
+
+
+def to_term_prefix(text: str) -> str:
+    """
+    The word being typed at the end of `text`, lowercased and without diacritics like
+    the search index's tokenizer leaves its terms, or an empty string if there's none.
+    """
+    match = _last_word.search(text)
+
+    if match is None:
+        return ""
+
+    return "".join(
+        c
+        for c in unicodedata.normalize("NFD", match.group().lower())
+        if not unicodedata.combining(c)
+    )
+
+
+class _ConversationTerms:
+    __slots__: tuple[str, ...] = ("loaded", "seq", "trie")
+
+    def __init__(self, seq: int) -> None:
+        self.seq: int = seq
+        self.trie: PrefixTrie = PrefixTrie()
+        self.loaded: set[str] = set()
+
+
+class SearchAutocomplete:
+    """
+    Completes search terms within a conversation as they're typed.
+
+    The terms of each conversation are kept in a trie, loaded from the search index's
+    vocabulary `load_prefix_length` characters at a time, so that the first keystrokes
+    of a word read the index once and the following ones are answered from memory.
+    A conversation's terms are thrown away as soon as its event sequence number moves
+    on, i.e. a message was sent to it or deleted, and only the `max_conversations` most
+    recently completed in are kept. Each worker process keeps its own state.
+    """
+
+    def __init__(self, max_conversations: int, load_prefix_length: int = 2) -> None:
+        self.max_conversations: int = max_conversations
+        self.load_prefix_length: int = load_prefix_length
+
+        self._conversations: OrderedDict[int, _ConversationTerms] = OrderedDict()
+
+    async def complete(
+        self,
+        conversation_id: int,
+        seq: int,
+        prefix: str,
+        limit: int,
+        messages_repository: MessagesRepository,
+    ) -> list[SearchTerm]:
+        """
+        The `limit` terms starting with `prefix` that are in the most messages, given
+        the conversation's current event sequence number.
+        """
+        terms = self._conversations.get(conversation_id)
+
+        if terms is None or terms.seq != seq:
+            terms = _ConversationTerms(seq)
+
+        self._conversations[conversation_id] = terms
+        self._conversations.move_to_end(conversation_id)
+
+        while len(self._conversations) > self.max_conversations:
+            _ = self._conversations.popitem(last=False)
+
+        if any(prefix.startswith(loaded) for loaded in terms.loaded):
+            autocomplete_hits.inc()
+        else:
+            autocomplete_misses.inc()
+            load_prefix = prefix[: self.load_prefix_length]
+
+            for term in await messages_repository.list_search_terms(
+                conversation_id, load_prefix
+            ):
+                terms.trie.insert(term.term, term.messages)
+
+            terms.loaded.add(load_prefix)
+
+        return [
+            SearchTerm(term=term, messages=messages)
+            for term, messages in terms.trie.top(prefix, limit)
+        ]
+
+
+@asynccontextmanager
+async def search_autocomplete_lifespan(app: Litestar) -> AsyncGenerator[None]:
+    app.state.search_autocomplete = SearchAutocomplete(
+        settings.app.SEARCH_AUTOCOMPLETE_CONVERSATIONS
+    )
+
+    yield
+
+
+def provide_search_autocomplete(state: State) -> SearchAutocomplete:
+    return state.search_autocomplete  # pyright: ignore[reportAny]
@@ -4,3 +4,4 @@ from .conversation_participants import (
 )
 from .conversations import ConversationsController as ConversationsController
 from .messages import MessagesController as MessagesController
+from .sync import SyncController as SyncController
@@ -18,14 +18,17 @@ from app.domain.accounts.models import User
 from app.domain.accounts.repositories import UserRepository
 from app.domain.chat import urls
 from app.domain.chat.dependencies import (
+    provide_conversation_events_repository,
     provide_conversation_participants_repository,
     provide_conversations_repository,
 )
 from app.domain.chat.models import ConversationParticipant
 from app.domain.chat.repositories import (
+    ConversationEventsRepository,
     ConversationParticipantsRepository,
     ConversationsRepository,
 )
+from app.domain.gateway.events import encode_event
 
 
 @final
@@ -38,6 +41,9 @@ class ConversationParticipantsController(Controller):
         "conversation_participants_repository": Provide(
             provide_conversation_participants_repository, sync_to_thread=False
         ),
+        "conversation_events_repository": Provide(
+            provide_conversation_events_repository, sync_to_thread=False
+        ),
         "user_repository": Provide(provide_user_repository, sync_to_thread=False),
     }
 
@@ -55,6 +61,7 @@ class ConversationParticipantsController(Controller):
         user_repository: UserRepository,
         conversations_repository: ConversationsRepository,
         conversation_participants_repository: ConversationParticipantsRepository,
+        conversation_events_repository: ConversationEventsRepository,
         db_connection: aiosqlite.Connection,
         channels: ChannelsPlugin,
     ) -> ConversationParticipant:
@@ -92,30 +99,32 @@ class ConversationParticipantsController(Controller):
             raise InternalServerException
 
         conversation.participants.append(participant)
+        participants_update = {
+            "id": conversation.id,
+            "participant_count": len(conversation.participants),
+            "added_participants": [participant],
+            "removed_participant_ids": [],
+        }
+        _ = await conversation_events_repository.append(
+            conversation.id, "CONVERSATION_PARTICIPANTS_UPDATE", participants_update
+        )
         await db_connection.commit()
 
         # send this first because CONVERSATION_CREATE will subscribe the new user to the conversation
         # channel
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {
-                "t": "CONVERSATION_PARTICIPANTS_UPDATE",
-                "d": {
-                    "id": conversation.id,
-                    "participant_count": len(conversation.participants),
-                    "added_participants": [participant],
-                    "removed_participant_ids": [],
-                },
-            },
+            encode_event("CONVERSATION_PARTICIPANTS_UPDATE", participants_update),
             f"gateway_conversation_{conversation.id}",
         )
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {
-                "t": "CONVERSATION_CREATE",
-                "d": {
+            encode_event(
+                "CONVERSATION_CREATE",
+                {
                     **msgspec.to_builtins(conversation),
                     "participant": msgspec.to_builtins(participant),
                 },
-            },
+                conversation_id=conversation.id,
+            ),
             f"gateway_user_{user_id}",
         )
 
@@ -134,6 +143,7 @@ class ConversationParticipantsController(Controller):
         current_user: User,
         conversations_repository: ConversationsRepository,
         conversation_participants_repository: ConversationParticipantsRepository,
+        conversation_events_repository: ConversationEventsRepository,
         db_connection: aiosqlite.Connection,
         channels: ChannelsPlugin,
     ) -> ConversationParticipant:
@@ -162,24 +172,29 @@ class ConversationParticipantsController(Controller):
             raise NotFoundException("participant not found")
 
         _ = await conversation_participants_repository.delete(conversation_id, user_id)
+        participants_update = {
+            "id": conversation.id,
+            "participant_count": len(conversation.participants) - 1,
+            "added_participants": [],
+            "removed_participant_ids": [removed_participant.user.id],
+        }
+        _ = await conversation_events_repository.append(
+            conversation.id, "CONVERSATION_PARTICIPANTS_UPDATE", participants_update
+        )
         await db_connection.commit()
 
         # send this first so the gateway unsubscribes the user from the conversation and
         # the removed user does not receive CONVERSATION_PARTICIPANTS_UPDATE
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {"t": "CONVERSATION_DELETE", "d": {"id": conversation.id}},
+            encode_event(
+                "CONVERSATION_DELETE",
+                {"id": conversation.id},
+                conversation_id=conversation.id,
+            ),
             f"gateway_user_{removed_participant.user.id}",
         )
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {
-                "t": "CONVERSATION_PARTICIPANTS_UPDATE",
-                "d": {
-                    "id": conversation.id,
-                    "participant_count": len(conversation.participants) - 1,
-                    "added_participants": [],
-                    "removed_participant_ids": [removed_participant.user.id],
-                },
-            },
+            encode_event("CONVERSATION_PARTICIPANTS_UPDATE", participants_update),
             f"gateway_conversation_{conversation.id}",
         )
 
@@ -197,6 +212,7 @@ class ConversationParticipantsController(Controller):
         current_user: User,
         conversations_repository: ConversationsRepository,
         conversation_participants_repository: ConversationParticipantsRepository,
+        conversation_events_repository: ConversationEventsRepository,
         db_connection: aiosqlite.Connection,
         channels: ChannelsPlugin,
     ) -> ConversationParticipant:
@@ -217,23 +233,28 @@ class ConversationParticipantsController(Controller):
         _ = await conversation_participants_repository.delete(
             conversation_id, current_user.id
         )
+        participants_update = {
+            "id": conversation.id,
+            "participant_count": len(conversation.participants) - 1,
+            "added_participants": [],
+            "removed_participant_ids": [removed_participant.user.id],
+        }
+        _ = await conversation_events_repository.append(
+            conversation.id, "CONVERSATION_PARTICIPANTS_UPDATE", participants_update
+        )
         await db_connection.commit()
 
         # same reason as deleting another user first
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {"t": "CONVERSATION_DELETE", "d": {"id": conversation.id}},
+            encode_event(
+                "CONVERSATION_DELETE",
+                {"id": conversation.id},
+                conversation_id=conversation.id,
+            ),
             f"gateway_user_{removed_participant.user.id}",
         )
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {
-                "t": "CONVERSATION_PARTICIPANTS_UPDATE",
-                "d": {
-                    "id": conversation.id,
-                    "participant_count": len(conversation.participants) - 1,
-                    "added_participants": [],
-                    "removed_participant_ids": [removed_participant.user.id],
-                },
-            },
+            encode_event("CONVERSATION_PARTICIPANTS_UPDATE", participants_update),
             f"gateway_conversation_{conversation.id}",
         )
 
@@ -1,4 +1,4 @@
-from datetime import UTC, datetime
+from datetime import datetime
 from typing import Annotated, final
 
 import aiosqlite
@@ -18,13 +18,15 @@ from litestar.status_codes import HTTP_200_OK, HTTP_204_NO_CONTENT
 from app.domain.accounts.dependencies import provide_user_repository
 from app.domain.accounts.models import User
 from app.domain.accounts.repositories import UserRepository
-from app.domain.chat import urls
+from app.domain.chat import services, urls
 from app.domain.chat.dependencies import (
+    provide_conversation_events_repository,
     provide_conversation_participants_repository,
     provide_conversations_repository,
 )
-from app.domain.chat.models import Conversation
+from app.domain.chat.models import Conversation, ConversationSummary
 from app.domain.chat.repositories import (
+    ConversationEventsRepository,
     ConversationParticipantsRepository,
     ConversationsRepository,
 )
@@ -33,6 +35,8 @@ from app.domain.chat.schema import (
     ConversationCreateGroup,
     ConversationUpdate,
 )
+from app.domain.chat.typing import TypingTracker, provide_typing_tracker
+from app.domain.gateway.events import encode_event
 from app.lib.utils import MISSING  # pyright: ignore[reportAny]
 
 
@@ -46,22 +50,38 @@ class ConversationsController(Controller):
         "conversation_participants_repository": Provide(
             provide_conversation_participants_repository, sync_to_thread=False
         ),
+        "conversation_events_repository": Provide(
+            provide_conversation_events_repository, sync_to_thread=False
+        ),
         "user_repository": Provide(provide_user_repository, sync_to_thread=False),
+        "typing_tracker": Provide(provide_typing_tracker, sync_to_thread=False),
     }
 
     @get(
         urls.GET_OWN_CONVERSATIONS,
         operation_id="GetOwnConversations",
         summary="Get user's conversations",
+        raises=[ClientException],
     )
     async def get_own_conversations(
         self,
-        page: Annotated[int, Parameter(gt=0, default=1)],
+        before: Annotated[datetime | None, Parameter(default=None)],
+        before_id: Annotated[int | None, Parameter(default=None)],
+        limit: Annotated[int, Parameter(gt=0, le=100, default=25)],
         current_user: User,
         conversations_repository: ConversationsRepository,
-    ) -> list[Conversation]:
+    ) -> list[ConversationSummary]:
+        if (before is None) != (before_id is None):
+            raise ClientException(
+                "must specify both or neither of before and before_id"
+            )
+
         return await conversations_repository.list_by_user(
-            current_user.id, 10, (page - 1) * 10
+            current_user.id,
+            limit,
+            (before, before_id)
+            if before is not None and before_id is not None
+            else None,
         )
 
     @get(
@@ -113,7 +133,26 @@ class ConversationsController(Controller):
             ) is not None:
                 return conversation
 
-            conversation = await conversations_repository.insert("direct")
+            # the lookups above started a read transaction, which sqlite won't upgrade
+            # to a write if someone else wrote in the meantime, e.g. the same
+            # conversation; a fresh one waits for them instead
+            await db_connection.rollback()
+
+            conversation = await conversations_repository.insert_direct(
+                current_user.id, data.recipient_id
+            )
+
+            if conversation is None:
+                # another request opened it in the meantime
+                await db_connection.rollback()
+                conversation = await conversations_repository.get_direct_with_recipient(
+                    current_user.id, data.recipient_id
+                )
+
+                if conversation is None:
+                    raise InternalServerException
+
+                return conversation
 
             await conversation_participants_repository.insert(
                 conversation.id, current_user.id, current_user.id, "admin"
@@ -175,10 +214,11 @@ class ConversationsController(Controller):
         await db_connection.commit()
 
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {
-                "t": "CONVERSATION_CREATE",
-                "d": {**msgspec.to_builtins(conversation), "newly_created": True},
-            },
+            encode_event(
+                "CONVERSATION_CREATE",
+                {**msgspec.to_builtins(conversation), "newly_created": True},
+                conversation_id=conversation.id,
+            ),
             [f"gateway_user_{p.user.id}" for p in conversation.participants],
         )
 
@@ -196,6 +236,7 @@ class ConversationsController(Controller):
         data: ConversationUpdate,
         current_user: User,
         conversations_repository: ConversationsRepository,
+        conversation_events_repository: ConversationEventsRepository,
         db_connection: aiosqlite.Connection,
         channels: ChannelsPlugin,
     ) -> Conversation:
@@ -229,10 +270,13 @@ class ConversationsController(Controller):
         if conversation is None:
             raise InternalServerException
 
+        _ = await conversation_events_repository.append(
+            conversation.id, "CONVERSATION_UPDATE", conversation
+        )
         await db_connection.commit()
 
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {"t": "CONVERSATION_UPDATE", "d": msgspec.to_builtins(conversation)},
+            encode_event("CONVERSATION_UPDATE", conversation),
             f"gateway_conversation_{conversation.id}",
         )
 
@@ -275,7 +319,11 @@ class ConversationsController(Controller):
         await db_connection.commit()
 
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {"t": "CONVERSATION_DELETE", "d": {"id": conversation.id}},
+            encode_event(
+                "CONVERSATION_DELETE",
+                {"id": conversation.id},
+                conversation_id=conversation.id,
+            ),
             f"gateway_conversation_{conversation.id}",
         )
 
@@ -293,23 +341,13 @@ class ConversationsController(Controller):
         conversation_id: int,
         current_user: User,
         conversations_repository: ConversationsRepository,
+        typing_tracker: TypingTracker,
         channels: ChannelsPlugin,
     ) -> None:
-        conversation = await conversations_repository.get(
-            conversation_id, current_user.id
-        )
-
-        if conversation is None:
-            raise NotFoundException
-
-        channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {
-                "t": "TYPING_START",
-                "d": {
-                    "conversation_id": conversation_id,
-                    "user_id": current_user.id,
-                    "timestamp": datetime.now(UTC).timestamp(),
-                },
-            },
-            f"gateway_conversation_{conversation.id}",
+        await services.start_typing(
+            conversation_id,
+            current_user,
+            conversations_repository,
+            typing_tracker,
+            channels,
         )
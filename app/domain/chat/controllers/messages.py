@@ -2,7 +2,6 @@ from datetime import datetime
 from typing import Annotated, final
 
 import aiosqlite
-import msgspec
 from litestar import Controller, delete, get, post
 from litestar.channels import ChannelsPlugin
 from litestar.di import Provide
@@ -12,24 +11,44 @@ from litestar.exceptions import (
     NotFoundException,
     PermissionDeniedException,
 )
-from litestar.pagination import OffsetPagination
 from litestar.params import Body, Parameter
 from litestar.status_codes import HTTP_200_OK
 
 from app.domain.accounts.models import User
-from app.domain.chat import urls
+from app.domain.chat import services, urls
+from app.domain.chat.autocomplete import (
+    SearchAutocomplete,
+    provide_search_autocomplete,
+    to_term_prefix,
+)
 from app.domain.chat.dependencies import (
+    provide_conversation_events_repository,
+    provide_conversation_participants_repository,
     provide_conversations_repository,
-    provide_message_attachments_repository,
     provide_messages_repository,
 )
-from app.domain.chat.models import Message
+from app.domain.chat.models import (
+    Message,
+    MessageAck,
+    MessageSearchResult,
+    MessageSearchResults,
+    SearchTerm,
+)
 from app.domain.chat.repositories import (
+    ConversationEventsRepository,
+    ConversationParticipantsRepository,
     ConversationsRepository,
-    MessageAttachmentsRepository,
     MessagesRepository,
 )
 from app.domain.chat.schema import MessageCreate
+from app.domain.chat.search import (
+    decode_search_cursor,
+    encode_search_cursor,
+    to_match_query,
+)
+from app.domain.chat.typing import TypingTracker, provide_typing_tracker
+from app.domain.gateway.events import encode_event
+from app.server.idempotency import IdempotencyMiddleware
 
 
 @final
@@ -42,8 +61,15 @@ class MessagesController(Controller):
         "messages_repository": Provide(
             provide_messages_repository, sync_to_thread=False
         ),
-        "message_attachments_repository": Provide(
-            provide_message_attachments_repository, sync_to_thread=False
+        "conversation_events_repository": Provide(
+            provide_conversation_events_repository, sync_to_thread=False
+        ),
+        "conversation_participants_repository": Provide(
+            provide_conversation_participants_repository, sync_to_thread=False
+        ),
+        "typing_tracker": Provide(provide_typing_tracker, sync_to_thread=False),
+        "search_autocomplete": Provide(
+            provide_search_autocomplete, sync_to_thread=False
         ),
     }
 
@@ -78,61 +104,29 @@ class MessagesController(Controller):
         urls.CREATE_MESSAGE,
         operation_id="CreateMessage",
         summary="Create message",
+        description="Messages that were moved to an archive can't be replied to.",
+        middleware=[IdempotencyMiddleware()],
     )
     async def create_message(
         self,
         conversation_id: int,
         data: Annotated[MessageCreate, Body(media_type=RequestEncodingType.MULTI_PART)],
         current_user: User,
-        conversations_repository: ConversationsRepository,
         messages_repository: MessagesRepository,
-        message_attachments_repository: MessageAttachmentsRepository,
+        typing_tracker: TypingTracker,
         db_connection: aiosqlite.Connection,
         channels: ChannelsPlugin,
     ) -> Message:
-        if data.content is None and not data.attachments:
-            raise ClientException("cannot send empty message")
-
-        conversation = await conversations_repository.get(
-            conversation_id, current_user.id
+        return await services.create_message(
+            conversation_id,
+            data,
+            current_user,
+            messages_repository,
+            typing_tracker,
+            db_connection,
+            channels,
         )
 
-        if conversation is None:
-            raise NotFoundException
-
-        if (
-            data.reply_to_id is not None
-            and await messages_repository.get(conversation_id, data.reply_to_id) is None
-        ):
-            raise NotFoundException
-
-        message = await messages_repository.insert(
-            conversation_id, data.reply_to_id, current_user.id, data.content
-        )
-
-        if data.attachments:
-            for attachment_file in data.attachments:
-                content = await attachment_file.read()
-
-                message.attachments.append(
-                    await message_attachments_repository.insert(
-                        message.id,
-                        attachment_file.filename,
-                        "application/octet-stream",
-                        len(content),
-                        content,
-                    )
-                )
-
-        await db_connection.commit()
-
-        channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {"t": "MESSAGE_CREATE", "d": msgspec.to_builtins(message)},
-            f"gateway_conversation_{conversation.id}",
-        )
-
-        return message
-
     # @patch(
     #     urls.UPDATE_MESSAGE,
     #     operation_id="UpdateMessage",
@@ -145,6 +139,8 @@ class MessagesController(Controller):
         urls.DELETE_MESSAGE,
         operation_id="DeleteMessage",
         summary="Delete message",
+        description="Messages that were moved to an archive can't be deleted.",
+        raises=[ClientException, NotFoundException, PermissionDeniedException],
         status_code=HTTP_200_OK,
     )
     async def delete_message(
@@ -154,6 +150,7 @@ class MessagesController(Controller):
         current_user: User,
         conversations_repository: ConversationsRepository,
         messages_repository: MessagesRepository,
+        conversation_events_repository: ConversationEventsRepository,
         db_connection: aiosqlite.Connection,
         channels: ChannelsPlugin,
     ) -> Message:
@@ -167,35 +164,74 @@ class MessagesController(Controller):
         message = await messages_repository.get(conversation_id, message_id)
 
         if message is None:
+            if (
+                await messages_repository.get_archived(conversation_id, message_id)
+                is not None
+            ):
+                raise ClientException("cannot delete archived messages")
+
             raise NotFoundException
 
         if message.user_id != current_user.id:
             raise PermissionDeniedException("cannot delete messages from others")
 
         await messages_repository.delete(message_id)
+        _ = await conversation_events_repository.append(
+            conversation.id, "MESSAGE_DELETE", {"id": message.id}
+        )
         await db_connection.commit()
 
         channels.publish(  # pyright: ignore[reportUnknownMemberType]
-            {"t": "MESSAGE_DELETE", "d": {"id": message.id}},
+            encode_event("MESSAGE_DELETE", {"id": message.id}),
             f"gateway_conversation_{conversation.id}",
         )
 
         return message
 
+    @post(
+        urls.ACK_MESSAGE,
+        operation_id="AckMessage",
+        summary="Mark messages as read up to a message",
+        raises=[NotFoundException],
+        status_code=HTTP_200_OK,
+    )
+    async def ack_message(
+        self,
+        conversation_id: int,
+        message_id: int,
+        current_user: User,
+        conversation_participants_repository: ConversationParticipantsRepository,
+        messages_repository: MessagesRepository,
+        db_connection: aiosqlite.Connection,
+        channels: ChannelsPlugin,
+    ) -> MessageAck:
+        return await services.ack_message(
+            conversation_id,
+            message_id,
+            current_user,
+            conversation_participants_repository,
+            messages_repository,
+            db_connection,
+            channels,
+        )
+
     @get(
         urls.SEARCH_MESSAGE_IN_CONVERSATION,
         operation_id="SearchMessageInConversation",
         summary="Search conversation messages",
+        description="Matches are listed newest first.",
+        raises=[ClientException, NotFoundException],
     )
     async def search_messages(
         self,
         conversation_id: int,
         content: str,
-        offset: int,
+        cursor: Annotated[str | None, Parameter(default=None)],
+        limit: Annotated[int, Parameter(gt=0, le=100, default=25)],
         current_user: User,
         conversations_repository: ConversationsRepository,
         messages_repository: MessagesRepository,
-    ) -> OffsetPagination[Message]:
+    ) -> MessageSearchResults:
         conversation = await conversations_repository.get(
             conversation_id, current_user.id
         )
@@ -203,13 +239,86 @@ class MessagesController(Controller):
         if conversation is None:
             raise NotFoundException
 
-        count = await messages_repository.count_matching(conversation.id, content)
+        query = to_match_query(content)
+
+        if not query:
+            return MessageSearchResults(items=[], total=0, cursor=None)
 
-        if count == 0:
-            return OffsetPagination(items=[], limit=25, offset=offset, total=0)
+        if cursor is not None:
+            after_id, after_period, total = decode_search_cursor(cursor)
+            after = (after_id, after_period)
+        else:
+            # counted once for the first page, as every database has to be searched
+            # for it, and handed on in the cursor
+            after = None
+            total = await messages_repository.count_search_matches(
+                conversation.id, query
+            )
 
         messages = await messages_repository.search(
-            conversation.id, content, 25, offset
+            conversation.id, query, limit + 1, after
+        )
+
+        return MessageSearchResults(
+            items=messages[:limit],
+            total=total,
+            cursor=encode_search_cursor(
+                messages[limit - 1].id, messages[limit - 1].archive_period, total
+            )
+            if len(messages) > limit
+            else None,
         )
 
-        return OffsetPagination(items=messages, limit=25, offset=offset, total=count)
+    @get(
+        urls.AUTOCOMPLETE_SEARCH_IN_CONVERSATION,
+        operation_id="AutocompleteSearchInConversation",
+        summary="Complete the last word of a conversation search",
+        raises=[NotFoundException],
+    )
+    async def autocomplete_search(
+        self,
+        conversation_id: int,
+        content: str,
+        limit: Annotated[int, Parameter(gt=0, le=50, default=10)],
+        current_user: User,
+        conversations_repository: ConversationsRepository,
+        messages_repository: MessagesRepository,
+        search_autocomplete: SearchAutocomplete,
+    ) -> list[SearchTerm]:
+        seq = await conversations_repository.get_event_seq(
+            conversation_id, current_user.id
+        )
+
+        if seq is None:
+            raise NotFoundException
+
+        prefix = to_term_prefix(content)
+
+        if not prefix:
+            return []
+
+        return await search_autocomplete.complete(
+            conversation_id, seq, prefix, limit, messages_repository
+        )
+
+    @get(
+        urls.SEARCH_OWN_MESSAGES,
+        operation_id="SearchOwnMessages",
+        summary="Search messages in all of the user's conversations",
+    )
+    async def search_own_messages(
+        self,
+        content: str,
+        before_id: Annotated[int | None, Parameter(default=None)],
+        limit: Annotated[int, Parameter(gt=0, le=100, default=25)],
+        current_user: User,
+        messages_repository: MessagesRepository,
+    ) -> list[MessageSearchResult]:
+        query = to_match_query(content)
+
+        if not query:
+            return []
+
+        return await messages_repository.search_by_user(
+            current_user.id, query, limit, before_id
+        )
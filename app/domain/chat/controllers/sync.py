@@ -0,0 +1,110 @@
+from typing import Annotated, final
+
+from litestar import Controller, get
+from litestar.di import Provide
+from litestar.exceptions import ClientException
+from litestar.params import Parameter
+
+from app.domain.accounts.models import User
+from app.domain.chat import urls
+from app.domain.chat.dependencies import (
+    provide_conversation_events_repository,
+    provide_conversations_repository,
+)
+from app.domain.chat.models import ConversationsSync
+from app.domain.chat.repositories import (
+    ConversationEventsRepository,
+    ConversationsRepository,
+)
+from app.domain.chat.sync import decode_sync_cursor, encode_sync_cursor
+
+
+@final
+class SyncController(Controller):
+    tags = ["Conversations"]
+    dependencies = {
+        "conversations_repository": Provide(
+            provide_conversations_repository, sync_to_thread=False
+        ),
+        "conversation_events_repository": Provide(
+            provide_conversation_events_repository, sync_to_thread=False
+        ),
+    }
+
+    @get(
+        urls.SYNC,
+        operation_id="Sync",
+        summary="Get conversation changes since the last sync",
+        raises=[ClientException],
+    )
+    async def sync(
+        self,
+        cursor: Annotated[str | None, Parameter(default=None)],
+        limit: Annotated[int, Parameter(gt=0, le=1000, default=500)],
+        current_user: User,
+        conversations_repository: ConversationsRepository,
+        conversation_events_repository: ConversationEventsRepository,
+    ) -> ConversationsSync:
+        positions = decode_sync_cursor(cursor) if cursor is not None else {}
+        ranges = await conversation_events_repository.list_ranges_by_user(
+            current_user.id
+        )
+
+        new_positions: dict[int, int] = {}
+        outdated_ids: set[int] = set()
+
+        for event_range in ranges:
+            seq = positions.get(event_range.conversation_id)
+
+            if (
+                seq is None
+                or seq > event_range.last_seq
+                or (
+                    seq < event_range.last_seq
+                    and (
+                        event_range.first_seq is None or seq + 1 < event_range.first_seq
+                    )
+                )
+            ):
+                # the conversation is new to the client, or the events it missed are
+                # gone, so it gets a snapshot instead
+                outdated_ids.add(event_range.conversation_id)
+                new_positions[event_range.conversation_id] = event_range.last_seq
+            else:
+                new_positions[event_range.conversation_id] = seq
+
+        events, last_seqs, has_more = await conversation_events_repository.list_since(
+            {
+                conversation_id: seq
+                for conversation_id, seq in new_positions.items()
+                if conversation_id not in outdated_ids
+            },
+            limit,
+        )
+        # advance past the events that were left out too, or a page of them would
+        # never be skipped
+        new_positions.update(last_seqs)
+
+        conversations = (
+            [
+                c
+                for c in await conversations_repository.list_summaries_by_user(
+                    current_user.id
+                )
+                if c.id in outdated_ids
+            ]
+            if outdated_ids
+            else []
+        )
+
+        return ConversationsSync(
+            cursor=encode_sync_cursor(new_positions),
+            events=events,
+            conversations=conversations,
+            removed_conversation_ids=[
+                conversation_id
+                for conversation_id in positions
+                if conversation_id not in new_positions
+            ],
+            has_more=has_more,
+        )
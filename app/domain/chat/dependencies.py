@@ -1,6 +1,13 @@
+from pathlib import Path
+
 import aiosqlite
 
+from app.config import settings
+from app.lib.archives import SQLiteArchives
+
 from .repositories import (
+    ConversationEventsRepository,
+    ConversationEventsRepositoryImpl,
     ConversationParticipantsRepository,
     ConversationParticipantsRepositoryImpl,
     ConversationsRepository,
@@ -11,6 +18,8 @@ from .repositories import (
     MessagesRepositoryImpl,
 )
 
+message_archives = SQLiteArchives(Path(settings.app.MESSAGE_ARCHIVE_PATH), "messages")
+
 
 def provide_conversations_repository(
     db_connection: aiosqlite.Connection,
@@ -24,13 +33,19 @@ def provide_conversation_participants_repository(
     return ConversationParticipantsRepositoryImpl(db_connection)
 
 
+def provide_conversation_events_repository(
+    db_connection: aiosqlite.Connection,
+) -> ConversationEventsRepository:
+    return ConversationEventsRepositoryImpl(db_connection)
+
+
 def provide_messages_repository(
     db_connection: aiosqlite.Connection,
 ) -> MessagesRepository:
-    return MessagesRepositoryImpl(db_connection)
+    return MessagesRepositoryImpl(db_connection, message_archives)
 
 
 def provide_message_attachments_repository(
     db_connection: aiosqlite.Connection,
 ) -> MessageAttachmentsRepository:
-    return MessageAttachmentsRepositoryImpl(db_connection)
+    return MessageAttachmentsRepositoryImpl(db_connection, message_archives)
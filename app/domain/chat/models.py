@@ -26,6 +26,42 @@ class Message(Struct):
     attachments: list[MessageAttachment]
 
 
+class MessageSearchResult(Message):
+    snippet: str
+    """The part of the message that matched, with the matching words in <mark> tags."""
+    rank: float
+    """How well the message matched, lower is better."""
+    archive_period: str | None = None
+    """
+    The month of the archive the message was moved to, if it's old enough to have been
+    archived. Ranks are only comparable between results from the same place.
+    """
+
+
+class MessageSearchResults(Struct):
+    items: list[MessageSearchResult]
+    total: int
+    """The number of matching messages across all pages, as of the first page."""
+    cursor: str | None
+    """Pass this to get the next page, if there is one."""
+
+
+class SearchTerm(Struct):
+    term: str
+    """The term as it is indexed, lowercased and without diacritics or suffixes."""
+    messages: int
+    """The number of messages in the conversation that contain it."""
+
+
+class DeletedMessagesPurge(Struct):
+    deleted: int
+    """Messages that were deleted for good."""
+    redacted: int
+    """Messages that are kept without content or attachments because others reply to them."""
+    attachment_bytes: int
+    """The total size of the attachments that were deleted."""
+
+
 class ConversationParticipant(Struct):
     conversation_id: int
     user: UserPublic
@@ -42,3 +78,43 @@ class Conversation(Struct):
     updated_at: datetime
     require_member_approval: bool
     participants: list[ConversationParticipant]
+
+
+class ConversationSummary(Conversation):
+    last_message: Message | None
+    unread_count: int
+    last_activity_at: datetime
+
+
+class MessageAck(Struct):
+    conversation_id: int
+    message_id: int
+    unread_count: int
+    """Messages from other participants in the conversation that are still unread."""
+
+
+class ConversationEvent(Struct):
+    conversation_id: int
+    seq: int
+    type: str
+    data: object
+    created_at: datetime
+
+
+class ConversationEventRange(Struct):
+    conversation_id: int
+    first_seq: int | None
+    """The oldest event still in the log, or `None` if every event was compacted."""
+    last_seq: int
+
+
+class ConversationsSync(Struct):
+    cursor: str
+    events: list[ConversationEvent]
+    conversations: list[ConversationSummary]
+    """
+    Conversations to replace wholesale, because they are new to the client or because
+    the events it missed have been compacted away.
+    """
+    removed_conversation_ids: list[int]
+    has_more: bool
@@ -3,16 +3,92 @@ from abc import ABC, abstractmethod
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING, Literal, override
 
+import msgspec
+
 from app.database.queries import queries
 from app.domain.accounts.models import UserPublic
+from app.lib.archives import SQLiteArchives
 from app.lib.utils import MISSING
 
-from .models import Conversation, ConversationParticipant, Message, MessageAttachment
+from .models import (
+    Conversation,
+    ConversationEvent,
+    ConversationEventRange,
+    ConversationParticipant,
+    ConversationSummary,
+    DeletedMessagesPurge,
+    Message,
+    MessageAttachment,
+    MessageSearchResult,
+    SearchTerm,
+)
+from .schema import MessageAttachmentCreate
 
 if TYPE_CHECKING:
     import aiosqlite
 
 
+class _LoggedMessage(msgspec.Struct):
+    """What the event log keeps of a message, see `MessagesRepositoryImpl.insert`."""
+
+    id: int
+
+
+_logged_message_decoder = msgspec.json.Decoder(_LoggedMessage)
+
+
+def _messages(rows: "list[aiosqlite.Row]") -> "list[Message]":
+    result: list[Message] = []
+    rows_by_message_id: dict[int, list["aiosqlite.Row"]] = {}
+
+    for row in rows:
+        rows_by_message_id.setdefault(row["message_id"], []).append(row)
+
+    # the rows are ordered from latest message to oldest, and dictionaries
+    # remember their insertion order since python 3.7+
+    for message_rows in rows_by_message_id.values():
+        row = message_rows[0]
+        message = Message(
+            id=row["message_id"],
+            conversation_id=row["message_conversation_id"],
+            reply_to_id=row["message_reply_to_id"],
+            user_id=row["message_user_id"],
+            content=row["message_content"],
+            created_at=row["message_created_at"],
+            updated_at=row["message_updated_at"],
+            edited_at=row["message_edited_at"],
+            attachments=[
+                MessageAttachment(
+                    id=row["message_attachment_id"],
+                    filename=row["message_attachment_filename"],
+                    content_type=row["message_attachment_content_type"],
+                    file_size=row["message_attachment_file_size"],
+                )
+                for row in message_rows
+            ]
+            if row["message_attachment_id"] is not None
+            else [],
+        )
+
+        result.append(message)
+
+    return result
+
+
+def _archive_period(at: datetime) -> str:
+    """The month whose archive has the messages sent at `at`, the way SQL has it."""
+    return at.astimezone(UTC).strftime("%Y-%m")
+
+
+def _message_period(message: Message) -> str:
+    # messages come back from the database as naive UTC
+    return _archive_period(message.created_at.replace(tzinfo=UTC))
+
+
+def _is_after(message: Message, at: datetime) -> bool:
+    return message.created_at.replace(tzinfo=UTC).timestamp() >= at.timestamp()
+
+
 class ConversationsRepository(ABC):
     @abstractmethod
     async def get(self, conversation_id: int, user_id: int) -> Conversation | None:
@@ -23,11 +99,33 @@ class ConversationsRepository(ABC):
         """
         ...
 
+    @abstractmethod
+    async def get_event_seq(self, conversation_id: int, user_id: int) -> int | None:
+        """
+        Gets the latest sequence number in the conversation's event log, which changes
+        whenever anything in the conversation does. Returns None if the user is not in
+        the conversation.
+        """
+        ...
+
     @abstractmethod
     async def list_by_user(
-        self, user_id: int, limit: int, offset: int
-    ) -> list[Conversation]:
-        """Get conversations that the user is a participant of."""
+        self, user_id: int, limit: int, before: tuple[datetime, int] | None = None
+    ) -> list[ConversationSummary]:
+        """
+        Get a page of the conversations that the user is a participant of, most
+        recently active first, along with their latest message and the number of
+        messages the user has not read yet. `before` is the `(last_activity_at, id)`
+        of the last conversation on the previous page.
+        """
+        ...
+
+    @abstractmethod
+    async def list_summaries_by_user(self, user_id: int) -> list[ConversationSummary]:
+        """
+        Get every conversation that the user is a participant of, along with its latest
+        message and the number of messages the user has not read yet.
+        """
         ...
 
     @abstractmethod
@@ -50,6 +148,17 @@ class ConversationsRepository(ABC):
         """
         ...
 
+    @abstractmethod
+    async def insert_direct(
+        self, user_id: int, recipient_id: int
+    ) -> Conversation | None:
+        """
+        Create the direct conversation between user_id and recipient_id, without any
+        participants. Returns None if they already have one, in which case the caller
+        should roll back.
+        """
+        ...
+
     @abstractmethod
     async def update(
         self,
@@ -84,21 +193,139 @@ class ConversationParticipantsRepository(ABC):
         role: Literal["admin", "user"],
     ) -> None: ...
 
+    @abstractmethod
+    async def mark_read(
+        self, conversation_id: int, user_id: int, message_id: int, created_at: datetime
+    ) -> int:
+        """
+        Move the participant's read marker up to the message sent at `created_at`, but
+        never backwards. Returns the number of messages that are still unread.
+        """
+        ...
+
     @abstractmethod
     async def delete(self, conversation_id: int, user_id: int): ...
 
 
+class ConversationEventsRepository(ABC):
+    @abstractmethod
+    async def append(self, conversation_id: int, type: str, data: object) -> int:
+        """
+        Append an event to the conversation's log, as part of the current transaction.
+        Returns the event's sequence number.
+        """
+        ...
+
+    @abstractmethod
+    async def list_ranges_by_user(self, user_id: int) -> list[ConversationEventRange]:
+        """Get the logged sequence numbers of every conversation the user is in."""
+        ...
+
+    @abstractmethod
+    async def list_since(
+        self, positions: dict[int, int], limit: int
+    ) -> tuple[list[ConversationEvent], dict[int, int], bool]:
+        """
+        Get up to `limit` events after the given sequence number of each conversation,
+        ordered by conversation and sequence number. Created messages that were deleted
+        since are left out, but still count towards the limit.
+
+        Returns the events, the last sequence number read of each conversation, and
+        whether there are more events.
+        """
+        ...
+
+    @abstractmethod
+    async def delete_before(self, before: datetime, limit: int) -> int:
+        """Delete up to `limit` events older than `before`. Returns how many were."""
+        ...
+
+
 class MessagesRepository(ABC):
     @abstractmethod
-    async def get(self, conversation_id: int, id: int) -> Message | None: ...
+    async def get(self, conversation_id: int, id: int) -> Message | None:
+        """Get a message from the main database, where messages can still change."""
+        ...
+
+    @abstractmethod
+    async def get_archived(self, conversation_id: int, id: int) -> Message | None:
+        """
+        Get a message that was moved to an archive. Archived messages are read-only, so
+        they can't be replied to or deleted.
+        """
+        ...
 
     @abstractmethod
     async def search(
-        self, conversation_id: int, query: str, limit: int, offset: int
-    ) -> list[Message]: ...
+        self,
+        conversation_id: int,
+        query: str,
+        limit: int,
+        after: tuple[int, str] | None = None,
+    ) -> list[MessageSearchResult]:
+        """
+        Search the conversation's messages with an FTS5 query, newest first, and once
+        the main database runs out of them, the archives', latest archive first.
+        `after` is the `(id, archive_period)` of the last result on the previous page,
+        with an empty period for the main database.
+        """
+        ...
+
+    @abstractmethod
+    async def count_search_matches(self, conversation_id: int, query: str) -> int:
+        """
+        Count the conversation's messages that match an FTS5 query, in the main
+        database and every archive.
+        """
+        ...
 
     @abstractmethod
-    async def count_matching(self, conversation_id: int, query: str) -> int: ...
+    async def search_by_user(
+        self, user_id: int, query: str, limit: int, before_id: int | None = None
+    ) -> list[MessageSearchResult]:
+        """
+        Search the messages of every conversation that the user is a participant of
+        with an FTS5 query, newest first, continuing before `before_id` if given, and
+        once the main database runs out of them, the archives', latest archive first.
+        """
+        ...
+
+    @abstractmethod
+    async def list_search_terms(
+        self, conversation_id: int, prefix: str
+    ) -> list[SearchTerm]:
+        """
+        Lists the search index's terms starting with `prefix` that are in the
+        conversation's messages. The prefix must already be normalized the way the
+        index's tokenizer does it.
+        """
+        ...
+
+    @abstractmethod
+    async def list_archivable(
+        self, before: datetime, limit: int
+    ) -> dict[str, list[int]]:
+        """
+        Lists the IDs of up to `limit` messages sent before `before` that can be moved
+        to an archive, oldest first, by the month they belong to.
+        """
+        ...
+
+    @abstractmethod
+    async def copy_to_archive(self, message_ids: list[int]):
+        """
+        Copy the messages and their attachments into the archive database attached as
+        `archive`, creating its tables if it doesn't have them yet.
+        """
+        ...
+
+    @abstractmethod
+    async def delete_archived(self, period: str, message_ids: list[int]):
+        """
+        Delete messages that were copied into the archive of `period` from the main
+        database, and record where they went.
+        """
+        ...
 
     @abstractmethod
     async def list(
@@ -108,7 +335,12 @@ class MessagesRepository(ABC):
         before: datetime | None = None,
         after: datetime | None = None,
         limit: int = 50,
-    ) -> list[Message]: ...
+    ) -> list[Message]:
+        """
+        Lists the conversation's messages, latest first, looking through the archives
+        for whatever the main database doesn't have enough of.
+        """
+        ...
 
     @abstractmethod
     async def insert(
@@ -117,11 +349,40 @@ class MessagesRepository(ABC):
         reply_to_id: int | None,
         user_id: int,
         content: str | None,
-    ) -> Message: ...
+        attachments: "list[MessageAttachmentCreate]",
+    ) -> Message | None:
+        """
+        Inserts a message with its attachments, in the same few round trips however
+        many attachments there are, and logs its `MESSAGE_CREATE` event. Returns None if
+        the user is not in the conversation, or if the message it replies to is not in
+        the conversation.
+        """
+        ...
 
     @abstractmethod
     async def delete(self, id: int) -> None: ...
 
+    @abstractmethod
+    async def purge_deleted(self, before: datetime, limit: int) -> DeletedMessagesPurge:
+        """
+        Purge up to `limit` messages deleted before `before`: delete them for good, or
+        only their content and attachments if other messages reply to them.
+        """
+        ...
+
+    @abstractmethod
+    async def get_latest_created_at(self) -> datetime | None:
+        """When the most recent message in any conversation was sent."""
+        ...
+
+    @abstractmethod
+    async def merge_search_index(self, pages: int) -> bool:
+        """
+        Merge up to `pages` pages of the search index's segments. Returns whether
+        there was anything left to merge.
+        """
+        ...
+
 
 class MessageAttachmentsRepository(ABC):
     @abstractmethod
@@ -129,16 +390,6 @@ class MessageAttachmentsRepository(ABC):
         self, conversation_id: int, message_id: int, attachment_id: int
     ) -> bytes | None: ...
 
-    @abstractmethod
-    async def insert(
-        self,
-        message_id: int,
-        filename: str,
-        content_type: str,
-        filesize: int,
-        content: bytes,
-    ) -> MessageAttachment: ...
-
 
 class ConversationsRepositoryImpl(ConversationsRepository):
     def __init__(self, connection: "aiosqlite.Connection"):
@@ -181,49 +432,136 @@ class ConversationsRepositoryImpl(ConversationsRepository):
             ],
         )
 
+    @override
+    async def get_event_seq(self, conversation_id: int, user_id: int) -> int | None:
+        return await queries.chat.get_conversation_event_seq(
+            self.connection, conversation_id=conversation_id, user_id=user_id
+        )
+
     @override
     async def list_by_user(
-        self, user_id: int, limit: int, offset: int
-    ) -> list[Conversation]:
-        result: list[Conversation] = []
-
-        async with queries.chat.get_conversations_by_user_cursor(
-            self.connection, user_id=user_id, limit=limit, offset=offset
-        ) as cursor:
-            # this is probably a problem if we use postgres, but fortunately we don't!
-            async for row in cursor:
-                participant_rows = await queries.chat.get_conversation_participants(
-                    self.connection, conversation_id=row["id"]
+        self, user_id: int, limit: int, before: tuple[datetime, int] | None = None
+    ) -> list[ConversationSummary]:
+        before_activity_at, before_id = before if before is not None else (None, None)
+
+        # timestamps are stored in UTC, which is also what the client got them in
+        if before_activity_at is not None and before_activity_at.tzinfo is None:
+            before_activity_at = before_activity_at.replace(tzinfo=UTC)
+
+        conversation_rows = await queries.chat.get_conversations_by_user(
+            self.connection,
+            user_id=user_id,
+            before_activity_at=before_activity_at,
+            before_id=before_id,
+            limit=limit,
+        )
+
+        if not conversation_rows:
+            return []
+
+        conversation_ids = msgspec.json.encode(
+            [row["id"] for row in conversation_rows]
+        ).decode()
+        participant_rows = (
+            await queries.chat.get_conversation_participants_by_conversations(
+                self.connection, conversation_ids=conversation_ids
+            )
+        )
+        message_rows = await queries.chat.get_last_messages_by_conversations(
+            self.connection, conversation_ids=conversation_ids
+        )
+
+        return self._summaries(conversation_rows, participant_rows, message_rows)
+
+    @override
+    async def list_summaries_by_user(self, user_id: int) -> list[ConversationSummary]:
+        conversation_rows = await queries.chat.get_conversation_summaries_by_user(
+            self.connection, user_id=user_id
+        )
+        participant_rows = (
+            await queries.chat.get_conversation_participants_in_user_conversations(
+                self.connection, user_id=user_id
+            )
+        )
+        message_rows = await queries.chat.get_last_messages_by_user(
+            self.connection, user_id=user_id
+        )
+
+        return self._summaries(conversation_rows, participant_rows, message_rows)
+
+    def _summaries(
+        self,
+        conversation_rows: list["aiosqlite.Row"],
+        participant_rows: list["aiosqlite.Row"],
+        message_rows: list["aiosqlite.Row"],
+    ) -> list[ConversationSummary]:
+        # the rows come from a fixed number of queries no matter how many conversations
+        # there are, and are stitched together by conversation ID
+
+        participants_by_conversation_id: dict[int, list[ConversationParticipant]] = {}
+
+        for row in participant_rows:
+            participants_by_conversation_id.setdefault(
+                row["participant_conversation_id"], []
+            ).append(
+                ConversationParticipant(
+                    conversation_id=row["participant_conversation_id"],
+                    user=UserPublic(
+                        id=row["user_id"],
+                        name=row["user_name"],
+                        created_at=row["user_created_at"],
+                        updated_at=row["user_updated_at"],
+                    ),
+                    role=row["participant_role"],
+                    joined_at=row["participant_created_at"],
                 )
-                participants = [
-                    ConversationParticipant(
-                        conversation_id=participant_row["participant_conversation_id"],
-                        user=UserPublic(
-                            id=participant_row["user_id"],
-                            name=participant_row["user_name"],
-                            created_at=participant_row["user_created_at"],
-                            updated_at=participant_row["user_updated_at"],
-                        ),
-                        role=participant_row["participant_role"],
-                        joined_at=participant_row["participant_created_at"],
-                    )
-                    for participant_row in participant_rows
-                ]
+            )
 
-                result.append(
-                    Conversation(
-                        id=row["id"],
-                        type=row["type"],
-                        name=row["name"],
-                        description=row["description"],
-                        created_at=row["created_at"],
-                        updated_at=row["updated_at"],
-                        require_member_approval=row["require_member_approval"] == 1,
-                        participants=participants,
+        messages_by_conversation_id: dict[int, Message] = {}
+
+        for row in message_rows:
+            message = messages_by_conversation_id.get(row["message_conversation_id"])
+
+            if message is None:
+                message = Message(
+                    id=row["message_id"],
+                    conversation_id=row["message_conversation_id"],
+                    reply_to_id=row["message_reply_to_id"],
+                    user_id=row["message_user_id"],
+                    content=row["message_content"],
+                    created_at=row["message_created_at"],
+                    updated_at=row["message_updated_at"],
+                    edited_at=row["message_edited_at"],
+                    attachments=[],
+                )
+                messages_by_conversation_id[message.conversation_id] = message
+
+            if row["message_attachment_id"] is not None:
+                message.attachments.append(
+                    MessageAttachment(
+                        id=row["message_attachment_id"],
+                        filename=row["message_attachment_filename"],
+                        content_type=row["message_attachment_content_type"],
+                        file_size=row["message_attachment_file_size"],
                     )
                 )
 
-        return result
+        return [
+            ConversationSummary(
+                id=row["id"],
+                type=row["type"],
+                name=row["name"],
+                description=row["description"],
+                created_at=row["created_at"],
+                updated_at=row["updated_at"],
+                require_member_approval=row["require_member_approval"] == 1,
+                participants=participants_by_conversation_id.get(row["id"], []),
+                last_message=messages_by_conversation_id.get(row["id"]),
+                unread_count=row["unread_count"],
+                last_activity_at=row["last_activity_at"],
+            )
+            for row in conversation_rows
+        ]
 
     @override
     async def get_direct_with_recipient(
@@ -286,6 +624,27 @@ class ConversationsRepositoryImpl(ConversationsRepository):
             participants=[],
         )
 
+    @override
+    async def insert_direct(
+        self, user_id: int, recipient_id: int
+    ) -> Conversation | None:
+        conversation = await self.insert("direct")
+
+        # the primary key on the pair of users makes sure that two requests racing to
+        # open the same direct conversation don't end up creating two
+        if (
+            await queries.chat.insert_direct_conversation(
+                self.connection,
+                conversation_id=conversation.id,
+                user_id=user_id,
+                recipient_id=recipient_id,
+            )
+            is None
+        ):
+            return None
+
+        return conversation
+
     @override
     async def update(
         self,
@@ -411,6 +770,25 @@ class ConversationParticipantsRepositoryImpl(ConversationParticipantsRepository)
             role=role,
         )
 
+    @override
+    async def mark_read(
+        self, conversation_id: int, user_id: int, message_id: int, created_at: datetime
+    ) -> int:
+        _ = await queries.chat.update_conversation_participant_last_read_message(
+            self.connection,
+            conversation_id=conversation_id,
+            user_id=user_id,
+            message_id=message_id,
+            created_at=created_at,
+        )
+
+        return (
+            await queries.chat.update_conversation_participant_unread_count(
+                self.connection, conversation_id=conversation_id, user_id=user_id
+            )
+            or 0
+        )
+
     @override
     async def delete(self, conversation_id: int, user_id: int):
         _ = await queries.chat.delete_conversation_participant(
@@ -418,10 +796,120 @@ class ConversationParticipantsRepositoryImpl(ConversationParticipantsRepository)
         )
 
 
-class MessagesRepositoryImpl(MessagesRepository):
+class ConversationEventsRepositoryImpl(ConversationEventsRepository):
     def __init__(self, connection: "aiosqlite.Connection") -> None:
         self.connection: "aiosqlite.Connection" = connection
 
+    @override
+    async def append(self, conversation_id: int, type: str, data: object) -> int:
+        seq = await queries.chat.increment_conversation_event_seq(
+            self.connection, conversation_id=conversation_id
+        )
+        _ = await queries.chat.insert_conversation_event(
+            self.connection,
+            conversation_id=conversation_id,
+            seq=seq,
+            type=type,
+            data=msgspec.json.encode(data).decode(),
+        )
+
+        return seq
+
+    @override
+    async def list_ranges_by_user(self, user_id: int) -> list[ConversationEventRange]:
+        rows = await queries.chat.get_conversation_event_ranges_by_user(
+            self.connection, user_id=user_id
+        )
+
+        return [
+            ConversationEventRange(
+                conversation_id=row["conversation_id"],
+                first_seq=row["first_seq"],
+                last_seq=row["last_seq"],
+            )
+            for row in rows
+        ]
+
+    @override
+    async def list_since(
+        self, positions: dict[int, int], limit: int
+    ) -> tuple[list[ConversationEvent], dict[int, int], bool]:
+        if not positions:
+            return [], {}, False
+
+        rows = await queries.chat.get_conversation_events_since(
+            self.connection,
+            positions=msgspec.json.encode(list(positions.items())).decode(),
+            limit=limit + 1,
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        last_seqs = {row["conversation_id"]: row["seq"] for row in rows}
+        # messages are logged by ID and loaded here, leaving out the ones that were
+        # deleted since, as their MESSAGE_DELETE follows anyway
+        created_ids = {
+            (row["conversation_id"], row["seq"]): _logged_message_decoder.decode(
+                row["data"]
+            ).id
+            for row in rows
+            if row["type"] == "MESSAGE_CREATE"
+        }
+        messages_by_id = (
+            {
+                message.id: message
+                for message in _messages(
+                    await queries.chat.get_messages_by_ids(
+                        self.connection,
+                        message_ids=msgspec.json.encode(
+                            list(created_ids.values())
+                        ).decode(),
+                    )
+                )
+            }
+            if created_ids
+            else {}
+        )
+        result: list[ConversationEvent] = []
+
+        for row in rows:
+            if row["type"] == "MESSAGE_CREATE":
+                data = messages_by_id.get(
+                    created_ids[row["conversation_id"], row["seq"]]
+                )
+
+                if data is None:
+                    continue
+            else:
+                data = msgspec.json.decode(row["data"])
+
+            result.append(
+                ConversationEvent(
+                    conversation_id=row["conversation_id"],
+                    seq=row["seq"],
+                    type=row["type"],
+                    data=data,
+                    created_at=row["created_at"],
+                )
+            )
+
+        return result, last_seqs, has_more
+
+    @override
+    async def delete_before(self, before: datetime, limit: int) -> int:
+        return await queries.chat.delete_conversation_events_before(
+            self.connection, before=before, limit=limit
+        )
+
+
+class MessagesRepositoryImpl(MessagesRepository):
+    def __init__(
+        self,
+        connection: "aiosqlite.Connection",
+        archives: SQLiteArchives | None = None,
+    ) -> None:
+        self.connection: "aiosqlite.Connection" = connection
+        self.archives: SQLiteArchives | None = archives
+
     @override
     async def get(self, conversation_id: int, id: int) -> Message | None:
         rows = await queries.chat.get_message(self.connection, id=id)
@@ -456,29 +944,146 @@ class MessagesRepositoryImpl(MessagesRepository):
             else [],
         )
 
+    @override
+    async def get_archived(self, conversation_id: int, id: int) -> Message | None:
+        if self.archives is None:
+            return None
+
+        for row in await queries.chat.get_message_archive_periods_by_message(
+            self.connection, conversation_id=conversation_id, message_id=id
+        ):
+            async with self.archives.open(row["period"]) as connection:
+                messages = _messages(await queries.chat.get_message(connection, id=id))
+
+            if messages and messages[0].conversation_id == conversation_id:
+                return messages[0]
+
+        return None
+
     @override
     async def search(
-        self, conversation_id: int, query: str, limit: int, offset: int
-    ) -> list[Message]:
-        result: list[Message] = []
-        rows = await queries.chat.search_messages(
+        self,
+        conversation_id: int,
+        query: str,
+        limit: int,
+        after: tuple[int, str] | None = None,
+    ) -> list[MessageSearchResult]:
+        after_id, after_period = after if after is not None else (None, "")
+        result: list[MessageSearchResult] = []
+
+        if not after_period:
+            rows = await queries.chat.search_messages(
+                self.connection,
+                conversation_id=conversation_id,
+                query=query,
+                before_id=after_id,
+                limit=limit,
+            )
+            result = self._search_results(rows)
+            after_id = None
+
+        if len(result) >= limit or self.archives is None:
+            return result
+
+        periods = await self._archive_periods(conversation_id)
+
+        if after_period:
+            # an archive that's gone since the previous page has nothing left to give
+            periods = [p for p in periods if p <= after_period]
+
+        for period in periods:
+            async with self.archives.open(period) as connection:
+                rows = await queries.chat.search_messages(
+                    connection,
+                    conversation_id=conversation_id,
+                    query=query,
+                    before_id=after_id if period == after_period else None,
+                    limit=limit - len(result),
+                )
+
+            result += self._search_results(rows, period)
+
+            if len(result) >= limit:
+                break
+
+        return result
+
+    @override
+    async def count_search_matches(self, conversation_id: int, query: str) -> int:
+        total = await queries.chat.count_message_search_matches(
+            self.connection, conversation_id=conversation_id, query=query
+        )
+
+        if self.archives is None:
+            return total
+
+        for period in await self._archive_periods(conversation_id):
+            async with self.archives.open(period) as connection:
+                total += await queries.chat.count_message_search_matches(
+                    connection, conversation_id=conversation_id, query=query
+                )
+
+        return total
+
+    @override
+    async def search_by_user(
+        self, user_id: int, query: str, limit: int, before_id: int | None = None
+    ) -> list[MessageSearchResult]:
+        rows = await queries.chat.search_messages_by_user(
             self.connection,
-            conversation_id=conversation_id,
+            user_id=user_id,
             query=query,
+            before_id=before_id,
             limit=limit,
-            offset=offset,
         )
+        result = self._search_results(rows)
+
+        if len(result) >= limit or self.archives is None:
+            return result
+
+        if result:
+            before_id = result[-1].id
+
+        conversation_ids_by_period: dict[str, list[int]] = {}
+
+        for row in await queries.chat.get_message_archive_conversations_by_user(
+            self.connection, user_id=user_id, before_id=before_id
+        ):
+            conversation_ids_by_period.setdefault(row["period"], []).append(
+                row["conversation_id"]
+            )
+
+        for period, conversation_ids in conversation_ids_by_period.items():
+            async with self.archives.open(period) as connection:
+                rows = await queries.chat.search_messages_in_conversations(
+                    connection,
+                    conversation_ids=msgspec.json.encode(conversation_ids).decode(),
+                    query=query,
+                    before_id=before_id,
+                    limit=limit - len(result),
+                )
+
+            result += self._search_results(rows, period)
+
+            if len(result) >= limit:
+                break
+
+        return result
 
+    def _search_results(
+        self, rows: list["aiosqlite.Row"], archive_period: str | None = None
+    ) -> list[MessageSearchResult]:
+        result: list[MessageSearchResult] = []
         rows_by_message_id: dict[int, list["aiosqlite.Row"]] = {}
 
         for row in rows:
             rows_by_message_id.setdefault(row["message_id"], []).append(row)
 
-        # the rows are ordered from latest message to oldest, and dictionaries
-        # remember their insertion order since python 3.7+
-        for rows in rows_by_message_id.values():
-            row = rows[0]
-            message = Message(
+        # dictionaries remember their insertion order since python 3.7+, so the
+        # results stay in the order of the rows
+        for message_rows in rows_by_message_id.values():
+            row = message_rows[0]
+            message = MessageSearchResult(
                 id=row["message_id"],
                 conversation_id=row["message_conversation_id"],
                 reply_to_id=row["message_reply_to_id"],
@@ -494,10 +1099,13 @@ class MessagesRepositoryImpl(MessagesRepository):
                         content_type=row["message_attachment_content_type"],
                         file_size=row["message_attachment_file_size"],
                     )
-                    for row in rows
+                    for row in message_rows
                 ]
                 if row["message_attachment_id"] is not None
                 else [],
+                snippet=row["search_snippet"],
+                rank=row["search_rank"],
+                archive_period=archive_period,
             )
 
             result.append(message)
@@ -505,11 +1113,80 @@ class MessagesRepositoryImpl(MessagesRepository):
         return result
 
     @override
-    async def count_matching(self, conversation_id: int, query: str) -> int:
-        return await queries.chat.count_messages_matching_query(
-            self.connection, conversation_id=conversation_id, query=query
+    async def list_search_terms(
+        self, conversation_id: int, prefix: str
+    ) -> list[SearchTerm]:
+        rows = await queries.chat.get_message_search_terms(
+            self.connection,
+            conversation_id=conversation_id,
+            prefix=prefix,
+            prefix_end=prefix[:-1] + chr(ord(prefix[-1]) + 1),
+        )
+
+        return [SearchTerm(term=row["term"], messages=row["messages"]) for row in rows]
+
+    @override
+    async def list_archivable(
+        self, before: datetime, limit: int
+    ) -> dict[str, list[int]]:
+        rows = await queries.chat.get_archivable_messages(
+            self.connection, before=before, limit=limit
+        )
+        result: dict[str, list[int]] = {}
+
+        for row in rows:
+            result.setdefault(row["period"], []).append(row["id"])
+
+        return result
+
+    @override
+    async def copy_to_archive(self, message_ids: list[int]):
+        encoded_ids = msgspec.json.encode(message_ids).decode()
+
+        await queries.chat.create_message_archive(self.connection)
+        _ = await queries.chat.copy_messages_to_archive(
+            self.connection, message_ids=encoded_ids
+        )
+        _ = await queries.chat.copy_message_attachments_to_archive(
+            self.connection, message_ids=encoded_ids
+        )
+
+    @override
+    async def delete_archived(self, period: str, message_ids: list[int]):
+        encoded_ids = msgspec.json.encode(message_ids).decode()
+
+        # the range of each conversation's messages is taken from the messages
+        # themselves, so it's recorded before they're deleted
+        _ = await queries.chat.upsert_message_archive(
+            self.connection, period=period, message_ids=encoded_ids
+        )
+        _ = await queries.chat.upsert_message_archive_conversations(
+            self.connection, period=period, message_ids=encoded_ids
+        )
+        _ = await queries.chat.delete_message_attachments_by_messages(
+            self.connection, message_ids=encoded_ids
+        )
+        _ = await queries.chat.purge_messages(self.connection, message_ids=encoded_ids)
+
+    async def _archive_periods(
+        self,
+        conversation_id: int,
+        before: datetime | None = None,
+        after: datetime | None = None,
+    ) -> list[str]:
+        """
+        The months whose archive has messages of the conversation sent no later than
+        `before` and no earlier than `after`, latest first.
+        """
+        rows = await queries.chat.get_message_archive_periods_by_conversation(
+            self.connection,
+            conversation_id=conversation_id,
+            before=before.timestamp() if before is not None else None,
+            after=after.timestamp() if after is not None else None,
         )
 
+        return [row["period"] for row in rows]
+
     @override
     async def list(
         self,
@@ -519,72 +1196,95 @@ class MessagesRepositoryImpl(MessagesRepository):
         after: datetime | None = None,
         limit: int = 50,
     ) -> list[Message]:
-        result: list[Message] = []
+        result = _messages(
+            await self._list_rows(
+                self.connection, conversation_id, around, before, after, limit
+            )
+        )
 
+        if len(result) >= limit or self.archives is None:
+            return result
+
+        newer_limit, older_limit = (limit + 1) // 2, limit // 2
+        # only the archives with messages of the conversation on the listed side of the
+        # cursor are opened
+        periods = await self._archive_periods(
+            conversation_id,
+            before=before if around is None else None,
+            after=after if around is None and before is None else None,
+        )
+
+        for period in periods:
+            async with self.archives.open(period) as connection:
+                result += _messages(
+                    await self._list_rows(
+                        connection, conversation_id, around, before, after, limit
+                    )
+                )
+
+            # the archives left are all older than this one, so nothing in them can
+            # beat enough messages that are at least as new as it
+            newer = [m for m in result if _message_period(m) >= period]
+
+            if around is None:
+                if len(newer) >= limit:
+                    break
+            elif (
+                sum(1 for m in newer if _is_after(m, around)) >= newer_limit
+                and sum(1 for m in newer if not _is_after(m, around)) >= older_limit
+            ):
+                break
+
+        # a message being moved can briefly be in both places
+        result = sorted(
+            {m.id: m for m in result}.values(), key=lambda m: m.created_at, reverse=True
+        )
+
+        if around is None:
+            return result[:limit]
+
+        return [m for m in result if _is_after(m, around)][:newer_limit] + [
+            m for m in result if not _is_after(m, around)
+        ][:older_limit]
+
+    async def _list_rows(
+        self,
+        connection: "aiosqlite.Connection",
+        conversation_id: int,
+        around: datetime | None,
+        before: datetime | None,
+        after: datetime | None,
+        limit: int,
+    ) -> "list[aiosqlite.Row]":
         if around is not None:
-            rows = await queries.chat.get_messages_around(
-                self.connection,
+            return await queries.chat.get_messages_around(
+                connection,
                 conversation_id=conversation_id,
                 around=around.timestamp(),
                 limit=limit,
             )
         elif before is not None:
-            rows = await queries.chat.get_messages_before(
-                self.connection,
+            return await queries.chat.get_messages_before(
+                connection,
                 conversation_id=conversation_id,
                 before=before.timestamp(),
                 limit=limit,
             )
         elif after is not None:
-            rows = await queries.chat.get_messages_after(
-                self.connection,
+            return await queries.chat.get_messages_after(
+                connection,
                 conversation_id=conversation_id,
                 after=after.timestamp(),
                 limit=limit,
             )
         else:
-            rows = await queries.chat.get_messages_before(
-                self.connection,
+            return await queries.chat.get_messages_before(
+                connection,
                 conversation_id=conversation_id,
                 before=datetime.now(UTC).timestamp(),
                 limit=limit,
             )
 
-        rows_by_message_id: dict[int, list["aiosqlite.Row"]] = {}
-
-        for row in rows:
-            rows_by_message_id.setdefault(row["message_id"], []).append(row)
-
-        # the rows are ordered from latest message to oldest, and dictionaries
-        # remember their insertion order since python 3.7+
-        for rows in rows_by_message_id.values():
-            row = rows[0]
-            message = Message(
-                id=row["message_id"],
-                conversation_id=row["message_conversation_id"],
-                reply_to_id=row["message_reply_to_id"],
-                user_id=row["message_user_id"],
-                content=row["message_content"],
-                created_at=row["message_created_at"],
-                updated_at=row["message_updated_at"],
-                edited_at=row["message_edited_at"],
-                attachments=[
-                    MessageAttachment(
-                        id=row["message_attachment_id"],
-                        filename=row["message_attachment_filename"],
-                        content_type=row["message_attachment_content_type"],
-                        file_size=row["message_attachment_file_size"],
-                    )
-                    for row in rows
-                ]
-                if row["message_attachment_id"] is not None
-                else [],
-            )
-
-            result.append(message)
-
-        return result
-
     @override
     async def insert(
         self,
@@ -592,7 +1292,8 @@ class MessagesRepositoryImpl(MessagesRepository):
         reply_to_id: int | None,
         user_id: int,
         content: str | None,
-    ) -> Message:
+        attachments: "list[MessageAttachmentCreate]",
+    ) -> Message | None:
         row = await queries.chat.insert_message(
             self.connection,
             conversation_id=conversation_id,
@@ -601,6 +1302,44 @@ class MessagesRepositoryImpl(MessagesRepository):
             content=content,
         )
 
+        if row is None:
+            return None
+
+        # only the ID is logged, the message itself is loaded when syncing
+        seq = await queries.chat.update_conversation_last_message(
+            self.connection, conversation_id=conversation_id, message_id=row["id"]
+        )
+        _ = await queries.chat.insert_conversation_event(
+            self.connection,
+            conversation_id=conversation_id,
+            seq=seq,
+            type="MESSAGE_CREATE",
+            data=msgspec.json.encode({"id": row["id"]}).decode(),
+        )
+        await queries.chat.increment_conversation_participant_unread_counts(
+            self.connection, message_id=row["id"]
+        )
+
+        attachment_rows: list["aiosqlite.Row"] = []
+
+        if attachments:
+            await queries.chat.insert_attachments(
+                self.connection,
+                [
+                    {
+                        "message_id": row["id"],
+                        "filename": attachment.filename,
+                        "content_type": attachment.content_type,
+                        "file_size": len(attachment.content),
+                        "content": attachment.content,
+                    }
+                    for attachment in attachments
+                ],
+            )
+            attachment_rows = await queries.chat.get_attachments_by_message(
+                self.connection, message_id=row["id"]
+            )
+
         return Message(
             id=row["id"],
             conversation_id=row["conversation_id"],
@@ -610,49 +1349,105 @@ class MessagesRepositoryImpl(MessagesRepository):
             created_at=row["created_at"],
             updated_at=row["updated_at"],
             edited_at=row["edited_at"],
-            attachments=[],
+            attachments=[
+                MessageAttachment(
+                    id=attachment_row["id"],
+                    filename=attachment_row["filename"],
+                    content_type=attachment_row["content_type"],
+                    file_size=attachment_row["file_size"],
+                )
+                for attachment_row in attachment_rows
+            ],
         )
 
     @override
     async def delete(self, id: int) -> None:
+        await queries.chat.decrement_conversation_participant_unread_counts(
+            self.connection, message_id=id
+        )
         _ = await queries.chat.delete_message(self.connection, id=id)
+        await queries.chat.reset_conversation_last_message(
+            self.connection, message_id=id
+        )
+
+    @override
+    async def purge_deleted(self, before: datetime, limit: int) -> DeletedMessagesPurge:
+        rows = await queries.chat.get_expired_deleted_messages(
+            self.connection, before=before, limit=limit
+        )
+        message_ids = msgspec.json.encode([row["id"] for row in rows]).decode()
+
+        _ = await queries.chat.delete_message_attachments_by_messages(
+            self.connection, message_ids=message_ids
+        )
+        deleted = await queries.chat.purge_messages(
+            self.connection,
+            message_ids=msgspec.json.encode(
+                [row["id"] for row in rows if not row["has_replies"]]
+            ).decode(),
+        )
+        # some of these may only have had attachments left to delete
+        redacted_ids = [row["id"] for row in rows if row["has_replies"]]
+        _ = await queries.chat.redact_messages(
+            self.connection, message_ids=msgspec.json.encode(redacted_ids).decode()
+        )
+
+        return DeletedMessagesPurge(
+            deleted=deleted,
+            redacted=len(redacted_ids),
+            attachment_bytes=sum(row["attachment_bytes"] for row in rows),
+        )
+
+    @override
+    async def get_latest_created_at(self) -> datetime | None:
+        created_at = await queries.chat.get_latest_message_created_at(self.connection)
+
+        return created_at.replace(tzinfo=UTC) if created_at is not None else None
+
+    @override
+    async def merge_search_index(self, pages: int) -> bool:
+        total_changes = self.connection.total_changes
+        await queries.chat.merge_message_search_index(self.connection, pages=-pages)
+
+        # the merge command changes at least two rows whenever it does any work
+        return self.connection.total_changes - total_changes >= 2
 
 
 class MessageAttachmentsRepositoryImpl(MessageAttachmentsRepository):
-    def __init__(self, connection: "aiosqlite.Connection") -> None:
+    def __init__(
+        self,
+        connection: "aiosqlite.Connection",
+        archives: SQLiteArchives | None = None,
+    ) -> None:
         self.connection: "aiosqlite.Connection" = connection
+        self.archives: SQLiteArchives | None = archives
 
     @override
     async def get_content(
         self, conversation_id: int, message_id: int, attachment_id: int
     ) -> bytes | None:
-        return await queries.chat.get_attachment_content(
+        content = await queries.chat.get_attachment_content(
             self.connection,
             conversation_id=conversation_id,
             message_id=message_id,
             attachment_id=attachment_id,
         )
 
-    @override
-    async def insert(
-        self,
-        message_id: int,
-        filename: str,
-        content_type: str,
-        filesize: int,
-        content: bytes,
-    ) -> MessageAttachment:
-        row = await queries.chat.insert_attachment(
-            self.connection,
-            message_id=message_id,
-            filename=filename,
-            content_type=content_type,
-            file_size=filesize,
-            content=content,
-        )
-        return MessageAttachment(
-            id=row["id"],
-            filename=row["filename"],
-            content_type=row["content_type"],
-            file_size=row["file_size"],
-        )
+        if content is not None or self.archives is None:
+            return content
+
+        for row in await queries.chat.get_message_archive_periods_by_message(
+            self.connection, conversation_id=conversation_id, message_id=message_id
+        ):
+            async with self.archives.open(row["period"]) as connection:
+                content = await queries.chat.get_attachment_content(
+                    connection,
+                    conversation_id=conversation_id,
+                    message_id=message_id,
+                    attachment_id=attachment_id,
+                )
+
+            if content is not None:
+                return content
+
+        return None
@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import logging
+import sqlite3
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+
+import aiosqlite
+from litestar import Litestar
+from litestar.datastructures import State
+
+from app.config import settings, sqlite
+from app.domain.chat.dependencies import provide_messages_repository
+from app.domain.chat.models import DeletedMessagesPurge
+from app.lib.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+purged_messages = metrics.counter(
+    "chat_deleted_messages_purged_total",
+    "Deleted messages whose content was purged after the grace period",
+    labels=("action",),
+)
+purged_attachment_bytes = metrics.counter(
+    "chat_deleted_attachment_bytes_purged_total",
+    "Size of the attachments purged along with deleted messages",
+)
+vacuumed_pages = metrics.counter(
+    "database_pages_vacuumed_total",
+    "Free database pages given back to the filesystem",
+)
+
+# PRAGMA auto_vacuum
+_AUTO_VACUUM_INCREMENTAL = 2
+
+
+async def purge_deleted_messages(
+    state: State, before: datetime, batch_size: int = 100
+) -> DeletedMessagesPurge:
+    """
+    Purge the messages deleted before `before`, a batch per transaction so that writers
+    are never locked out for long, attachments being what makes a batch big. Returns
+    the totals over every batch.
+    """
+    total = DeletedMessagesPurge(deleted=0, redacted=0, attachment_bytes=0)
+
+    async with sqlite.borrow_connection(state) as db_connection:
+        messages_repository = provide_messages_repository(db_connection)
+
+        while True:
+            purge = await messages_repository.purge_deleted(before, batch_size)
+            await db_connection.commit()
+
+            total.deleted += purge.deleted
+            total.redacted += purge.redacted
+            total.attachment_bytes += purge.attachment_bytes
+            purged_messages.inc(purge.deleted, "deleted")
+            purged_messages.inc(purge.redacted, "redacted")
+            purged_attachment_bytes.inc(purge.attachment_bytes)
+
+            if purge.deleted + purge.redacted < batch_size:
+                break
+
+            await asyncio.sleep(0)
+
+    return total
+
+
+async def incremental_vacuum(
+    db_connection: aiosqlite.Connection, batch_pages: int = 1000
+) -> int:
+    """
+    Give the database's free pages back to the filesystem, `batch_pages` per
+    transaction. Does nothing unless the database was created with incremental
+    vacuuming or has been through `database vacuum` since. Returns the number of pages.
+    """
+    async with db_connection.execute("PRAGMA auto_vacuum") as cursor:
+        (auto_vacuum,) = await cursor.fetchone()  # pyright: ignore[reportGeneralTypeIssues, reportAny]
+
+    if auto_vacuum != _AUTO_VACUUM_INCREMENTAL:
+        return 0
+
+    vacuumed = 0
+
+    while True:
+        async with db_connection.execute("PRAGMA freelist_count") as cursor:
+            (free_pages,) = await cursor.fetchone()  # pyright: ignore[reportGeneralTypeIssues, reportAny]
+
+        if free_pages == 0:
+            break
+
+        # frees a page per step, so it has to be run to completion before committing
+        async with db_connection.execute(
+            f"PRAGMA incremental_vacuum({batch_pages})"
+        ) as cursor:
+            _ = await cursor.fetchall()
+
+        await db_connection.commit()
+
+        pages = min(free_pages, batch_pages)  # pyright: ignore[reportAny]
+        vacuumed += pages
+        vacuumed_pages.inc(pages)
+
+        await asyncio.sleep(0)
+
+    return vacuumed
+
+
+@asynccontextmanager
+async def deleted_messages_purge_lifespan(
+    app: Litestar,
+) -> AsyncGenerator[None]:
+    async def purge_periodically():
+        while True:
+            await asyncio.sleep(settings.app.DELETED_MESSAGES_PURGE_INTERVAL)
+
+            try:
+                purge = await purge_deleted_messages(
+                    app.state,
+                    datetime.now(UTC)
+                    - timedelta(days=settings.app.DELETED_MESSAGES_RETENTION_DAYS),
+                )
+
+                if purge.deleted or purge.redacted:
+                    async with sqlite.borrow_connection(app.state) as db_connection:
+                        _ = await incremental_vacuum(db_connection)
+            except sqlite3.OperationalError:
+                # the database was busy, there's always the next round
+                continue
+            except Exception:
+                # logged rather than ending the task, so that purging isn't stopped
+                # for good by one bad round
+                logger.exception("failed to purge deleted messages")
+
+    task = asyncio.create_task(purge_periodically())
+
+    try:
+        yield
+    finally:
+        _ = task.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
@@ -24,3 +24,10 @@ class MessageCreate:
     reply_to_id: int | None = None
     content: str | None = None
     attachments: list[UploadFile] | None = None
+
+
+@dataclass
+class MessageAttachmentCreate:
+    filename: str
+    content_type: str
+    content: bytes
@@ -0,0 +1,122 @@
+import asyncio
+import base64
+import binascii
+import contextlib
+import sqlite3
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+
+import msgspec
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.exceptions import ClientException
+
+from app.config import settings, sqlite
+from app.domain.chat.dependencies import provide_messages_repository
+from app.lib.metrics import metrics
+
+search_index_merges = metrics.counter(
+    "chat_search_index_merges_total",
+    "Incremental merges run on the message search index while it was idle",
+)
+
+_cursor_decoder = msgspec.msgpack.Decoder(tuple[int, str, int])
+
+
+def to_match_query(text: str) -> str:
+    """
+    Turn what the user typed into an FTS5 query matching messages with all of its
+    words, so that quotes and operators in it can't make the query invalid.
+
+    The index folds diacritics away, but `đ` is a letter of its own rather than `d`
+    with one, so "dang" doesn't find "đang". Folding it as well would take indexing
+    something other than the messages' content, in the main database and in every
+    archive.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def encode_search_cursor(id: int, archive_period: str | None, total: int) -> str:
+    """
+    Pack the ID of the last result on a page, the archive it's from if any, and the
+    total number of matches counted for the first page, into an opaque string.
+    """
+    return (
+        base64.urlsafe_b64encode(
+            msgspec.msgpack.encode((id, archive_period or "", total))
+        )
+        .rstrip(b"=")
+        .decode()
+    )
+
+
+def decode_search_cursor(cursor: str) -> tuple[int, str, int]:
+    try:
+        return _cursor_decoder.decode(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+    except (binascii.Error, ValueError, msgspec.DecodeError) as e:
+        raise ClientException("invalid search cursor") from e
+
+
+async def merge_search_index(
+    state: State, idle_time: timedelta, pages: int, max_steps: int = 100
+) -> int:
+    """
+    Merge the search index's segments a few pages per transaction, for as long as no
+    message has been sent in the last `idle_time` and there is anything to merge, so
+    that searches have fewer segments to look through. Returns the number of merges.
+    """
+    steps = 0
+
+    async with sqlite.borrow_connection(state) as db_connection:
+        messages_repository = provide_messages_repository(db_connection)
+
+        while steps < max_steps:
+            latest = await messages_repository.get_latest_created_at()
+
+            if latest is not None and datetime.now(UTC) - latest < idle_time:
+                break
+
+            merged = await messages_repository.merge_search_index(pages)
+            await db_connection.commit()
+
+            if not merged:
+                break
+
+            steps += 1
+            await asyncio.sleep(0)
+
+    return steps
+
+
+@asynccontextmanager
+async def search_index_maintenance_lifespan(
+    app: Litestar,
+) -> AsyncGenerator[None]:
+    async def merge_periodically():
+        while True:
+            await asyncio.sleep(settings.app.SEARCH_INDEX_MAINTENANCE_INTERVAL)
+
+            try:
+                steps = await merge_search_index(
+                    app.state,
+                    timedelta(seconds=settings.app.SEARCH_INDEX_IDLE_TIME),
+                    settings.app.SEARCH_INDEX_MERGE_PAGES,
+                )
+            except sqlite3.OperationalError:
+                # the database was busy, there's always the next round
+                continue
+
+            search_index_merges.inc(steps)
+
+    task = asyncio.create_task(merge_periodically())
+
+    try:
+        yield
+    finally:
+        _ = task.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
@@ -0,0 +1,146 @@
+from datetime import UTC, datetime
+
+import aiosqlite
+from litestar.channels import ChannelsPlugin
+from litestar.exceptions import ClientException, NotFoundException
+
+from app.domain.accounts.models import User
+from app.domain.chat.models import Message, MessageAck
+from app.domain.chat.repositories import (
+    ConversationParticipantsRepository,
+    ConversationsRepository,
+    MessagesRepository,
+)
+from app.domain.chat.schema import MessageAttachmentCreate, MessageCreate
+from app.domain.chat.typing import TypingTracker
+from app.domain.gateway.events import encode_event
+
+
+async def create_message(
+    conversation_id: int,
+    data: MessageCreate,
+    current_user: User,
+    messages_repository: MessagesRepository,
+    typing_tracker: TypingTracker,
+    db_connection: aiosqlite.Connection,
+    channels: ChannelsPlugin,
+) -> Message:
+    if data.content is None and not data.attachments:
+        raise ClientException("cannot send empty message")
+
+    # read before anything is written, so that a slow upload doesn't hold the write lock
+    attachments = [
+        MessageAttachmentCreate(
+            filename=attachment_file.filename,
+            content_type="application/octet-stream",
+            content=await attachment_file.read(),
+        )
+        for attachment_file in data.attachments or []
+    ]
+
+    # also checks that the user is in the conversation, and that the message it
+    # replies to is too, and logs the message for syncing
+    message = await messages_repository.insert(
+        conversation_id, data.reply_to_id, current_user.id, data.content, attachments
+    )
+
+    if message is None:
+        if (
+            data.reply_to_id is not None
+            and await messages_repository.get_archived(
+                conversation_id, data.reply_to_id
+            )
+            is not None
+        ):
+            raise ClientException("cannot reply to archived messages")
+
+        raise NotFoundException
+
+    await db_connection.commit()
+
+    # clients hide the typing indicator once the message arrives, so the next keystroke
+    # should show it again right away
+    typing_tracker.stop(conversation_id, current_user.id)
+
+    channels.publish(  # pyright: ignore[reportUnknownMemberType]
+        encode_event("MESSAGE_CREATE", message),
+        f"gateway_conversation_{conversation_id}",
+    )
+
+    return message
+
+
+async def start_typing(
+    conversation_id: int,
+    current_user: User,
+    conversations_repository: ConversationsRepository,
+    typing_tracker: TypingTracker,
+    channels: ChannelsPlugin,
+) -> None:
+    if typing_tracker.is_typing(conversation_id, current_user.id):
+        return
+
+    conversation = await conversations_repository.get(conversation_id, current_user.id)
+
+    if conversation is None:
+        raise NotFoundException
+
+    typing_tracker.start(conversation_id, current_user.id)
+
+    channels.publish(  # pyright: ignore[reportUnknownMemberType]
+        encode_event(
+            "TYPING_START",
+            {
+                "conversation_id": conversation_id,
+                "user_id": current_user.id,
+                "timestamp": datetime.now(UTC).timestamp(),
+            },
+        ),
+        f"gateway_conversation_{conversation.id}",
+    )
+
+
+async def ack_message(
+    conversation_id: int,
+    message_id: int,
+    current_user: User,
+    conversation_participants_repository: ConversationParticipantsRepository,
+    messages_repository: MessagesRepository,
+    db_connection: aiosqlite.Connection,
+    channels: ChannelsPlugin,
+) -> MessageAck:
+    participant = await conversation_participants_repository.get(
+        conversation_id, current_user.id
+    )
+
+    if participant is None:
+        raise NotFoundException
+
+    # reading up to an archived message is still reading up to it
+    message = await messages_repository.get(
+        conversation_id, message_id
+    ) or await messages_repository.get_archived(conversation_id, message_id)
+
+    if message is None:
+        raise NotFoundException
+
+    ack = MessageAck(
+        conversation_id=conversation_id,
+        message_id=message.id,
+        unread_count=await conversation_participants_repository.mark_read(
+            conversation_id,
+            current_user.id,
+            message.id,
+            # messages come back from the database as naive UTC
+            message.created_at.replace(tzinfo=UTC),
+        ),
+    )
+    await db_connection.commit()
+
+    # the user's other sessions clear their unread badges as well
+    channels.publish(  # pyright: ignore[reportUnknownMemberType]
+        encode_event("MESSAGE_ACK", ack),
+        f"gateway_user_{current_user.id}",
+    )
+
+    return ack
@@ -0,0 +1,102 @@
+import asyncio
+import base64
+import binascii
+import contextlib
+import sqlite3
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+
+import msgspec
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.exceptions import ClientException
+
+from app.config import settings, sqlite
+from app.domain.chat.dependencies import provide_conversation_events_repository
+from app.lib.metrics import metrics
+
+compacted_events = metrics.counter(
+    "chat_conversation_events_compacted_total",
+    "Conversation events deleted from the log for being too old",
+)
+
+_cursor_decoder = msgspec.msgpack.Decoder(dict[int, int])
+
+
+def encode_sync_cursor(positions: dict[int, int]) -> str:
+    """Pack the last sequence number seen in each conversation into an opaque string."""
+    return (
+        base64.urlsafe_b64encode(msgspec.msgpack.encode(positions))
+        .rstrip(b"=")
+        .decode()
+    )
+
+
+def decode_sync_cursor(cursor: str) -> dict[int, int]:
+    try:
+        return _cursor_decoder.decode(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+    except (binascii.Error, ValueError, msgspec.DecodeError) as e:
+        raise ClientException("invalid sync cursor") from e
+
+
+async def compact_conversation_events(
+    state: State, before: datetime, batch_size: int = 1000
+) -> int:
+    """
+    Delete the events logged before `before`, a batch per transaction so that writers
+    are never locked out for long. Returns the number of deleted events.
+    """
+    deleted = 0
+
+    async with sqlite.borrow_connection(state) as db_connection:
+        conversation_events_repository = provide_conversation_events_repository(
+            db_connection
+        )
+
+        while True:
+            count = await conversation_events_repository.delete_before(
+                before, batch_size
+            )
+            await db_connection.commit()
+            deleted += count
+
+            if count < batch_size:
+                break
+
+            await asyncio.sleep(0)
+
+    return deleted
+
+
+@asynccontextmanager
+async def conversation_events_compaction_lifespan(
+    app: Litestar,
+) -> AsyncGenerator[None]:
+    async def compact_periodically():
+        while True:
+            await asyncio.sleep(settings.app.CONVERSATION_EVENTS_COMPACTION_INTERVAL)
+
+            try:
+                deleted = await compact_conversation_events(
+                    app.state,
+                    datetime.now(UTC)
+                    - timedelta(days=settings.app.CONVERSATION_EVENTS_RETENTION_DAYS),
+                )
+            except sqlite3.OperationalError:
+                # the database was busy, there's always the next round
+                continue
+
+            compacted_events.inc(deleted)
+
+    task = asyncio.create_task(compact_periodically())
+
+    try:
+        yield
+    finally:
+        _ = task.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
@@ -0,0 +1,116 @@
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+
+from litestar import Litestar
+from litestar.channels import ChannelsPlugin
+from litestar.datastructures import State
+
+from app.config import settings
+from app.domain.gateway.events import encode_event
+from app.lib.metrics import metrics
+from app.lib.timer_wheel import TimerWheel
+
+typing_started = metrics.counter(
+    "chat_typing_started_total", "Typing indicators that were sent out"
+)
+typing_coalesced = metrics.counter(
+    "chat_typing_coalesced_total",
+    "Typing indicators that were dropped because one was sent out recently",
+)
+typing_stopped = metrics.counter(
+    "chat_typing_stopped_total",
+    "Typing indicators that were cleared because the user stopped typing",
+)
+
+
+class TypingTracker:
+    """
+    Who is typing where, kept in memory so that repeated typing calls are cheap.
+
+    Once a `TYPING_START` has been sent out for a user in a conversation, further calls
+    are coalesced into it until `debounce_interval` seconds have passed, without looking
+    anything up or publishing anything. When no call has come for `debounce_interval`
+    seconds, the user has stopped typing and a `TYPING_STOP` is sent out. Each worker
+    process keeps its own state.
+    """
+
+    def __init__(self, channels: ChannelsPlugin, debounce_interval: float) -> None:
+        self.channels: ChannelsPlugin = channels
+        self.debounce_interval: float = debounce_interval
+
+        self._started_at: dict[tuple[int, int], float] = {}
+        self._typing: TimerWheel[tuple[int, int]] = TimerWheel(
+            self._expire, resolution=0.5, slots=int(debounce_interval / 0.5) + 2
+        )
+
+    def is_typing(self, conversation_id: int, user_id: int) -> bool:
+        """
+        Whether a `TYPING_START` was sent out recently for the user, in which case a new
+        one should not be sent.
+        """
+        key = (conversation_id, user_id)
+        started_at = self._started_at.get(key)
+
+        if (
+            started_at is None
+            or time.monotonic() - started_at >= self.debounce_interval
+        ):
+            return False
+
+        typing_coalesced.inc()
+        self._typing.add(key, self.debounce_interval)
+
+        return True
+
+    def start(self, conversation_id: int, user_id: int):
+        typing_started.inc()
+        self._started_at[(conversation_id, user_id)] = time.monotonic()
+        self._typing.add((conversation_id, user_id), self.debounce_interval)
+
+    def stop(self, conversation_id: int, user_id: int):
+        """
+        Forget about the user typing without sending a `TYPING_STOP`, e.g. because they
+        sent their message, which hides the indicator anyway.
+        """
+        _ = self._started_at.pop((conversation_id, user_id), None)
+        self._typing.discard((conversation_id, user_id))
+
+    def close(self):
+        self._started_at.clear()
+        self._typing.close()
+
+    def _expire(self, key: tuple[int, int]):
+        del self._started_at[key]
+        conversation_id, user_id = key
+        typing_stopped.inc()
+
+        self.channels.publish(  # pyright: ignore[reportUnknownMemberType]
+            encode_event(
+                "TYPING_STOP",
+                {
+                    "conversation_id": conversation_id,
+                    "user_id": user_id,
+                    "timestamp": datetime.now(UTC).timestamp(),
+                },
+            ),
+            f"gateway_conversation_{conversation_id}",
+        )
+
+
+@asynccontextmanager
+async def typing_tracker_lifespan(app: Litestar) -> AsyncGenerator[None]:
+    tracker = TypingTracker(
+        app.plugins.get(ChannelsPlugin), settings.app.TYPING_DEBOUNCE_INTERVAL
+    )
+    app.state.typing_tracker = tracker
+
+    try:
+        yield
+    finally:
+        tracker.close()
+
+
+def provide_typing_tracker(state: State) -> TypingTracker:
+    return state.typing_tracker  # pyright: ignore[reportAny]
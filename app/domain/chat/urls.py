@@ -9,10 +9,17 @@ CREATE_MESSAGE = "/api/v1/conversations/{conversation_id:int}/messages"
 GET_MESSAGES = "/api/v1/conversations/{conversation_id:int}/messages"
 UPDATE_MESSAGE = "/api/v1/conversations/{conversation_id:int}/messages/{message_id:int}"
 DELETE_MESSAGE = "/api/v1/conversations/{conversation_id:int}/messages/{message_id:int}"
+ACK_MESSAGE = (
+    "/api/v1/conversations/{conversation_id:int}/messages/{message_id:int}/ack"
+)
 
 SEARCH_MESSAGE_IN_CONVERSATION = (
     "/api/v1/conversations/{conversation_id:int}/messages/search"
 )
+AUTOCOMPLETE_SEARCH_IN_CONVERSATION = (
+    "/api/v1/conversations/{conversation_id:int}/messages/search/autocomplete"
+)
+SEARCH_OWN_MESSAGES = "/api/v1/users/me/messages/search"
 
 START_TYPING = "/api/v1/conversations/{conversation_id:int}/typing"
 
@@ -27,3 +34,5 @@ REMOVE_USER_FROM_CONVERSATION = (
 )
 
 GET_ATTACHMENT_CONTENT = "/api/v1/conversations/{conversation_id:int}/messages/{message_id:int}/attachments/{attachment_id:int}"
+
+SYNC = "/api/v1/users/me/sync"
@@ -0,0 +1,354 @@
+import asyncio
+import contextlib
+import logging
+import time
+import zlib
+from collections import deque
+from typing import Any
+
+from litestar import WebSocket
+from litestar.exceptions import WebSocketDisconnect
+
+from app.domain.gateway.events import Encoding, add_sequence, transcode_msgpack
+from app.lib.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SEND_ERRORS = (WebSocketDisconnect, OSError, RuntimeError)
+
+# close codes, see docs/GATEWAY.md
+CLOSE_SEND_QUEUE_OVERFLOW = 4000
+CLOSE_INVALID_COMMAND = 4001
+CLOSE_HEARTBEAT_TIMEOUT = 4002
+CLOSE_SEND_TIMEOUT = 4008
+CLOSE_SESSION_REPLACED = 4009
+CLOSE_INTERNAL_ERROR = 1011
+
+connections_gauge = metrics.gauge(
+    "gateway_connections", "Number of open gateway connections"
+)
+send_queue_depth = metrics.gauge(
+    "gateway_send_queue_depth",
+    "Payloads waiting to be written, summed over all gateway connections",
+)
+send_queue_depth_observed = metrics.histogram(
+    "gateway_send_queue_depth_observed",
+    "Depth of the send queue a payload was queued behind",
+    buckets=(0, 1, 4, 16, 64, 128, 256, 512),
+)
+events_dropped = metrics.counter(
+    "gateway_events_dropped_total",
+    "Droppable events that were not sent because the send queue was full",
+    labels=("type",),
+)
+slow_consumer_disconnects = metrics.counter(
+    "gateway_slow_consumer_disconnects_total",
+    "Connections closed because the send queue overflowed with critical events",
+)
+send_timeouts = metrics.counter(
+    "gateway_send_timeouts_total",
+    "Connections closed because writing a payload to them took too long",
+)
+compression_seconds = metrics.counter(
+    "gateway_compression_seconds_total",
+    "Time spent compressing gateway payloads",
+)
+compression_bytes_in = metrics.counter(
+    "gateway_compression_bytes_in_total",
+    "Size of gateway payloads before compression",
+)
+compression_bytes_out = metrics.counter(
+    "gateway_compression_bytes_out_total",
+    "Size of gateway payloads after compression",
+)
+heartbeat_timeouts = metrics.counter(
+    "gateway_heartbeat_timeouts_total",
+    "Connections closed because the client stopped sending heartbeats",
+)
+fanout_seconds = metrics.histogram(
+    "gateway_fanout_seconds",
+    "Time from an event reaching the gateway until it was written to every recipient",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    labels=("type",),
+)
+
+
+class FanoutBatch:
+    """Tracks the deliveries of one event, to report how long the whole fan-out took."""
+
+    __slots__: tuple[str, ...] = ("event_type", "received_at", "remaining")
+
+    def __init__(self, event_type: str, received_at: float) -> None:
+        self.event_type: str = event_type
+        self.received_at: float = received_at
+        self.remaining: int = 0
+
+    def done(self, count: int = 1):
+        self.remaining -= count
+
+        if self.remaining <= 0:
+            fanout_seconds.observe(
+                time.perf_counter() - self.received_at, self.event_type
+            )
+
+
+class ConnectionWriters:
+    """
+    A fixed set of tasks writing queued payloads to sockets.
+
+    Connections with something to send are handed to whichever writer is free, which
+    then writes everything queued on that connection, so the number of tasks and
+    wakeups doesn't grow with the number of connections an event goes out to.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self._ready: asyncio.Queue[GatewayConnection] = asyncio.Queue()
+        self._tasks: list[asyncio.Task[None]] = [
+            asyncio.create_task(self._work()) for _ in range(workers)
+        ]
+
+    def schedule(self, connection: "GatewayConnection"):
+        self._ready.put_nowait(connection)
+
+    async def _work(self):
+        while True:
+            connection = await self._ready.get()
+
+            try:
+                await connection.flush()
+            except SEND_ERRORS:
+                # the socket went away, which `flush` normally handles itself
+                connection.abort(CLOSE_INTERNAL_ERROR, "Internal error")
+            except Exception:
+                # a bug, logged and kept to this connection so that the writer stays
+                # alive for everyone else
+                logger.exception("failed to write to gateway connection")
+                connection.abort(CLOSE_INTERNAL_ERROR, "Internal error")
+
+    async def close(self):
+        for task in self._tasks:
+            _ = task.cancel()
+
+        _ = await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class GatewayConnection:
+    """
+    A single gateway socket, with a bounded queue of payloads waiting to be written.
+
+    Queuing never blocks the caller, so one slow client cannot hold up dispatching to
+    everyone else. When the queue is full, droppable events are discarded and anything
+    else closes the connection with a hint to resume the session, which replays the
+    critical events from the session's buffer.
+
+    Writing a payload blocks while the client isn't reading, so a write that takes
+    longer than `send_timeout` closes the connection too, and closing it gives up on the
+    write in progress, so that a client that stopped reading doesn't hold on to one of
+    the few writers for good.
+    """
+
+    def __init__(
+        self,
+        socket: WebSocket[Any, Any, Any],  # pyright: ignore[reportExplicitAny]
+        writers: ConnectionWriters,
+        max_queue_size: int,
+        send_timeout: float,
+        encoding: Encoding = "json",
+        compress: bool = False,
+    ) -> None:
+        self.socket: WebSocket[Any, Any, Any] = socket  # pyright: ignore[reportExplicitAny]
+        self.max_queue_size: int = max_queue_size
+        self.send_timeout: float = send_timeout
+        self.encoding: Encoding = encoding
+        # one deflate stream for the whole connection, so that the keys repeated in every
+        # payload are compressed against what was already sent
+        self.compressor: zlib._Compress | None = (  # pyright: ignore[reportPrivateUsage]
+            zlib.compressobj() if compress else None
+        )
+        self.close_code: int | None = None
+        self.close_reason: str = ""
+
+        self._writers: ConnectionWriters = writers
+        self._queue: deque[tuple[bytes, int | None, FanoutBatch | None]] = deque()
+        self._scheduled: bool = False
+        self._closed: bool = False
+        self._aborted: asyncio.Event = asyncio.Event()
+        # the deadline of the write in progress, if any
+        self._send_deadline: asyncio.Timeout | None = None
+
+        connections_gauge.inc()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed or self._aborted.is_set()
+
+    def send(
+        self,
+        payload: bytes,
+        seq: int | None = None,
+        *,
+        event_type: str = "",
+        droppable: bool = False,
+        batch: FanoutBatch | None = None,
+    ) -> bool:
+        """
+        Queue a JSON `payload` for sending, numbered `seq` if given. Returns `False` if
+        the connection is closed or had to be closed because the queue overflowed.
+        """
+        if self.closed:
+            return False
+
+        if len(self._queue) >= self.max_queue_size:
+            if droppable:
+                events_dropped.inc(1, event_type)
+                return True
+
+            slow_consumer_disconnects.inc()
+            self.abort(CLOSE_SEND_QUEUE_OVERFLOW, "Send queue overflowed, resume")
+
+            return False
+
+        self.enqueue(payload, seq, batch)
+
+        return True
+
+    def enqueue(
+        self, payload: bytes, seq: int | None = None, batch: FanoutBatch | None = None
+    ):
+        """Queue `payload` regardless of the queue bound, e.g. when replaying events."""
+        send_queue_depth_observed.observe(len(self._queue))
+        send_queue_depth.inc()
+        self._queue.append((payload, seq, batch))
+
+        if batch is not None:
+            batch.remaining += 1
+
+        if not self._scheduled:
+            self._scheduled = True
+            self._writers.schedule(self)
+
+    async def flush(self):
+        """Write everything that is queued. Called by one of the `ConnectionWriters`."""
+        loop = asyncio.get_running_loop()
+
+        try:
+            async with asyncio.timeout(None) as self._send_deadline:
+                while self._queue and not self.closed:
+                    payload, seq, batch = self._queue.popleft()
+                    send_queue_depth.dec()
+
+                    # payloads are queued as JSON and only converted here, so that
+                    # queuing stays cheap and conversions are shared between sockets
+                    if self.encoding == "msgpack":
+                        payload = transcode_msgpack(payload)
+
+                    if seq is not None:
+                        payload = add_sequence(payload, seq, self.encoding)
+
+                    self._send_deadline.reschedule(loop.time() + self.send_timeout)
+
+                    try:
+                        if self.compressor is not None:
+                            await self.socket.send_bytes(self._compress(payload))
+                        elif self.encoding == "msgpack":
+                            await self.socket.send_bytes(payload)
+                        else:
+                            await self.socket.send_text(payload)
+                    finally:
+                        if batch is not None:
+                            batch.done()
+        except TimeoutError:
+            # the write ran out of time, or was given up on because the connection was
+            # aborted meanwhile. the deadline is gone along with its context
+            self._send_deadline = None
+
+            if not self._aborted.is_set():
+                send_timeouts.inc()
+                self.abort(CLOSE_SEND_TIMEOUT, "Send timed out, resume")
+        except SEND_ERRORS:
+            self._closed = True
+        finally:
+            self._send_deadline = None
+            self._scheduled = False
+
+            if self.closed:
+                self._discard_queue()
+
+    def _discard_queue(self):
+        send_queue_depth.dec(len(self._queue))
+
+        for _, _, batch in self._queue:
+            if batch is not None:
+                batch.done()
+
+        self._queue.clear()
+
+    def _compress(self, payload: bytes) -> bytes:
+        assert self.compressor is not None
+
+        start = time.perf_counter()
+        # a sync flush ends every frame with 00 00 ff ff, which clients look for to know
+        # that a payload is complete
+        data = self.compressor.compress(payload) + self.compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+        compression_seconds.inc(time.perf_counter() - start)
+        compression_bytes_in.inc(len(payload))
+        compression_bytes_out.inc(len(data))
+
+        return data
+
+    def abort(self, code: int, reason: str):
+        """Stop sending and make the pending `receive` return, so the socket gets closed."""
+        if self.close_code is None:
+            self.close_code = code
+            self.close_reason = reason
+
+        self._aborted.set()
+
+        if self._send_deadline is not None:
+            # frees the writer stuck on a client that stopped reading
+            self._send_deadline.reschedule(asyncio.get_running_loop().time())
+
+    async def receive(self, timeout: float) -> dict[str, Any] | None:  # pyright: ignore[reportExplicitAny]
+        """
+        Wait for the next message from the client. Returns `None` once the connection is
+        aborted, and raises `TimeoutError` if nothing was received within `timeout`.
+        """
+        receive = asyncio.ensure_future(self.socket.receive())
+        aborted = asyncio.ensure_future(self._aborted.wait())
+
+        try:
+            done, _ = await asyncio.wait(
+                (receive, aborted), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+        except asyncio.CancelledError:
+            _ = receive.cancel()
+            raise
+        finally:
+            _ = aborted.cancel()
+
+        if receive not in done:
+            _ = receive.cancel()
+
+            if aborted in done:
+                return None
+
+            raise TimeoutError
+
+        return receive.result()
+
+    async def close(self):
+        self._closed = True
+
+        # a writer that is in the middle of flushing discards the rest itself
+        if not self._scheduled:
+            self._discard_queue()
+
+        if self.close_code is not None:
+            # the close frame can't get through to a client that stopped reading either
+            with contextlib.suppress(*SEND_ERRORS, TimeoutError):
+                async with asyncio.timeout(self.send_timeout):
+                    await self.socket.close(self.close_code, self.close_reason)
+
+        connections_gauge.dec()
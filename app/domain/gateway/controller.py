@@ -1,97 +1,296 @@
-# pyright: reportAny=false, reportPrivateUsage=false, reportShadowedImports=false
-from collections.abc import Iterable
-from typing import final
+# pyright: reportAny=false, reportShadowedImports=false
+import sqlite3
+import time
+from typing import Literal, final
 
-from litestar.channels.plugin import ChannelsException
 import msgspec
 from litestar import Controller, WebSocket, websocket
-from litestar.channels import ChannelsPlugin, Subscriber
+from litestar.channels import ChannelsPlugin
 from litestar.datastructures import State
 from litestar.di import Provide
+from litestar.exceptions import HTTPException, ServiceUnavailableException
 
-from app.domain.accounts.models import User
-from app.domain.chat.dependencies import provide_conversation_participants_repository
-from app.domain.chat.repositories import ConversationParticipantsRepository
+from app.config import settings, sqlite
+from app.domain.accounts.models import User, UserProtected
+from app.domain.chat import services
+from app.domain.chat.dependencies import (
+    provide_conversation_participants_repository,
+    provide_conversations_repository,
+    provide_messages_repository,
+)
+from app.domain.chat.schema import MessageCreate
+from app.domain.chat.typing import TypingTracker, provide_typing_tracker
+from app.domain.gateway.connections import (
+    CLOSE_HEARTBEAT_TIMEOUT,
+    CLOSE_INVALID_COMMAND,
+    GatewayConnection,
+    heartbeat_timeouts,
+)
+from app.domain.gateway.events import Encoding, encode_payload
+from app.domain.gateway.schema import (
+    Ack,
+    GatewayCommand,
+    Heartbeat,
+    SendMessage,
+    StartTyping,
+)
+from app.domain.gateway.sessions import (
+    GatewaySession,
+    GatewaySessions,
+    provide_gateway_sessions,
+)
 
-
-async def add_subscriptions(
-    plugin: ChannelsPlugin,
-    subscriber: Subscriber,
-    channels: Iterable[str],
-    history: int | None = None,
-):
-    channels_to_subscribe: set[str] = set()
-
-    for channel in channels:
-        if channel not in plugin._channels:
-            if not plugin._arbitrary_channels_allowed:
-                raise ChannelsException(
-                    f"Unknown channel: {channel!r}. Either explicitly defined the channel or set arbitrary_channels_allowed=True"
-                )
-            plugin._channels[channel] = set()
-        channel_subscribers = plugin._channels[channel]
-
-        if not channel_subscribers:
-            channels_to_subscribe.add(channel)
-
-        channel_subscribers.add(subscriber)
-
-    if channels_to_subscribe:
-        await plugin._backend.subscribe(channels_to_subscribe)
-
-    if history:
-        await plugin.put_subscriber_history(
-            subscriber=subscriber, limit=history, channels=channels
-        )
-
-    return subscriber
+command_decoders = {
+    "json": msgspec.json.Decoder(GatewayCommand),
+    "msgpack": msgspec.msgpack.Decoder(GatewayCommand),
+}
 
 
 @final
 class GatewayController(Controller):
     tags = ["Gateway"]
     dependencies = {
-        "conversation_participants_repository": Provide(
-            provide_conversation_participants_repository, sync_to_thread=False
-        )
+        "gateway_sessions": Provide(provide_gateway_sessions, sync_to_thread=False),
+        "typing_tracker": Provide(provide_typing_tracker, sync_to_thread=False),
     }
 
     @websocket("/api/v1/gateway")
     async def gateway(
         self,
         socket: WebSocket[User, object, State],
-        conversation_participants_repository: ConversationParticipantsRepository,
         channels: ChannelsPlugin,
+        gateway_sessions: GatewaySessions,
+        typing_tracker: TypingTracker,
+        session_id: str | None = None,
+        seq: int | None = None,
+        encoding: Encoding = "json",
+        compress: Literal["zlib-stream"] | None = None,
     ) -> None:
         await socket.accept()
 
-        participants = await conversation_participants_repository.list_by_user(
-            socket.user.id
+        connection = GatewayConnection(
+            socket,
+            gateway_sessions.writers,
+            settings.app.GATEWAY_SEND_QUEUE_SIZE,
+            settings.app.GATEWAY_SEND_TIMEOUT,
+            encoding=encoding,
+            compress=compress == "zlib-stream",
         )
-        subscriptions = [f"gateway_user_{socket.user.id}"] + [
-            f"gateway_conversation_{p.conversation_id}" for p in participants
+        command_decoder = command_decoders[encoding]
+        session: GatewaySession | None = None
+        last_seen = time.time()
+
+        try:
+            if session_id is not None and seq is not None:
+                session = gateway_sessions.get(session_id, socket.user.id)
+
+                if session is not None and not session.attach(
+                    connection,
+                    encode_payload(
+                        "RESUMED",
+                        {
+                            "session_id": session_id,
+                            "heartbeat_interval": self._heartbeat_interval,
+                        },
+                    ),
+                    seq,
+                ):
+                    session = None
+
+                if session is None:
+                    connection.enqueue(encode_payload("INVALID_SESSION", None))
+
+            if session is None:
+                session = await self._start_session(connection, gateway_sessions)
+
+            gateway_sessions.presence.connect(socket.user.id)
+
+            while True:
+                try:
+                    message = await connection.receive(
+                        settings.app.GATEWAY_IDLE_TIMEOUT
+                    )
+                except TimeoutError:
+                    heartbeat_timeouts.inc()
+                    connection.abort(CLOSE_HEARTBEAT_TIMEOUT, "Heartbeat timed out")
+                    break
+
+                if message is None or message["type"] == "websocket.disconnect":
+                    break
+
+                last_seen = time.time()
+
+                try:
+                    command = command_decoder.decode(
+                        message.get("text") or message.get("bytes") or b""
+                    )
+                except msgspec.DecodeError:
+                    connection.abort(CLOSE_INVALID_COMMAND, "Invalid command")
+                    break
+
+                if isinstance(command, Heartbeat):
+                    _ = connection.send(encode_payload("HEARTBEAT_ACK", None))
+                else:
+                    await self._handle_command(
+                        connection, channels, typing_tracker, command
+                    )
+        finally:
+            if session is not None:
+                gateway_sessions.detach(session, connection)
+                gateway_sessions.presence.disconnect(socket.user.id, last_seen)
+
+            await connection.close()
+
+    @property
+    def _heartbeat_interval(self) -> int:
+        return int(settings.app.GATEWAY_HEARTBEAT_INTERVAL * 1000)
+
+    async def _start_session(
+        self,
+        connection: GatewayConnection,
+        gateway_sessions: GatewaySessions,
+    ) -> GatewaySession:
+        user: User = connection.socket.user
+
+        # borrowed only while it's needed instead of being injected, which would pin a
+        # pooled connection for as long as the socket stays open
+        async with sqlite.borrow_connection(
+            connection.socket.app.state
+        ) as db_connection:
+            conversations_repository = provide_conversations_repository(db_connection)
+            conversations = await conversations_repository.list_summaries_by_user(
+                user.id
+            )
+
+        subscriptions = [f"gateway_user_{user.id}"] + [
+            f"gateway_conversation_{c.id}" for c in conversations
         ]
+        members = {c.id: [p.user.id for p in c.participants] for c in conversations}
+        session = await gateway_sessions.create(user.id, subscriptions, members)
 
-        async def handle_event(
-            channels: ChannelsPlugin, subscriber: Subscriber, data: bytes
-        ):
-            event = msgspec.json.decode(data)
-            event_type = event.get("t")
+        try:
+            _ = session.attach(
+                connection,
+                encode_payload(
+                    "READY",
+                    {
+                        "session_id": session.session_id,
+                        "heartbeat_interval": self._heartbeat_interval,
+                        "user": UserProtected(
+                            id=user.id,
+                            name=user.name,
+                            created_at=user.created_at,
+                            updated_at=user.updated_at,
+                            email=user.email,
+                            phone_number=user.phone_number,
+                        ),
+                        "conversations": conversations,
+                        "presences": gateway_sessions.presence.online_among(
+                            {
+                                user_id
+                                for user_ids in members.values()
+                                for user_id in user_ids
+                                if user_id != user.id
+                            }
+                        ),
+                    },
+                ),
+            )
+        except BaseException:
+            # the socket never got the session, so it wouldn't be detached and expire
+            gateway_sessions.delete(session)
+            raise
 
-            if event_type == "CONVERSATION_CREATE":
-                _ = await add_subscriptions(
-                    channels, subscriber, [f"gateway_conversation_{event['d']['id']}"]
-                )
-            elif event_type == "CONVERSATION_DELETE":
-                await channels.unsubscribe(
-                    subscriber, f"gateway_conversation_{event['d']['id']}"
-                )
+        return session
 
-            await socket.send_text(data)
+    async def _handle_command(
+        self,
+        connection: GatewayConnection,
+        channels: ChannelsPlugin,
+        typing_tracker: TypingTracker,
+        command: SendMessage | StartTyping | Ack,
+    ):
+        """
+        Run a command through the same code as its REST counterpart, as the user who
+        is already authenticated on the socket.
+        """
+        user: User = connection.socket.user
+        data: object = None
+        error: HTTPException | None = None
 
-        async with channels.start_subscription(subscriptions) as subscriber:
-            async with subscriber.run_in_background(
-                lambda data: handle_event(channels, subscriber, data)
+        try:
+            # a coalesced typing command doesn't even need a database connection
+            if not (
+                isinstance(command, StartTyping)
+                and typing_tracker.is_typing(command.d.conversation_id, user.id)
             ):
-                while (await socket.receive())["type"] != "websocket.disconnect":
-                    continue
+                data = await self._run_command(
+                    connection, channels, typing_tracker, command
+                )
+        except HTTPException as e:
+            error = e
+        except sqlite3.OperationalError:
+            # most likely the database being locked by another writer, so the client
+            # may retry
+            error = ServiceUnavailableException()
+
+        if command.nonce is None and error is None:
+            return
+
+        _ = connection.send(
+            encode_payload(
+                "COMMAND_RESULT",
+                {
+                    "op": command.__struct_config__.tag,
+                    "nonce": command.nonce,
+                    "data": data,
+                    "error": {"status_code": error.status_code, "detail": error.detail}
+                    if error is not None
+                    else None,
+                },
+            )
+        )
+
+    async def _run_command(
+        self,
+        connection: GatewayConnection,
+        channels: ChannelsPlugin,
+        typing_tracker: TypingTracker,
+        command: SendMessage | StartTyping | Ack,
+    ) -> object:
+        user: User = connection.socket.user
+
+        async with sqlite.borrow_connection(
+            connection.socket.app.state
+        ) as db_connection:
+            match command:
+                case SendMessage(d=d):
+                    return await services.create_message(
+                        d.conversation_id,
+                        MessageCreate(reply_to_id=d.reply_to_id, content=d.content),
+                        user,
+                        provide_messages_repository(db_connection),
+                        typing_tracker,
+                        db_connection,
+                        channels,
+                    )
+                case StartTyping(d=d):
+                    await services.start_typing(
+                        d.conversation_id,
+                        user,
+                        provide_conversations_repository(db_connection),
+                        typing_tracker,
+                        channels,
+                    )
+                case Ack(d=d):
+                    return await services.ack_message(
+                        d.conversation_id,
+                        d.message_id,
+                        user,
+                        provide_conversation_participants_repository(db_connection),
+                        provide_messages_repository(db_connection),
+                        db_connection,
+                        channels,
+                    )
+
+        return None
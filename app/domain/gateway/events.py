@@ -0,0 +1,76 @@
+import functools
+from typing import Literal, NamedTuple
+
+import msgspec
+
+Encoding = Literal["json", "msgpack"]
+
+EPHEMERAL_EVENTS = frozenset({"TYPING_START", "TYPING_STOP"})
+"""
+Events that are only useful while they are fresh. They are not sequenced or kept for
+replay, and are the first to go when a client cannot keep up.
+"""
+
+
+class GatewayEvent(NamedTuple):
+    type: str
+    conversation_id: int | None
+    payload: bytes
+    """The serialised `{"t": ..., "d": ...}` envelope, ready to be sent to clients."""
+
+
+def encode_payload(event_type: str, data: object) -> bytes:
+    return msgspec.json.encode({"t": event_type, "d": data})
+
+
+def encode_event(
+    event_type: str, data: object, *, conversation_id: int | None = None
+) -> bytes:
+    """
+    Serialise a gateway event for publishing.
+
+    The envelope is encoded once and prefixed with a one-line routing header holding the
+    event type and the conversation it concerns, so that subscribers can act on the event
+    and forward the same bytes to their socket without decoding the JSON.
+    """
+    header = (
+        event_type if conversation_id is None else f"{event_type} {conversation_id}"
+    )
+
+    return b"%s\n%s" % (header.encode(), encode_payload(event_type, data))
+
+
+# every subscriber in the process receives the very same bytes object, so caching turns
+# the per-subscriber work into a dictionary lookup
+@functools.lru_cache(maxsize=1024)
+def decode_event(data: bytes) -> GatewayEvent:
+    # JSON encoded by msgspec never contains a raw newline, so the first one always ends
+    # the header
+    header, _, payload = data.partition(b"\n")
+    event_type, _, conversation_id = header.decode().partition(" ")
+
+    return GatewayEvent(
+        event_type, int(conversation_id) if conversation_id else None, payload
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def transcode_msgpack(payload: bytes) -> bytes:
+    """Convert a JSON envelope to MessagePack, once per event rather than per socket."""
+    return msgspec.msgpack.encode(msgspec.json.decode(payload))
+
+
+_MSGPACK_SEQ_KEY = msgspec.msgpack.encode("s")
+
+
+def add_sequence(payload: bytes, seq: int, encoding: Encoding) -> bytes:
+    """Splice the sequence number into an encoded `{"t": ..., "d": ...}` envelope."""
+    if encoding == "msgpack":
+        # the envelope is a map of two entries (0x82), grow it to three (0x83)
+        return b"\x83%s%s%s" % (
+            _MSGPACK_SEQ_KEY,
+            msgspec.msgpack.encode(seq),
+            payload[1:],
+        )
+
+    return b'{"s":%d,%s' % (seq, payload[1:])
@@ -0,0 +1,340 @@
+# pyright: reportPrivateUsage=false
+import asyncio
+import time
+from collections import Counter
+from collections.abc import Coroutine, Iterable
+from typing import TYPE_CHECKING, Any, override
+
+import msgspec
+from litestar.channels import ChannelsPlugin, Subscriber
+
+from app.domain.gateway.connections import FanoutBatch
+from app.domain.gateway.events import GatewayEvent, decode_event
+from app.domain.gateway.presence import PRESENCE_CHANNEL, PresenceData
+from app.lib.metrics import metrics
+
+if TYPE_CHECKING:
+    from app.domain.gateway.sessions import GatewaySession
+
+fanout_batch_size = metrics.histogram(
+    "gateway_fanout_batch_size",
+    "Number of events dispatched together by the fan-out stage",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+fanout_channels = metrics.gauge(
+    "gateway_fanout_channels", "Channels with at least one local gateway session"
+)
+
+
+class _UserRef(msgspec.Struct):
+    id: int
+
+
+class _ParticipantRef(msgspec.Struct):
+    user: _UserRef
+
+
+class _MembershipData(msgspec.Struct):
+    id: int | None = None
+    participants: list[_ParticipantRef] = []
+    added_participants: list[_ParticipantRef] = []
+    removed_participant_ids: list[int] = []
+
+
+class _MembershipEnvelope(msgspec.Struct):
+    d: _MembershipData
+
+
+class _PresenceEnvelope(msgspec.Struct):
+    d: PresenceData
+
+
+# only the parts of an event that say who is in which conversation
+_membership_decoder = msgspec.json.Decoder(_MembershipEnvelope)
+_presence_decoder = msgspec.json.Decoder(_PresenceEnvelope)
+
+_MEMBERSHIP_EVENTS = frozenset(
+    {"CONVERSATION_CREATE", "CONVERSATION_DELETE", "CONVERSATION_PARTICIPANTS_UPDATE"}
+)
+
+
+class ChannelSubscriber(Subscriber):
+    """
+    Hands events of a single channel straight to the fan-out stage, instead of queuing
+    them for a task of its own.
+    """
+
+    def __init__(self, plugin: ChannelsPlugin, fanout: "GatewayFanout", channel: str):
+        super().__init__(plugin)
+        self.fanout: GatewayFanout = fanout
+        self.channel: str = channel
+        self.active: bool = True
+
+    @override
+    def put_nowait(self, item: bytes | None) -> bool:
+        if item is not None and self.active:
+            self.fanout.push(self.channel, item)
+
+        return True
+
+    @override
+    async def put(self, item: bytes | None) -> None:
+        _ = self.put_nowait(item)
+
+
+class GatewayFanout:
+    """
+    Delivers channel events to the gateway sessions of this process.
+
+    The process subscribes to each channel once, no matter how many sessions are
+    interested in it. Events that arrive together are dispatched in one batch, on the
+    next event loop iteration: each event is decoded once and queued on every
+    interested session's connection, and the `ConnectionWriters` write them out.
+
+    Presence updates all arrive on one channel and are routed by user instead, to the
+    sessions that share a conversation with that user. Who shares what is tracked from
+    the sessions' conversations and the membership events that go through here.
+    """
+
+    def __init__(self, plugin: ChannelsPlugin) -> None:
+        self.plugin: ChannelsPlugin = plugin
+
+        self._interest: dict[str, set[GatewaySession]] = {}
+        self._channels_by_session: dict[GatewaySession, set[str]] = {}
+        self._subscribers: dict[str, ChannelSubscriber] = {}
+        self._pending: list[tuple[str, bytes, float]] = []
+        self._flush_handle: asyncio.Handle | None = None
+        self._tasks: set[asyncio.Task[Any]] = set()  # pyright: ignore[reportExplicitAny]
+
+        # the other participants of each session's conversations, how many conversations
+        # each of them shares with the session, and the other way around
+        self._members: dict[GatewaySession, dict[int, set[int]]] = {}
+        self._watched: dict[GatewaySession, Counter[int]] = {}
+        self._watchers: dict[int, set[GatewaySession]] = {}
+
+    async def subscribe(
+        self,
+        session: "GatewaySession",
+        channels: Iterable[str],
+        members: dict[int, list[int]] | None = None,
+    ):
+        """
+        Start delivering `channels` to `session`, along with the presence of the users
+        in `members`, a list of participant IDs per conversation.
+        """
+        if members is not None:
+            channels = [*channels, PRESENCE_CHANNEL]
+
+            for conversation_id, user_ids in members.items():
+                self._watch(session, conversation_id, user_ids)
+
+        if new_channels := self._add_interest(session, channels):
+            await self.plugin._backend.subscribe(new_channels)
+
+    def unsubscribe(
+        self, session: "GatewaySession", channels: Iterable[str] | None = None
+    ):
+        """Stop delivering `channels`, or every channel if not given, to `session`."""
+        if channels is None:
+            channels = list(self._channels_by_session.get(session, ()))
+
+            for conversation_id in list(self._members.get(session, ())):
+                self._unwatch(session, conversation_id)
+
+        for channel in channels:
+            self._remove_interest(session, channel)
+
+    def push(self, channel: str, data: bytes):
+        self._pending.append((channel, data, time.perf_counter()))
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        self._flush_handle = None
+        new_channels: set[str] = set()
+
+        fanout_batch_size.observe(len(pending))
+
+        for channel, data, received_at in pending:
+            if channel == PRESENCE_CHANNEL:
+                presence = _presence_decoder.decode(decode_event(data).payload).d
+                sessions = self._watchers.get(presence.user_id)
+            else:
+                sessions = self._interest.get(channel)
+
+            if not sessions:
+                continue
+
+            event = decode_event(data)
+            batch = FanoutBatch(event.type, received_at)
+            membership = (
+                _membership_decoder.decode(event.payload).d
+                if event.type in _MEMBERSHIP_EVENTS
+                else None
+            )
+
+            # copied, since the events below change who is interested in what
+            for session in tuple(sessions):
+                session.deliver(event, batch)
+
+                if membership is not None:
+                    new_channels |= self._apply_membership(session, event, membership)
+
+        if new_channels:
+            self._spawn(self.plugin._backend.subscribe(new_channels))
+
+    def _apply_membership(
+        self,
+        session: "GatewaySession",
+        event: GatewayEvent,
+        membership: _MembershipData,
+    ) -> set[str]:
+        """Returns the channels that the backend has to start listening to."""
+        if event.type == "CONVERSATION_CREATE" and event.conversation_id is not None:
+            self._watch(
+                session,
+                event.conversation_id,
+                [p.user.id for p in membership.participants],
+            )
+
+            return self._add_interest(
+                session, [f"gateway_conversation_{event.conversation_id}"]
+            )
+
+        if event.type == "CONVERSATION_DELETE" and event.conversation_id is not None:
+            self._unwatch(session, event.conversation_id)
+            self._remove_interest(
+                session, f"gateway_conversation_{event.conversation_id}"
+            )
+        elif (
+            event.type == "CONVERSATION_PARTICIPANTS_UPDATE"
+            and membership.id is not None
+        ):
+            self._watch(
+                session,
+                membership.id,
+                [p.user.id for p in membership.added_participants],
+            )
+            self._unwatch(session, membership.id, membership.removed_participant_ids)
+
+        return set()
+
+    def _watch(
+        self, session: "GatewaySession", conversation_id: int, user_ids: Iterable[int]
+    ):
+        members = self._members.setdefault(session, {}).setdefault(
+            conversation_id, set()
+        )
+        watched = self._watched.setdefault(session, Counter())
+
+        for user_id in user_ids:
+            if user_id == session.user_id or user_id in members:
+                continue
+
+            members.add(user_id)
+            watched[user_id] += 1
+
+            if watched[user_id] == 1:
+                self._watchers.setdefault(user_id, set()).add(session)
+
+    def _unwatch(
+        self,
+        session: "GatewaySession",
+        conversation_id: int,
+        user_ids: Iterable[int] | None = None,
+    ):
+        """Forget the given participants of a conversation, or all of them."""
+        conversations = self._members.get(session)
+        members = conversations.get(conversation_id) if conversations else None
+
+        if conversations is None or members is None:
+            return
+
+        removed = members.copy() if user_ids is None else members & set(user_ids)
+        members -= removed
+
+        if user_ids is None or not members:
+            del conversations[conversation_id]
+
+        if not conversations:
+            del self._members[session]
+
+        watched = self._watched[session]
+
+        for user_id in removed:
+            watched[user_id] -= 1
+
+            if watched[user_id] > 0:
+                continue
+
+            del watched[user_id]
+            watchers = self._watchers[user_id]
+            watchers.discard(session)
+
+            if not watchers:
+                del self._watchers[user_id]
+
+        if not watched:
+            del self._watched[session]
+
+    def _add_interest(
+        self, session: "GatewaySession", channels: Iterable[str]
+    ) -> set[str]:
+        """Returns the channels that the backend has to start listening to."""
+        new_channels: set[str] = set()
+
+        for channel in channels:
+            sessions = self._interest.get(channel)
+
+            if sessions is None:
+                sessions = self._interest[channel] = set()
+                subscriber = self._subscribers[channel] = ChannelSubscriber(
+                    self.plugin, self, channel
+                )
+                plugin_subscribers = self.plugin._channels.setdefault(channel, set())
+
+                if not plugin_subscribers:
+                    new_channels.add(channel)
+
+                plugin_subscribers.add(subscriber)
+                fanout_channels.inc()
+
+            sessions.add(session)
+            self._channels_by_session.setdefault(session, set()).add(channel)
+
+        return new_channels
+
+    def _remove_interest(self, session: "GatewaySession", channel: str):
+        sessions = self._interest.get(channel)
+
+        if sessions is None or session not in sessions:
+            return
+
+        sessions.discard(session)
+        session_channels = self._channels_by_session[session]
+        session_channels.discard(channel)
+
+        if not session_channels:
+            del self._channels_by_session[session]
+
+        if not sessions:
+            del self._interest[channel]
+            subscriber = self._subscribers.pop(channel)
+            # the backend unsubscribes asynchronously, make sure nothing more arrives
+            # in the meantime
+            subscriber.active = False
+            self._spawn(self.plugin.unsubscribe(subscriber, channel))
+            fanout_channels.dec()
+
+    def _spawn(self, coro: Coroutine[Any, Any, None]):  # pyright: ignore[reportExplicitAny]
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+
+        _ = await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,141 @@
+import asyncio
+import math
+from collections.abc import Iterable
+from typing import Literal
+
+import msgspec
+from litestar.channels import ChannelsPlugin
+
+from app.domain.gateway.events import encode_event
+from app.lib.metrics import metrics
+from app.lib.timer_wheel import TimerWheel
+
+PRESENCE_CHANNEL = "gateway_presence"
+
+PresenceStatus = Literal["online", "offline"]
+
+online_users = metrics.gauge(
+    "gateway_online_users", "Users with at least one gateway connection"
+)
+presence_updates = metrics.counter(
+    "gateway_presence_updates_total",
+    "Presence changes that were published",
+    labels=("status",),
+)
+presence_suppressed = metrics.counter(
+    "gateway_presence_suppressed_total",
+    "Presence changes that were undone before they were published",
+)
+
+
+class PresenceData(msgspec.Struct, omit_defaults=True):
+    user_id: int
+    status: PresenceStatus
+    last_seen_at: float | None = None
+
+
+class PresenceTracker:
+    """
+    Which users are online, going by their gateway connections.
+
+    A user is online while at least one of their sockets is open, however many there
+    are. Going offline is delayed by `offline_delay` seconds so that a reconnect in the
+    meantime goes unnoticed, and changes are published in batches every
+    `batch_interval` seconds, skipping users who ended up where they started.
+
+    Each worker process keeps its own state, so presence is only accurate with a single
+    worker: the changes are published through the channels backend and reach every
+    worker, but `online_among` only knows about this worker's connections, and a user
+    connected to several workers goes offline once this worker has none of theirs.
+    """
+
+    def __init__(
+        self, channels: ChannelsPlugin, offline_delay: float, batch_interval: float
+    ) -> None:
+        self.channels: ChannelsPlugin = channels
+        self.offline_delay: float = offline_delay
+        self.batch_interval: float = batch_interval
+
+        self._connections: dict[int, int] = {}
+        self._last_seen: dict[int, float] = {}
+        self._online: set[int] = set()
+        self._pending: set[int] = set()
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._going_offline: TimerWheel[int] = TimerWheel(
+            self._mark, resolution=1, slots=math.ceil(offline_delay) + 2
+        )
+
+    def online_among(self, user_ids: Iterable[int]) -> list[PresenceData]:
+        return [
+            PresenceData(user_id=user_id, status="online")
+            for user_id in user_ids
+            if user_id in self._online
+        ]
+
+    def connect(self, user_id: int):
+        self._connections[user_id] = self._connections.get(user_id, 0) + 1
+
+        if self._connections[user_id] == 1:
+            self._going_offline.discard(user_id)
+            self._mark(user_id)
+
+    def disconnect(self, user_id: int, last_seen: float):
+        """
+        `last_seen` is when the client was last heard from, which is earlier than now if
+        it stopped sending heartbeats.
+        """
+        self._last_seen[user_id] = max(self._last_seen.get(user_id, 0), last_seen)
+        self._connections[user_id] -= 1
+
+        if self._connections[user_id] == 0:
+            del self._connections[user_id]
+            self._going_offline.add(user_id, self.offline_delay)
+
+    def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        self._going_offline.close()
+
+    def _mark(self, user_id: int):
+        self._pending.add(user_id)
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_interval, self._flush
+            )
+
+    def _flush(self):
+        pending, self._pending = self._pending, set()
+        self._flush_handle = None
+
+        for user_id in pending:
+            online = user_id in self._connections
+
+            if online == (user_id in self._online):
+                presence_suppressed.inc()
+                continue
+
+            if online:
+                self._online.add(user_id)
+                online_users.inc()
+                data = PresenceData(user_id=user_id, status="online")
+            else:
+                self._online.discard(user_id)
+                online_users.dec()
+                data = PresenceData(
+                    user_id=user_id,
+                    status="offline",
+                    last_seen_at=self._last_seen.pop(user_id, None),
+                )
+
+            presence_updates.inc(1, data.status)
+            self.channels.publish(  # pyright: ignore[reportUnknownMemberType]
+                encode_event("PRESENCE_UPDATE", data), PRESENCE_CHANNEL
+            )
+
+        # nothing to remember for users who came back before going offline
+        for user_id in pending:
+            if user_id in self._connections:
+                _ = self._last_seen.pop(user_id, None)
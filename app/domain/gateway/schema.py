@@ -0,0 +1,40 @@
+from msgspec import Struct
+
+
+class Heartbeat(Struct, tag_field="op", tag="HEARTBEAT"):
+    d: int | None = None
+    """The last sequence number the client received."""
+
+
+class SendMessageData(Struct):
+    conversation_id: int
+    content: str | None = None
+    reply_to_id: int | None = None
+
+
+class SendMessage(Struct, tag_field="op", tag="SEND_MESSAGE"):
+    d: SendMessageData
+    nonce: str | None = None
+    """Echoed back in the `COMMAND_RESULT` of this command."""
+
+
+class StartTypingData(Struct):
+    conversation_id: int
+
+
+class StartTyping(Struct, tag_field="op", tag="TYPING_START"):
+    d: StartTypingData
+    nonce: str | None = None
+
+
+class AckData(Struct):
+    conversation_id: int
+    message_id: int
+
+
+class Ack(Struct, tag_field="op", tag="ACK"):
+    d: AckData
+    nonce: str | None = None
+
+
+GatewayCommand = Heartbeat | SendMessage | StartTyping | Ack
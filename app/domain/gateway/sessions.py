@@ -0,0 +1,207 @@
+import asyncio
+import secrets
+from collections import deque
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from litestar import Litestar
+from litestar.channels import ChannelsPlugin
+from litestar.datastructures import State
+
+from app.config import settings
+from app.domain.gateway.connections import (
+    CLOSE_SESSION_REPLACED,
+    ConnectionWriters,
+    FanoutBatch,
+    GatewayConnection,
+)
+from app.domain.gateway.events import EPHEMERAL_EVENTS, GatewayEvent
+from app.domain.gateway.fanout import GatewayFanout
+from app.domain.gateway.presence import PresenceTracker
+from app.lib.metrics import metrics
+
+sessions_gauge = metrics.gauge(
+    "gateway_sessions", "Number of gateway sessions, including detached ones"
+)
+
+
+class GatewaySession:
+    """
+    The server side of a gateway session.
+
+    A session outlives the connection it was created on: events keep being numbered and
+    buffered for a while after the socket goes away, so that a client reconnecting with
+    the session ID and the last sequence number it saw only receives what it missed.
+    """
+
+    def __init__(self, session_id: str, user_id: int, replay_buffer_size: int) -> None:
+        self.session_id: str = session_id
+        self.user_id: int = user_id
+        self.seq: int = 0
+        self.connection: GatewayConnection | None = None
+
+        self._buffer: deque[tuple[int, bytes]] = deque(maxlen=replay_buffer_size)
+        self._expiry: asyncio.TimerHandle | None = None
+
+    def deliver(self, event: GatewayEvent, batch: FanoutBatch | None = None):
+        if event.type in EPHEMERAL_EVENTS:
+            if self.connection is not None:
+                _ = self.connection.send(
+                    event.payload, event_type=event.type, droppable=True, batch=batch
+                )
+
+            return
+
+        self.seq += 1
+        self._buffer.append((self.seq, event.payload))
+
+        if self.connection is not None:
+            _ = self.connection.send(
+                event.payload, self.seq, event_type=event.type, batch=batch
+            )
+
+    def attach(
+        self,
+        connection: GatewayConnection,
+        first_payload: bytes,
+        seq: int | None = None,
+    ) -> bool:
+        """
+        Start delivering events to `connection`, after sending `first_payload` and, when
+        resuming, every buffered event after `seq`.
+
+        Returns `False` without attaching if the events after `seq` are no longer
+        buffered, in which case the client has to start over with a new session.
+        """
+        if seq is not None:
+            oldest = self._buffer[0][0] if self._buffer else self.seq + 1
+
+            if seq > self.seq or seq + 1 < oldest:
+                return False
+
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+
+        if self.connection is not None and self.connection is not connection:
+            self.connection.abort(CLOSE_SESSION_REPLACED, "Session resumed elsewhere")
+
+        connection.enqueue(first_payload)
+
+        if seq is not None:
+            for event_seq, payload in self._buffer:
+                if event_seq > seq:
+                    connection.enqueue(payload, event_seq)
+
+        self.connection = connection
+
+        return True
+
+    def detach(self, connection: GatewayConnection, timeout: float, on_expire: Any):  # pyright: ignore[reportExplicitAny]
+        if self.connection is not None and self.connection is not connection:
+            return
+
+        self.connection = None
+
+        if self._expiry is not None:
+            self._expiry.cancel()
+
+        self._expiry = asyncio.get_running_loop().call_later(timeout, on_expire, self)
+
+    def close(self):
+        if self._expiry is not None:
+            self._expiry.cancel()
+
+
+class GatewaySessions:
+    def __init__(
+        self,
+        fanout: GatewayFanout,
+        writers: ConnectionWriters,
+        presence: PresenceTracker,
+        replay_buffer_size: int,
+        resume_timeout: float,
+    ) -> None:
+        self.fanout: GatewayFanout = fanout
+        self.writers: ConnectionWriters = writers
+        self.presence: PresenceTracker = presence
+        self.replay_buffer_size: int = replay_buffer_size
+        self.resume_timeout: float = resume_timeout
+
+        self._sessions: dict[str, GatewaySession] = {}
+
+    async def create(
+        self, user_id: int, subscriptions: list[str], members: dict[int, list[int]]
+    ) -> GatewaySession:
+        session = GatewaySession(
+            secrets.token_urlsafe(16), user_id, self.replay_buffer_size
+        )
+        await self.fanout.subscribe(session, subscriptions, members)
+        self._sessions[session.session_id] = session
+        sessions_gauge.inc()
+
+        return session
+
+    def get(self, session_id: str, user_id: int) -> GatewaySession | None:
+        session = self._sessions.get(session_id)
+
+        if session is None or session.user_id != user_id:
+            return None
+
+        return session
+
+    def detach(self, session: GatewaySession, connection: GatewayConnection):
+        session.detach(connection, self.resume_timeout, self._expire)
+
+    def _expire(self, session: GatewaySession):
+        self.delete(session)
+
+    def delete(self, session: GatewaySession):
+        """Forget the session and unsubscribe it, unless that already happened."""
+        if self._sessions.get(session.session_id) is not session:
+            return
+
+        del self._sessions[session.session_id]
+        sessions_gauge.dec()
+        self.fanout.unsubscribe(session)
+        session.close()
+
+    async def close(self):
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        sessions_gauge.dec(len(sessions))
+
+        for session in sessions:
+            self.fanout.unsubscribe(session)
+            session.close()
+
+        self.presence.close()
+        await self.fanout.close()
+        await self.writers.close()
+
+
+@asynccontextmanager
+async def gateway_sessions_lifespan(app: Litestar) -> AsyncGenerator[None]:
+    channels = app.plugins.get(ChannelsPlugin)
+    sessions = GatewaySessions(
+        GatewayFanout(channels),
+        ConnectionWriters(settings.app.GATEWAY_WRITER_WORKERS),
+        PresenceTracker(
+            channels,
+            settings.app.PRESENCE_OFFLINE_DELAY,
+            settings.app.PRESENCE_BATCH_INTERVAL,
+        ),
+        settings.app.GATEWAY_REPLAY_BUFFER_SIZE,
+        settings.app.GATEWAY_RESUME_TIMEOUT,
+    )
+    app.state.gateway_sessions = sessions
+
+    try:
+        yield
+    finally:
+        await sessions.close()
+
+
+def provide_gateway_sessions(state: State) -> GatewaySessions:
+    return state.gateway_sessions  # pyright: ignore[reportAny]
@@ -32,6 +32,7 @@ from app.domain.quizzes.dependencies import (
 from app.domain.quizzes.models import Quiz, QuizCreate, QuizQuestionCreate, QuizUpdate
 from app.domain.quizzes.repositories import QuizQuestionsRepository, QuizzesRepository
 from app.domain.quizzes.schemas import CreateQuizFromFile
+from app.server.idempotency import IdempotencyMiddleware
 
 
 class AIQuiz(msgspec.Struct):
@@ -60,7 +61,12 @@ class QuizzesController(Controller):
         else:
             self.openai_client = None
 
-    @post(urls.CREATE_QUIZ, operation_id="CreateQuiz", summary="Create quiz")
+    @post(
+        urls.CREATE_QUIZ,
+        operation_id="CreateQuiz",
+        summary="Create quiz",
+        middleware=[IdempotencyMiddleware()],
+    )
     async def create_quiz(
         self,
         data: QuizCreate,
@@ -85,6 +91,7 @@ class QuizzesController(Controller):
         operation_id="CreateQuizFromFile",
         summary="Create quiz from file",
         raises=[ClientException, ImproperlyConfiguredException],
+        middleware=[IdempotencyMiddleware()],
     )
     async def create_quiz_from_file(
         self,
@@ -0,0 +1,47 @@
+import secrets
+from typing import Any, final
+
+from litestar import Controller, MediaType, get
+from litestar.connection import ASGIConnection
+from litestar.exceptions import NotAuthorizedException, NotFoundException
+from litestar.handlers import BaseRouteHandler
+
+from app.config import settings
+from app.lib.metrics import metrics
+
+
+def metrics_token_guard(
+    connection: ASGIConnection[Any, Any, Any, Any],  # pyright: ignore[reportExplicitAny]
+    _: BaseRouteHandler,
+) -> None:
+    """
+    Metrics are only served to scrapers sending `METRICS_TOKEN` as a bearer token, and
+    not at all unless it's set, since they tell a lot about the users' activity.
+    """
+    token = settings.app.METRICS_TOKEN
+
+    if not token:
+        raise NotFoundException
+
+    if not secrets.compare_digest(
+        connection.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        raise NotAuthorizedException("invalid metrics token")
+
+
+@final
+class SystemController(Controller):
+    tags = ["System"]
+
+    @get(
+        "/metrics",
+        operation_id="GetMetrics",
+        summary="Process metrics in the Prometheus text format",
+        media_type=MediaType.TEXT,
+        guards=[metrics_token_guard],
+        # the guard checks the token instead of a user's
+        exclude_from_auth=True,
+        include_in_schema=False,
+    )
+    async def get_metrics(self) -> str:
+        return metrics.render()
@@ -0,0 +1,37 @@
+import sqlite3
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import aiosqlite
+
+
+class SQLiteArchives:
+    """
+    A directory of SQLite databases, one per period, named `{prefix}-{period}.sqlite3`.
+
+    Archives are written by attaching them to a connection to the main database, and
+    read by opening them on their own, read-only, only when something is looked up in
+    them. The same queries run against either, as long as the archive has the same
+    tables.
+    """
+
+    def __init__(self, directory: Path, prefix: str, busy_timeout: int = 1000) -> None:
+        self.directory: Path = directory
+        self.prefix: str = prefix
+        self.busy_timeout: int = busy_timeout
+
+    def path(self, period: str) -> Path:
+        return self.directory / f"{self.prefix}-{period}.sqlite3"
+
+    @asynccontextmanager
+    async def open(self, period: str) -> AsyncGenerator[aiosqlite.Connection]:
+        async with aiosqlite.connect(
+            f"{self.path(period).resolve().as_uri()}?mode=ro",
+            uri=True,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+        ) as connection:
+            connection.row_factory = aiosqlite.Row
+            _ = await connection.execute(f"PRAGMA busy_timeout={self.busy_timeout}")
+
+            yield connection
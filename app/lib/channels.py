@@ -0,0 +1,181 @@
+# pyright: reportAny=false
+import asyncio
+import contextlib
+import time
+from collections.abc import AsyncGenerator, Iterable
+from pathlib import Path
+from typing import override
+
+import aiosqlite
+from litestar.channels.backends.base import ChannelsBackend
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_events_channel_id ON channel_events(channel, id);
+CREATE INDEX IF NOT EXISTS channel_events_created_at ON channel_events(created_at);
+"""
+
+
+class SQLiteChannelsBackend(ChannelsBackend):
+    """
+    A channels backend that shares events between processes on the same host through an
+    append-only table in a dedicated SQLite database.
+
+    Every process appends published events to the table and tails it from the last id it
+    has seen. Commits from other processes are detected by polling `PRAGMA data_version`,
+    which is answered from memory without touching the table, while events published by
+    this process wake the reader up immediately. Events older than `retention` seconds
+    are pruned, so the table only ever holds a short window of traffic.
+    """
+
+    def __init__(
+        self,
+        database_path: str | Path,
+        *,
+        poll_interval: float = 0.005,
+        retention: float = 60,
+        batch_size: int = 1000,
+    ) -> None:
+        self._database_path: str | Path = database_path
+        self._poll_interval: float = poll_interval
+        self._retention: float = retention
+        self._batch_size: int = batch_size
+
+        self._channels: set[str] = set()
+        self._writer: aiosqlite.Connection | None = None
+        self._reader: aiosqlite.Connection | None = None
+        self._last_id: int = 0
+        self._data_version: int | None = None
+        self._last_prune: float = 0
+        self._wakeup: asyncio.Event = asyncio.Event()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # autocommit, so that the reader never holds a snapshot between polls
+        connection = await aiosqlite.connect(self._database_path, isolation_level=None)
+        _ = await connection.execute("PRAGMA journal_mode=WAL")
+        _ = await connection.execute("PRAGMA synchronous=NORMAL")
+        _ = await connection.execute("PRAGMA busy_timeout=5000")
+
+        return connection
+
+    @override
+    async def on_startup(self) -> None:
+        self._writer = await self._connect()
+        _ = await self._writer.executescript(_SCHEMA)
+
+        self._reader = await self._connect()
+
+        # only deliver events published after this process started
+        async with self._reader.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM channel_events"
+        ) as cursor:
+            row = await cursor.fetchone()
+            self._last_id = row[0] if row is not None else 0
+
+        self._wakeup = asyncio.Event()
+
+    @override
+    async def on_shutdown(self) -> None:
+        for connection in (self._reader, self._writer):
+            if connection is not None:
+                await connection.close()
+
+        self._reader = None
+        self._writer = None
+
+    @override
+    async def publish(self, data: bytes, channels: Iterable[str]) -> None:
+        if self._writer is None:
+            raise RuntimeError(
+                "Backend not yet initialized. Did you forget to call on_startup?"
+            )
+
+        now = time.time()
+        _ = await self._writer.executemany(
+            "INSERT INTO channel_events (channel, data, created_at) VALUES (?, ?, ?)",
+            [(channel, data, now) for channel in channels],
+        )
+
+        self._wakeup.set()
+
+        if now - self._last_prune > self._retention / 2:
+            self._last_prune = now
+            _ = await self._writer.execute(
+                "DELETE FROM channel_events WHERE created_at < ?",
+                (now - self._retention,),
+            )
+
+    @override
+    async def subscribe(self, channels: Iterable[str]) -> None:
+        self._channels.update(channels)
+
+    @override
+    async def unsubscribe(self, channels: Iterable[str]) -> None:
+        self._channels.difference_update(channels)
+
+    async def _wait_for_changes(self, reader: aiosqlite.Connection):
+        while True:
+            with contextlib.suppress(TimeoutError):
+                _ = await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+
+            if self._wakeup.is_set():
+                self._wakeup.clear()
+                return
+
+            async with reader.execute("PRAGMA data_version") as cursor:
+                row = await cursor.fetchone()
+
+            data_version: int | None = row[0] if row is not None else None
+
+            if data_version != self._data_version:
+                self._data_version = data_version
+                return
+
+    @override
+    async def stream_events(self) -> AsyncGenerator[tuple[str, bytes]]:
+        if self._reader is None:
+            raise RuntimeError(
+                "Backend not yet initialized. Did you forget to call on_startup?"
+            )
+
+        reader = self._reader
+
+        while True:
+            await self._wait_for_changes(reader)
+
+            # drain everything that was committed since the last poll
+            while True:
+                async with reader.execute(
+                    "SELECT id, channel, data FROM channel_events WHERE id > ? ORDER BY id LIMIT ?",
+                    (self._last_id, self._batch_size),
+                ) as cursor:
+                    rows = await cursor.fetchall()
+
+                for event_id, channel, data in rows:
+                    self._last_id = event_id
+
+                    if channel in self._channels:
+                        yield channel, data
+
+                if len(rows) < self._batch_size:
+                    break
+
+    @override
+    async def get_history(self, channel: str, limit: int | None = None) -> list[bytes]:
+        if self._reader is None:
+            raise RuntimeError(
+                "Backend not yet initialized. Did you forget to call on_startup?"
+            )
+
+        async with self._reader.execute(
+            "SELECT data FROM channel_events WHERE channel = ? ORDER BY id DESC LIMIT ?",
+            (channel, -1 if limit is None else limit),
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+        return [row[0] for row in reversed(rows)]
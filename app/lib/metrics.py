@@ -0,0 +1,161 @@
+import bisect
+import math
+from collections import defaultdict
+from collections.abc import Sequence
+from typing import ClassVar
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values, strict=True)]
+
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    type: ClassVar[str]
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labels: tuple[str, ...] = tuple(labels)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join(
+            [
+                f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.type}",
+                *self.samples(),
+            ]
+        )
+
+
+class Counter(Metric):
+    type: ClassVar[str] = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: defaultdict[tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, *labels: str):
+        self.values[labels] += amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    type: ClassVar[str] = "gauge"
+
+    def dec(self, amount: float = 1, *labels: str):
+        self.values[labels] -= amount
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    type: ClassVar[str] = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        labels: Sequence[str] = (),
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets: list[float] = sorted(buckets)
+        self.counts: defaultdict[tuple[str, ...], list[int]] = defaultdict(
+            lambda: [0] * (len(self.buckets) + 1)
+        )
+        self.sums: defaultdict[tuple[str, ...], float] = defaultdict(float)
+
+    def observe(self, value: float, *labels: str):
+        self.counts[labels][bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def samples(self) -> list[str]:
+        lines: list[str] = []
+
+        for labels, counts in self.counts.items():
+            cumulative = 0
+
+            for upper, count in zip([*self.buckets, math.inf], counts, strict=True):
+                cumulative += count
+                bucket_labels = _format_labels(
+                    self.labels, labels, f'le="{_format_value(upper)}"'
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+
+            label_text = _format_labels(self.labels, labels)
+            lines.append(
+                f"{self.name}_sum{label_text} {_format_value(self.sums[labels])}"
+            )
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-local metrics, exposed in the Prometheus text format.
+
+    Every worker process keeps its own values, so scrape each worker separately when
+    running more than one.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def _register[T: Metric](self, metric: T) -> T:
+        if (existing := self._metrics.get(metric.name)) is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"metric {metric.name!r} is already registered")
+
+            return existing  # pyright: ignore[reportReturnType]
+
+        self._metrics[metric.name] = metric
+
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labels: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float],
+        labels: Sequence[str] = (),
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets, labels))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+metrics = MetricsRegistry()
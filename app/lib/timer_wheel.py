@@ -0,0 +1,91 @@
+import asyncio
+import math
+from collections.abc import Callable, Hashable
+
+
+class TimerWheel[K: Hashable]:
+    """
+    Expires keys after a delay, with a single event loop timer for all of them.
+
+    Keys are put into one of `slots` buckets according to when they expire, and a tick
+    every `resolution` seconds expires everything in the current bucket. Adding,
+    rescheduling and removing a key are O(1), and the wheel stops ticking while empty.
+    Delays are rounded up to a whole number of ticks, and must be shorter than a full
+    turn of the wheel.
+    """
+
+    def __init__(
+        self,
+        on_expire: Callable[[K], object] | None = None,
+        resolution: float = 0.5,
+        slots: int = 64,
+    ) -> None:
+        self.resolution: float = resolution
+        self.max_delay: float = resolution * (slots - 1)
+
+        self._on_expire: Callable[[K], object] | None = on_expire
+        self._slots: list[set[K]] = [set() for _ in range(slots)]
+        self._slot_by_key: dict[K, int] = {}
+        self._position: int = 0
+        self._handle: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        return len(self._slot_by_key)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._slot_by_key
+
+    def add(self, key: K, delay: float):
+        """Expire `key` after `delay` seconds, replacing its previous expiry if any."""
+        if delay > self.max_delay:
+            raise ValueError(f"delay must be at most {self.max_delay} seconds")
+
+        self.discard(key)
+
+        slot = (self._position + max(1, math.ceil(delay / self.resolution))) % len(
+            self._slots
+        )
+        self._slots[slot].add(key)
+        self._slot_by_key[key] = slot
+
+        if self._handle is None:
+            loop = asyncio.get_running_loop()
+            self._handle = loop.call_at(loop.time() + self.resolution, self._tick)
+
+    def discard(self, key: K):
+        slot = self._slot_by_key.pop(key, None)
+
+        if slot is not None:
+            self._slots[slot].discard(key)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        for slot in self._slots:
+            slot.clear()
+
+        self._slot_by_key.clear()
+
+    def _tick(self):
+        self._position = (self._position + 1) % len(self._slots)
+        expired = self._slots[self._position]
+        self._slots[self._position] = set()
+
+        for key in expired:
+            del self._slot_by_key[key]
+
+        if self._slot_by_key:
+            # scheduled from the previous deadline rather than from now, so that ticks
+            # don't drift when the loop is busy
+            assert self._handle is not None
+            self._handle = asyncio.get_running_loop().call_at(
+                self._handle.when() + self.resolution, self._tick
+            )
+        else:
+            self._handle = None
+
+        if self._on_expire is not None:
+            for key in expired:
+                _ = self._on_expire(key)
@@ -0,0 +1,72 @@
+import heapq
+
+
+class _Node:
+    __slots__: tuple[str, ...] = ("children", "weight")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.weight: int | None = None
+
+
+class PrefixTrie:
+    """
+    Weighted strings looked up by prefix, for autocompletion.
+
+    Finding the completions of a prefix walks down one node per character and then
+    visits only the strings under it, so it stays fast however many strings start
+    with something else. Results are remembered until the next insert, so repeating
+    a lookup costs a dictionary access.
+    """
+
+    def __init__(self) -> None:
+        self._root: _Node = _Node()
+        self._size: int = 0
+        self._top: dict[tuple[str, int], list[tuple[str, int]]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key: str, weight: int):
+        """Add `key`, or replace its weight if it's already there."""
+        node = self._root
+
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+
+        if node.weight is None:
+            self._size += 1
+
+        node.weight = weight
+        self._top.clear()
+
+    def top(self, prefix: str, limit: int) -> list[tuple[str, int]]:
+        """The `limit` heaviest keys starting with `prefix`, heaviest first."""
+        if (top := self._top.get((prefix, limit))) is not None:
+            return top
+
+        node = self._root
+
+        for char in prefix:
+            if (child := node.children.get(char)) is None:
+                return []
+
+            node = child
+
+        keys: list[tuple[str, int]] = []
+        stack = [(prefix, node)]
+
+        while stack:
+            key, node = stack.pop()
+
+            if node.weight is not None:
+                keys.append((key, node.weight))
+
+            stack.extend((key + char, child) for char, child in node.children.items())
+
+        # ties are broken alphabetically, which puts a word before its longer forms
+        top = self._top[(prefix, limit)] = heapq.nsmallest(
+            limit, keys, key=lambda item: (-item[1], item[0])
+        )
+
+        return top
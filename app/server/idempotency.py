@@ -0,0 +1,409 @@
+import asyncio
+import contextlib
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+
+import msgspec
+from litestar import Litestar
+from litestar.datastructures import State
+from litestar.enums import ScopeType
+from litestar.exceptions import ClientException
+from litestar.middleware import ASGIMiddleware
+from litestar.status_codes import HTTP_422_UNPROCESSABLE_ENTITY
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings, sqlite
+from app.database.queries import queries
+from app.lib.metrics import metrics
+
+IDEMPOTENCY_KEY_HEADER = b"idempotency-key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+idempotent_replays = metrics.counter(
+    "http_idempotent_replays_total",
+    "Retried requests answered with the response stored for their idempotency key",
+    labels=("source",),
+)
+idempotent_waits = metrics.counter(
+    "http_idempotent_waits_total",
+    "Retried requests that waited for the original request to finish",
+)
+
+# (user ID, method, path, idempotency key)
+_Key = tuple[int, str, str, str]
+
+
+class StoredResponse(msgspec.Struct):
+    request_hash: bytes
+    """Empty for responses stored before requests were hashed, which match any request."""
+    status_code: int
+    content_type: str | None
+    body: bytes
+    created_at: float
+
+
+class IdempotencyKeys:
+    """
+    Responses to recent requests sent with an `Idempotency-Key` header, so that a
+    client retrying a request it never got the response to gets that response instead
+    of the work being done twice.
+
+    The `max_size` most recently used responses are kept in memory, and all of them in
+    the database for `ttl`, so that the key survives restarts and works across worker
+    processes. A retry that arrives while the original is still running waits for it,
+    though only within the same worker process.
+
+    Responses are stored once the request's work is committed, so this is a best effort:
+    if the process dies in between, or the database is too busy to store the response
+    and the worker that has it in memory isn't the one retried, the work is done again.
+    """
+
+    def __init__(self, max_size: int, ttl: timedelta) -> None:
+        self.max_size: int = max_size
+        self.ttl: timedelta = ttl
+
+        self._responses: OrderedDict[_Key, StoredResponse] = OrderedDict()
+        self._in_flight: dict[_Key, asyncio.Future[None]] = {}
+
+    def get(self, key: _Key) -> StoredResponse | None:
+        response = self._responses.get(key)
+
+        if response is None:
+            return None
+
+        if time.time() - response.created_at > self.ttl.total_seconds():
+            del self._responses[key]
+            return None
+
+        self._responses.move_to_end(key)
+
+        return response
+
+    def put(self, key: _Key, response: StoredResponse):
+        self._responses[key] = response
+        self._responses.move_to_end(key)
+
+        while len(self._responses) > self.max_size:
+            _ = self._responses.popitem(last=False)
+
+    def in_flight(self, key: _Key) -> asyncio.Future[None] | None:
+        return self._in_flight.get(key)
+
+    def start(self, key: _Key):
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+
+    def finish(self, key: _Key):
+        """Wake up the retries waiting for the request, however it ended."""
+        future = self._in_flight.pop(key, None)
+
+        if future is not None and not future.done():
+            future.set_result(None)
+
+
+async def _load_response(
+    state: State, key: _Key, ttl: timedelta
+) -> StoredResponse | None:
+    user_id, method, path, idempotency_key = key
+
+    async with sqlite.borrow_connection(state) as db_connection:
+        row = await queries.idempotency_keys.get(
+            db_connection,
+            user_id=user_id,
+            method=method,
+            path=path,
+            key=idempotency_key,
+            after=datetime.now(UTC) - ttl,
+        )
+
+    if row is None:
+        return None
+
+    return StoredResponse(
+        request_hash=row["request_hash"],
+        status_code=row["status_code"],
+        content_type=row["content_type"],
+        body=row["body"],
+        created_at=row["created_at"].replace(tzinfo=UTC).timestamp(),
+    )
+
+
+async def _store_response(state: State, key: _Key, response: StoredResponse):
+    user_id, method, path, idempotency_key = key
+
+    async with sqlite.borrow_connection(state) as db_connection:
+        _ = await queries.idempotency_keys.insert(
+            db_connection,
+            user_id=user_id,
+            method=method,
+            path=path,
+            key=idempotency_key,
+            request_hash=response.request_hash,
+            status_code=response.status_code,
+            content_type=response.content_type,
+            body=response.body,
+            created_at=datetime.fromtimestamp(response.created_at, UTC),
+        )
+        await db_connection.commit()
+
+
+def _multipart_boundary(content_type: str) -> bytes | None:
+    media_type, *params = content_type.split(";")
+
+    if media_type.strip().lower() != "multipart/form-data":
+        return None
+
+    for param in params:
+        name, _, value = param.strip().partition("=")
+
+        if name.lower() == "boundary" and value:
+            return value.strip('"').encode("latin-1")
+
+    return None
+
+
+def _hash_request(method: str, path: str, content_type: str, body: bytes) -> bytes:
+    """
+    Hash what makes a request the same as another. Clients pick a new random boundary
+    for every multipart body, retries included, so those are hashed part by part,
+    without the boundary between them.
+    """
+    boundary = _multipart_boundary(content_type)
+    parts = [body] if boundary is None else body.split(b"--" + boundary)
+    request_hash = hashlib.sha256(b"\0".join((method.encode(), path.encode())))
+
+    for part in parts:
+        request_hash.update(len(part).to_bytes(8) + part)
+
+    return request_hash.digest()
+
+
+async def _read_body(receive: Receive) -> tuple[bytes, Receive]:
+    """
+    Read the whole request body, and return it with a `receive` that hands it to the
+    app again.
+    """
+    received: list[Message] = []
+
+    while True:
+        message = await receive()
+        received.append(message)
+
+        if message["type"] != "http.request" or not message.get("more_body", False):
+            break
+
+    body = b"".join(m.get("body", b"") for m in received if m["type"] == "http.request")
+
+    async def replay_received() -> Message:
+        if received:
+            return received.pop(0)
+
+        return await receive()
+
+    return body, replay_received
+
+
+def _check_request_hash(response: StoredResponse, request_hash: bytes):
+    if response.request_hash and response.request_hash != request_hash:
+        raise ClientException(
+            "Idempotency-Key was already used for a different request",
+            status_code=HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+
+async def _replay_response(response: StoredResponse, send: Send):
+    headers = [
+        (b"content-length", str(len(response.body)).encode()),
+        (b"idempotent-replayed", b"true"),
+    ]
+
+    if response.content_type is not None:
+        headers.append((b"content-type", response.content_type.encode()))
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": headers,
+        }
+    )
+    await send({"type": "http.response.body", "body": response.body})
+
+
+class IdempotencyMiddleware(ASGIMiddleware):
+    """
+    Lets clients safely retry a request by sending it with an `Idempotency-Key` header.
+
+    The first request with a key runs as usual, and its response is stored unless it
+    was a server error, which may well go away on a retry. Requests from the same user
+    to the same endpoint with the same key and body then get that response instead of
+    running again, for as long as the key is kept, and ones with a different body are
+    rejected with a 422. Multipart bodies are compared without their boundary. Only for handlers of authenticated users, since keys are
+    scoped to the user.
+    """
+
+    scopes: tuple[ScopeType, ...] = (ScopeType.HTTP,)
+
+    async def handle(
+        self, scope: Scope, receive: Receive, send: Send, next_app: ASGIApp
+    ) -> None:
+        idempotency_key = next(
+            (
+                value.decode("latin-1")
+                for name, value in scope["headers"]
+                if name == IDEMPOTENCY_KEY_HEADER
+            ),
+            None,
+        )
+
+        if idempotency_key is None:
+            return await next_app(scope, receive, send)
+
+        if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise ClientException(
+                f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters long"
+            )
+
+        body, receive = await _read_body(receive)
+        request_hash = _hash_request(
+            scope["method"],
+            scope["path"],
+            next(
+                (
+                    value.decode("latin-1")
+                    for name, value in scope["headers"]
+                    if name == b"content-type"
+                ),
+                "",
+            ),
+            body,
+        )
+        state: State = scope["app"].state
+        idempotency_keys: IdempotencyKeys = state.idempotency_keys  # pyright: ignore[reportAny]
+        key: _Key = (
+            scope["user"].id,  # pyright: ignore[reportAny]
+            scope["method"],
+            scope["path"],
+            idempotency_key,
+        )
+
+        while True:
+            if (response := idempotency_keys.get(key)) is not None:
+                _check_request_hash(response, request_hash)
+                idempotent_replays.inc(1, "memory")
+                return await _replay_response(response, send)
+
+            if (in_flight := idempotency_keys.in_flight(key)) is None:
+                break
+
+            # the original may fail without storing anything, in which case the first
+            # retry to wake up runs in its place
+            idempotent_waits.inc()
+            await asyncio.shield(in_flight)
+
+        idempotency_keys.start(key)
+
+        try:
+            response = await _load_response(state, key, idempotency_keys.ttl)
+
+            if response is not None:
+                idempotency_keys.put(key, response)
+                _check_request_hash(response, request_hash)
+                idempotent_replays.inc(1, "database")
+                return await _replay_response(response, send)
+
+            messages: list[Message] = []
+
+            async def capture(message: Message):
+                messages.append(message)
+
+            # the response is held back until it's stored in memory, so that a retry
+            # sent as soon as the client gave up on this one finds it
+            await next_app(scope, receive, capture)
+
+            start = next(m for m in messages if m["type"] == "http.response.start")
+
+            if start["status"] < 500:
+                response = StoredResponse(
+                    request_hash=request_hash,
+                    status_code=start["status"],
+                    content_type=next(
+                        (
+                            value.decode("latin-1")
+                            for name, value in start.get("headers", [])
+                            if name.lower() == b"content-type"
+                        ),
+                        None,
+                    ),
+                    body=b"".join(
+                        m.get("body", b"")
+                        for m in messages
+                        if m["type"] == "http.response.body"
+                    ),
+                    created_at=time.time(),
+                )
+                idempotency_keys.put(key, response)
+        finally:
+            idempotency_keys.finish(key)
+
+        for message in messages:
+            await send(message)
+
+        if response is not None:
+            with contextlib.suppress(sqlite3.OperationalError):
+                # if the database is busy, the key is only remembered in memory
+                await _store_response(state, key, response)
+
+
+async def purge_idempotency_keys(
+    state: State, before: datetime, batch_size: int = 1000
+) -> int:
+    """Delete the responses stored before `before`. Returns how many there were."""
+    deleted = 0
+
+    async with sqlite.borrow_connection(state) as db_connection:
+        while True:
+            count = await queries.idempotency_keys.delete_before(
+                db_connection, before=before, limit=batch_size
+            )
+            await db_connection.commit()
+            deleted += count
+
+            if count < batch_size:
+                break
+
+            await asyncio.sleep(0)
+
+    return deleted
+
+
+@asynccontextmanager
+async def idempotency_keys_lifespan(app: Litestar) -> AsyncGenerator[None]:
+    ttl = timedelta(hours=settings.app.IDEMPOTENCY_KEY_TTL_HOURS)
+    app.state.idempotency_keys = IdempotencyKeys(
+        settings.app.IDEMPOTENCY_CACHE_SIZE, ttl
+    )
+
+    async def purge_periodically():
+        while True:
+            await asyncio.sleep(settings.app.IDEMPOTENCY_KEYS_PURGE_INTERVAL)
+
+            try:
+                _ = await purge_idempotency_keys(app.state, datetime.now(UTC) - ttl)
+            except sqlite3.OperationalError:
+                # the database was busy, there's always the next round
+                continue
+
+    task = asyncio.create_task(purge_periodically())
+
+    try:
+        yield
+    finally:
+        _ = task.cancel()
+
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
@@ -116,6 +116,19 @@ class SQLitePoolConfig:
         async with pool.connection() as generic_connection:
             yield cast(aiosqlite.Connection, cast(object, generic_connection))
 
+    @asynccontextmanager
+    async def borrow_connection(
+        self, state: State
+    ) -> AsyncGenerator[aiosqlite.Connection, Any]:
+        """
+        Borrow a pooled connection outside of dependency injection, e.g. for a websocket
+        or a background task, for only as long as it's needed.
+        """
+        pool: SQLiteConnectionPool = state[self.pool_app_state_key]
+
+        async with pool.connection() as generic_connection:
+            yield cast(aiosqlite.Connection, cast(object, generic_connection))
+
 
 class SQLitePoolPlugin(InitPluginProtocol):
     def __init__(self, config: SQLitePoolConfig | Sequence[SQLitePoolConfig]) -> None:
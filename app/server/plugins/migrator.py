@@ -6,7 +6,7 @@ import sqlite3
 import time
 from dataclasses import dataclass
 from datetime import UTC, datetime
-from errno import EINVAL, EISDIR
+from errno import EINVAL, EISDIR, ENOENT
 from pathlib import Path
 from typing import Literal, cast, override
 
@@ -81,6 +81,9 @@ def configure_connection(conn: sqlite3.Connection):
     _ = conn.setconfig(sqlite3.SQLITE_DBCONFIG_DQS_DML, False)
 
     with contextlib.closing(conn.cursor()) as cursor:
+        # only takes effect on a new database, before even the journal mode is set, or
+        # on `database vacuum`
+        _ = cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
         _ = cursor.execute("PRAGMA journal_mode=WAL")
         _ = cursor.execute("PRAGMA synchronous=NORMAL")
         _ = cursor.execute("PRAGMA foreign_keys=OFF")
@@ -281,6 +284,39 @@ class MigratorCLIPlugin(CLIPluginProtocol):
                 target_version=None,
             )
 
+        @db.command(
+            "vacuum",
+            help="Rebuilds the database to give free pages back to the filesystem, and lets databases created before incremental vacuuming was enabled shrink in the background from then on.",
+        )
+        @click.option(
+            "-D",
+            "--database-path",
+            help=f"Location of the DB, by default will be read from the DATABASE_PATH env var or `.env` files. (env: {settings.app.DATABASE_PATH})",
+            type=Path,
+            default=Path(settings.app.DATABASE_PATH)
+            if settings.app.DATABASE_PATH
+            else None,
+        )
+        def db_vacuum(*, database_path: Path | None):
+            if database_path is None:
+                rich.print(
+                    "[bold][red]error:[/red][/bold] no database path provided. provide one with --database-path or the DATABASE_PATH env var."
+                )
+                exit(EINVAL)
+
+            if not database_path.is_file():
+                rich.print(
+                    "[bold][red]error:[/red][/bold] given database path does not exist"
+                )
+                exit(ENOENT)
+
+            # VACUUM can't run inside a transaction
+            conn = sqlite3.connect(database_path, autocommit=True)
+
+            with contextlib.closing(conn):
+                _ = conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                _ = conn.execute("VACUUM")
+
         @cli.group(
             "migrate",
             invoke_without_command=False,
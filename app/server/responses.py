@@ -0,0 +1,60 @@
+# pyright: reportExplicitAny=false, reportAny=false
+from typing import Any, TypeVar, override
+
+from litestar import MediaType, Request, Response
+from litestar.response.base import ASGIResponse
+from litestar.serialization import default_serializer, encode_msgpack
+from litestar.types import Serializer
+from litestar.utils.helpers import get_enum_string_value
+
+T = TypeVar("T")
+
+MSGPACK_MEDIA_TYPES = (
+    "application/msgpack",
+    "application/vnd.msgpack",
+    MediaType.MESSAGEPACK.value,
+)
+
+
+class NegotiatedResponse(Response[T]):
+    """
+    A response that is sent as MessagePack instead of JSON when the client prefers it,
+    e.g. with `Accept: application/msgpack`.
+    """
+
+    @override
+    def to_asgi_response(
+        self,
+        app: Any,
+        request: Request[Any, Any, Any],
+        **kwargs: Any,
+    ) -> ASGIResponse:
+        media_type = get_enum_string_value(
+            self.media_type or kwargs.get("media_type") or MediaType.JSON
+        )
+
+        if media_type == MediaType.JSON and "msgpack" in request.headers.get(
+            "accept", ""
+        ):
+            preferred = request.accept.best_match(
+                [MediaType.JSON.value, *MSGPACK_MEDIA_TYPES]
+            )
+
+            if preferred in MSGPACK_MEDIA_TYPES:
+                self.media_type = preferred
+
+            self.headers.setdefault("vary", "Accept")
+
+        return super().to_asgi_response(app, request, **kwargs)
+
+    @override
+    def render(
+        self,
+        content: Any,
+        media_type: str,
+        enc_hook: Serializer = default_serializer,
+    ) -> bytes:
+        if media_type in MSGPACK_MEDIA_TYPES and not isinstance(content, bytes):
+            return encode_msgpack(content, enc_hook)
+
+        return super().render(content, media_type, enc_hook)
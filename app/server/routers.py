@@ -10,9 +10,11 @@ from app.domain.chat.controllers import (
     ConversationParticipantsController,
     ConversationsController,
     MessagesController,
+    SyncController,
 )
 from app.domain.gateway.controller import GatewayController
 from app.domain.quizzes.controllers import QuizQuestionsController, QuizzesController
+from app.domain.system.controller import SystemController
 from app.domain.tasks.controllers import TaskListsController, TasksController
 
 if TYPE_CHECKING:
@@ -26,9 +28,11 @@ route_handlers: "list[ControllerRouterHandler]" = [
     ConversationsController,
     ConversationParticipantsController,
     MessagesController,
+    SyncController,
     GatewayController,
     QuizQuestionsController,
     QuizzesController,
     TaskListsController,
     TasksController,
+    SystemController,
 ]
@@ -0,0 +1,644 @@
+import asyncio
+import platform
+import sqlite3
+import subprocess
+import tempfile
+from datetime import UTC, datetime
+from pathlib import Path
+
+import click
+import httpx
+import msgspec
+import rich
+from rich.table import Table
+
+from .fts import FtsResult, run_fts_bench
+from .load import LoadResult, run_load
+from .scenarios import (
+    LATENCY_BUDGETS_MS,
+    BenchContext,
+    FanoutResult,
+    http_scenarios,
+    run_gateway_fanout,
+    run_scenario,
+)
+from .seed import LoadSeedConfig, SeedConfig, seed_database, seed_load_database
+from .stats import ScenarioResult
+
+ROOT = Path(__file__).parent.parent
+
+
+class BenchMeta(msgspec.Struct):
+    commit: str | None
+    created_at: datetime
+    python: str
+    sqlite: str
+    platform: str
+    requests: int
+    concurrency: int
+    seed: SeedConfig
+    channels_backend: str = "memory"
+
+
+class BenchReport(msgspec.Struct):
+    meta: BenchMeta
+    http: dict[str, ScenarioResult] = msgspec.field(default_factory=dict)
+    gateway: dict[str, FanoutResult] = msgspec.field(default_factory=dict)
+
+
+class FtsMeta(msgspec.Struct):
+    commit: str | None
+    created_at: datetime
+    python: str
+    sqlite: str
+    platform: str
+    messages: int
+
+
+class FtsReport(msgspec.Struct):
+    meta: FtsMeta
+    results: list[FtsResult]
+
+
+class LoadMeta(msgspec.Struct):
+    commit: str | None
+    created_at: datetime
+    python: str
+    sqlite: str
+    platform: str
+    seed: LoadSeedConfig
+    channels_backend: str = "memory"
+
+
+class LoadReport(msgspec.Struct):
+    meta: LoadMeta
+    result: LoadResult
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return result.stdout.strip()
+
+
+async def run_bench(
+    report: BenchReport,
+    database_path: Path,
+    scenarios: tuple[str, ...],
+    receivers: tuple[int, ...],
+    events: int,
+):
+    from app.asgi import create_app
+    from app.config import settings, sqlite
+    from app.domain.accounts.guards import auth
+    from app.lib.crypt import hash_password
+
+    from .seed import PASSWORD
+
+    seed = seed_database(
+        database_path,
+        ROOT / "migrations",
+        await hash_password(PASSWORD),
+        report.meta.seed,
+    )
+
+    # the pool reads the path when opening connections, so pointing it elsewhere here
+    # guarantees that a DATABASE_PATH from `.env` is never written to
+    sqlite.database_path = database_path
+    settings.app.CHANNELS_BACKEND = report.meta.channels_backend
+    settings.app.CHANNELS_DATABASE_PATH = str(
+        database_path.with_name("channels.sqlite3")
+    )
+    app = create_app()
+
+    async with (
+        app.lifespan(),
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench.local"
+        ) as client,
+    ):
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"username": seed.primary_username, "password": seed.password},
+        )
+        _ = response.raise_for_status()
+
+        ctx = BenchContext(
+            app=app,
+            client=client,
+            seed=seed,
+            token=response.json()["access_token"],  # pyright: ignore[reportAny]
+            tokens_by_user_id={
+                user_id: auth.create_token(str(user_id))
+                for user_id in seed.fanout_user_ids
+            },
+        )
+
+        for name, scenario in http_scenarios(ctx).items():
+            if scenarios and name not in scenarios:
+                continue
+
+            rich.print(f"Running [cyan]{name}[/cyan]")
+            report.http[name] = await run_scenario(
+                scenario, report.meta.requests, report.meta.concurrency
+            )
+
+        for receiver_count in receivers:
+            if scenarios and "gateway_fanout" not in scenarios:
+                continue
+
+            rich.print(f"Running [cyan]gateway_fanout[/cyan] ({receiver_count})")
+            report.gateway[f"fanout_{receiver_count}"] = await run_gateway_fanout(
+                ctx, receiver_count, events
+            )
+
+        for receiver_count in receivers:
+            if scenarios and "gateway_fanout_zlib" not in scenarios:
+                continue
+
+            rich.print(f"Running [cyan]gateway_fanout_zlib[/cyan] ({receiver_count})")
+            report.gateway[f"fanout_zlib_{receiver_count}"] = await run_gateway_fanout(
+                ctx, receiver_count, events, compress=True
+            )
+
+        for receiver_count in receivers:
+            if scenarios and "gateway_fanout_msgpack" not in scenarios:
+                continue
+
+            rich.print(
+                f"Running [cyan]gateway_fanout_msgpack[/cyan] ({receiver_count})"
+            )
+            report.gateway[
+                f"fanout_msgpack_{receiver_count}"
+            ] = await run_gateway_fanout(
+                ctx, receiver_count, events, encoding="msgpack"
+            )
+
+
+async def run_load_test(
+    database_path: Path,
+    seed_config: LoadSeedConfig,
+    channels_backend: str,
+    messages: int,
+    rate: float,
+) -> LoadResult:
+    from app.asgi import create_app
+    from app.config import settings, sqlite
+    from app.domain.accounts.guards import auth
+    from app.lib.crypt import hash_password
+
+    from .seed import PASSWORD
+
+    seed = seed_load_database(
+        database_path,
+        ROOT / "migrations",
+        await hash_password(PASSWORD),
+        seed_config,
+    )
+
+    sqlite.database_path = database_path
+    settings.app.CHANNELS_BACKEND = channels_backend
+    settings.app.CHANNELS_DATABASE_PATH = str(
+        database_path.with_name("channels.sqlite3")
+    )
+    app = create_app()
+
+    async with (
+        app.lifespan(),
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench.local",
+            timeout=None,
+        ) as client,
+    ):
+        rich.print(
+            f"Running [cyan]load[/cyan] ({seed_config.clients} clients, "
+            + f"{messages} messages at {rate:g}/s)"
+        )
+
+        return await run_load(
+            app,
+            client,
+            seed,
+            {user_id: auth.create_token(str(user_id)) for user_id in seed.user_ids},
+            messages,
+            rate,
+        )
+
+
+def print_report(report: BenchReport):
+    table = Table(title=f"HTTP ({report.meta.commit or 'unknown commit'})")
+
+    for column in ("scenario", "rps", "p50 ms", "p99 ms", "max ms", "errors"):
+        table.add_column(column, justify="left" if column == "scenario" else "right")
+
+    for name, result in report.http.items():
+        table.add_row(
+            name,
+            f"{result.throughput_rps:.1f}",
+            f"{result.latency.p50_ms:.2f}",
+            f"{result.latency.p99_ms:.2f}",
+            f"{result.latency.max_ms:.2f}",
+            str(result.errors),
+        )
+
+    rich.print(table)
+
+    if not report.gateway:
+        return
+
+    table = Table(title="Gateway fan-out")
+
+    for column in (
+        "benchmark",
+        "events/s",
+        "delivery p50 ms",
+        "delivery p99 ms",
+        "completion p50 ms",
+        "completion p99 ms",
+        "timeouts",
+    ):
+        table.add_column(column, justify="left" if column == "benchmark" else "right")
+
+    for name, result in report.gateway.items():
+        table.add_row(
+            name,
+            f"{result.events_per_second:.1f}",
+            f"{result.delivery_latency.p50_ms:.2f}",
+            f"{result.delivery_latency.p99_ms:.2f}",
+            f"{result.completion_latency.p50_ms:.2f}",
+            f"{result.completion_latency.p99_ms:.2f}",
+            str(result.timeouts),
+        )
+
+    rich.print(table)
+
+
+def check_budgets(report: BenchReport) -> bool:
+    within_budget = True
+
+    for name, budget_ms in LATENCY_BUDGETS_MS.items():
+        result = report.http.get(name)
+
+        if result is None or result.latency.p99_ms <= budget_ms:
+            continue
+
+        within_budget = False
+        rich.print(
+            f"[red]{name} is over budget:[/red] p99 {result.latency.p99_ms:.2f} ms "
+            + f"> {budget_ms:.0f} ms"
+        )
+
+    return within_budget
+
+
+def print_load_report(report: LoadReport):
+    result = report.result
+    table = Table(
+        title=f"Gateway load ({report.meta.commit or 'unknown commit'}): "
+        + f"{result.clients} clients, {result.conversations} conversations"
+    )
+
+    for column in ("measure", "p50", "p90", "p99", "max"):
+        table.add_column(column, justify="left" if column == "measure" else "right")
+
+    for name, summary in (
+        ("send ms", result.send_latency),
+        ("delivery ms", result.delivery_latency),
+        ("event loop lag ms", result.event_loop_lag),
+    ):
+        table.add_row(
+            name,
+            f"{summary.p50_ms:.2f}",
+            f"{summary.p90_ms:.2f}",
+            f"{summary.p99_ms:.2f}",
+            f"{summary.max_ms:.2f}",
+        )
+
+    rich.print(table)
+    rich.print(
+        f"connected in {result.connect_seconds:.1f}s, "
+        + f"{result.memory_per_connection_kib:.1f} KiB per connection, "
+        + f"max RSS {result.max_rss_mib:.0f} MiB"
+    )
+    rich.print(
+        f"{result.deliveries} deliveries, {result.missed_deliveries} missed, "
+        + f"{result.send_errors} failed sends"
+    )
+
+
+def print_fts_report(report: FtsReport):
+    query_sets = list(report.results[0].matches) if report.results else []
+    table = Table(
+        title=f"Search tokenizers ({report.meta.commit or 'unknown commit'}): "
+        + f"{report.meta.messages} messages, p50 ms / matches per query set"
+    )
+
+    for column in ("tokenizer", "index KiB", "build s"):
+        table.add_column(column, justify="left" if column == "tokenizer" else "right")
+
+    for query_set in query_sets:
+        table.add_column(query_set, justify="right")
+
+    for result in report.results:
+        table.add_row(
+            result.tokenizer,
+            f"{result.index_kib:.0f}",
+            f"{result.build_seconds:.2f}",
+            *(
+                f"{result.latency[query_set].p50_ms:.2f} / {result.matches[query_set]}"
+                for query_set in query_sets
+            ),
+        )
+
+    rich.print(table)
+
+
+def format_change(old: float, new: float, *, higher_is_better: bool = False) -> str:
+    if old == 0:
+        return f"{new:.2f}"
+
+    change = (new - old) / old * 100
+    improved = change > 0 if higher_is_better else change < 0
+    color = "green" if improved else "red"
+
+    return f"{new:.2f} [{color}]({change:+.1f}%)[/{color}]"
+
+
+@click.group(help="Benchmarks for the HTTP API and the gateway.")
+def cli():
+    pass
+
+
+@cli.command("run", help="Seed a temporary database and run the benchmarks.")
+@click.option(
+    "-o",
+    "--output",
+    help="Where to write the JSON report. Defaults to bench/results/<commit>.json",
+    type=Path,
+    default=None,
+)
+@click.option("--requests", help="Requests per HTTP scenario", type=int, default=500)
+@click.option("--concurrency", help="Concurrent HTTP clients", type=int, default=10)
+@click.option(
+    "-s",
+    "--scenario",
+    "scenarios",
+    help="Only run the given scenarios (repeatable), e.g. search or gateway_fanout",
+    multiple=True,
+)
+@click.option(
+    "--receivers",
+    help="Number of gateway receivers for the fan-out benchmark (repeatable)",
+    type=int,
+    multiple=True,
+    default=(10, 100),
+)
+@click.option(
+    "--events", help="Events published per fan-out run", type=int, default=200
+)
+@click.option(
+    "--channels-backend",
+    help="Channels backend to run the app with",
+    type=click.Choice(["memory", "sqlite"]),
+    default="memory",
+)
+@click.option("--users", type=int, default=SeedConfig.users)
+@click.option("--groups", type=int, default=SeedConfig.groups)
+@click.option(
+    "--messages-per-conversation",
+    type=int,
+    default=SeedConfig.messages_per_conversation,
+)
+def run(
+    *,
+    output: Path | None,
+    requests: int,
+    concurrency: int,
+    scenarios: tuple[str, ...],
+    receivers: tuple[int, ...],
+    events: int,
+    channels_backend: str,
+    users: int,
+    groups: int,
+    messages_per_conversation: int,
+):
+    seed_config = SeedConfig(
+        users=users,
+        groups=groups,
+        messages_per_conversation=messages_per_conversation,
+        fanout_receivers=min(max(receivers, default=0), users - 1),
+    )
+    report = BenchReport(
+        meta=BenchMeta(
+            commit=git_commit(),
+            created_at=datetime.now(UTC),
+            python=platform.python_version(),
+            sqlite=sqlite3.sqlite_version,
+            platform=platform.platform(),
+            requests=requests,
+            concurrency=concurrency,
+            seed=seed_config,
+            channels_backend=channels_backend,
+        )
+    )
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as directory:
+        asyncio.run(
+            run_bench(
+                report,
+                Path(directory) / "bench.sqlite3",
+                scenarios,
+                receivers,
+                events,
+            )
+        )
+
+    if output is None:
+        output = ROOT / "bench" / "results" / f"{report.meta.commit or 'local'}.json"
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    _ = output.write_bytes(msgspec.json.format(msgspec.json.encode(report)))
+
+    print_report(report)
+    rich.print(f"Wrote report to [cyan]{output}[/cyan]")
+
+    if not check_budgets(report):
+        raise SystemExit(1)
+
+
+@cli.command(
+    "load",
+    help="Connect thousands of gateway clients and measure message delivery under load.",
+)
+@click.option(
+    "-o",
+    "--output",
+    help="Where to write the JSON report. Defaults to bench/results/load-<commit>.json",
+    type=Path,
+    default=None,
+)
+@click.option(
+    "--clients", help="Gateway clients, one user each", type=int, default=2000
+)
+@click.option(
+    "--conversations",
+    help="Group conversations to spread the clients over",
+    type=int,
+    default=LoadSeedConfig.conversations,
+)
+@click.option("--group-size", help="Members per conversation", type=int, default=20)
+@click.option("--messages", help="Messages to send", type=int, default=500)
+@click.option("--rate", help="Messages sent per second", type=float, default=50)
+@click.option(
+    "--channels-backend",
+    help="Channels backend to run the app with",
+    type=click.Choice(["memory", "sqlite"]),
+    default="memory",
+)
+def load(
+    *,
+    output: Path | None,
+    clients: int,
+    conversations: int,
+    group_size: int,
+    messages: int,
+    rate: float,
+    channels_backend: str,
+):
+    seed_config = LoadSeedConfig(
+        clients=clients, conversations=conversations, group_size=group_size
+    )
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as directory:
+        result = asyncio.run(
+            run_load_test(
+                Path(directory) / "bench.sqlite3",
+                seed_config,
+                channels_backend,
+                messages,
+                rate,
+            )
+        )
+
+    report = LoadReport(
+        meta=LoadMeta(
+            commit=git_commit(),
+            created_at=datetime.now(UTC),
+            python=platform.python_version(),
+            sqlite=sqlite3.sqlite_version,
+            platform=platform.platform(),
+            seed=seed_config,
+            channels_backend=channels_backend,
+        ),
+        result=result,
+    )
+
+    if output is None:
+        output = (
+            ROOT / "bench" / "results" / f"load-{report.meta.commit or 'local'}.json"
+        )
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    _ = output.write_bytes(msgspec.json.format(msgspec.json.encode(report)))
+
+    print_load_report(report)
+    rich.print(f"Wrote report to [cyan]{output}[/cyan]")
+
+
+@cli.command(
+    "fts",
+    help="Compare search index tokenizers on English and Vietnamese messages.",
+)
+@click.option(
+    "-o",
+    "--output",
+    help="Where to write the JSON report. Defaults to bench/results/fts-<commit>.json",
+    type=Path,
+    default=None,
+)
+@click.option("--messages", help="Messages to index", type=int, default=100_000)
+def fts(*, output: Path | None, messages: int):
+    rich.print(f"Running [cyan]fts[/cyan] ({messages} messages)")
+    report = FtsReport(
+        meta=FtsMeta(
+            commit=git_commit(),
+            created_at=datetime.now(UTC),
+            python=platform.python_version(),
+            sqlite=sqlite3.sqlite_version,
+            platform=platform.platform(),
+            messages=messages,
+        ),
+        results=run_fts_bench(messages),
+    )
+
+    if output is None:
+        output = (
+            ROOT / "bench" / "results" / f"fts-{report.meta.commit or 'local'}.json"
+        )
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    _ = output.write_bytes(msgspec.json.format(msgspec.json.encode(report)))
+
+    print_fts_report(report)
+    rich.print(f"Wrote report to [cyan]{output}[/cyan]")
+
+
+@cli.command("compare", help="Compare two JSON reports, e.g. from two commits.")
+@click.argument("baseline", type=Path)
+@click.argument("candidate", type=Path)
+def compare(baseline: Path, candidate: Path):
+    old = msgspec.json.decode(baseline.read_bytes(), type=BenchReport)
+    new = msgspec.json.decode(candidate.read_bytes(), type=BenchReport)
+
+    table = Table(title=f"{old.meta.commit} → {new.meta.commit}")
+
+    for column in ("benchmark", "rps", "p50 ms", "p99 ms"):
+        table.add_column(column, justify="left" if column == "benchmark" else "right")
+
+    for name, result in new.http.items():
+        if (previous := old.http.get(name)) is None:
+            continue
+
+        table.add_row(
+            name,
+            format_change(
+                previous.throughput_rps, result.throughput_rps, higher_is_better=True
+            ),
+            format_change(previous.latency.p50_ms, result.latency.p50_ms),
+            format_change(previous.latency.p99_ms, result.latency.p99_ms),
+        )
+
+    for name, result in new.gateway.items():
+        if (previous := old.gateway.get(name)) is None:
+            continue
+
+        table.add_row(
+            name,
+            format_change(
+                previous.events_per_second,
+                result.events_per_second,
+                higher_is_better=True,
+            ),
+            format_change(
+                previous.completion_latency.p50_ms, result.completion_latency.p50_ms
+            ),
+            format_change(
+                previous.completion_latency.p99_ms, result.completion_latency.p99_ms
+            ),
+        )
+
+    rich.print(table)
+
+
+if __name__ == "__main__":
+    cli()
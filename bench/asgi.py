@@ -0,0 +1,100 @@
+import asyncio
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from litestar import Litestar
+
+
+class ASGIWebSocket:
+    """
+    A minimal in-process WebSocket client, driving the ASGI app directly on the current
+    event loop so that measurements do not include any network or thread hops.
+    """
+
+    def __init__(
+        self,
+        app: "Litestar",
+        path: str,
+        headers: dict[str, str] | None = None,
+        query_string: str = "",
+        on_message: Callable[[float, str | bytes], None] | None = None,
+    ) -> None:
+        self.app: "Litestar" = app
+        self.path: str = path
+        self.headers: dict[str, str] = headers or {}
+        self.query_string: str = query_string
+        self.on_message: Callable[[float, str | bytes], None] | None = on_message
+
+        self.accepted: asyncio.Event = asyncio.Event()
+        self.closed: asyncio.Event = asyncio.Event()
+        self.close_code: int | None = None
+
+        self._inbound: asyncio.Queue[dict[str, Any]] = asyncio.Queue()  # pyright: ignore[reportExplicitAny]
+        self._task: asyncio.Task[None] | None = None
+
+    async def connect(self) -> None:
+        scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "scheme": "ws",
+            "server": ("bench.local", 80),
+            "client": ("127.0.0.1", 0),
+            "root_path": "",
+            "path": self.path,
+            "raw_path": self.path.encode(),
+            "query_string": self.query_string.encode(),
+            "headers": [
+                (key.lower().encode(), value.encode())
+                for key, value in self.headers.items()
+            ],
+            "subprotocols": [],
+            "state": {},
+            "extensions": {},
+        }
+
+        self._inbound.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(scope, self._receive, self._send))  # pyright: ignore[reportArgumentType]
+
+        waiters = [
+            asyncio.create_task(self.accepted.wait()),
+            asyncio.create_task(self.closed.wait()),
+        ]
+        _, pending = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+
+        for waiter in pending:
+            _ = waiter.cancel()
+
+        if not self.accepted.is_set():
+            raise ConnectionError(f"websocket rejected with code {self.close_code}")
+
+    def send_text(self, data: str) -> None:
+        self._inbound.put_nowait({"type": "websocket.receive", "text": data})
+
+    async def close(self) -> None:
+        self._inbound.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=5)
+            except TimeoutError:
+                _ = self._task.cancel()
+
+    async def _receive(self) -> dict[str, Any]:  # pyright: ignore[reportExplicitAny]
+        return await self._inbound.get()
+
+    async def _send(self, message: dict[str, Any]) -> None:  # pyright: ignore[reportExplicitAny]
+        received_at = time.perf_counter()
+        message_type = message["type"]
+
+        if message_type == "websocket.accept":
+            self.accepted.set()
+        elif message_type == "websocket.send":
+            if self.on_message is not None:
+                data: str | bytes = message.get("text") or message.get("bytes") or b""
+                self.on_message(received_at, data)
+        elif message_type == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            self.closed.set()
@@ -0,0 +1,195 @@
+import random
+import sqlite3
+import time
+import unicodedata
+
+import msgspec
+
+from app.domain.chat.search import to_match_query
+
+from .seed import WORDS
+from .stats import LatencySummary, summarize
+
+VIETNAMESE_WORDS = (
+    "tiếng",
+    "việt",
+    "học",
+    "bài",
+    "kiểm",
+    "tra",
+    "ngày",
+    "mai",
+    "nhóm",
+    "thầy",
+    "giáo",
+    "điểm",
+    "thi",
+    "cuối",
+    "kỳ",
+    "cảm",
+    "ơn",
+    "xin",
+    "lỗi",
+    "được",
+    "không",
+    "nhé",
+    "bạn",
+    "hôm",
+    "nay",
+    "tối",
+    "lớp",
+    "đồ",
+    "án",
+    "môn",
+    "chương",
+    "câu",
+    "hỏi",
+    "trả",
+    "lời",
+    "giải",
+    "thích",
+    "ví",
+    "dụ",
+    "nộp",
+    "hạn",
+    "chót",
+    "buổi",
+    "sáng",
+    "chiều",
+    "cuối",
+    "tuần",
+    "cà",
+    "phê",
+    "ăn",
+    "tối",
+    "lịch",
+)
+
+TOKENIZERS: dict[str, str] = {
+    "porter": "porter",
+    "unicode61": "unicode61 remove_diacritics 2",
+    "porter_unicode61": "porter unicode61 remove_diacritics 2",
+    "trigram": "trigram",
+}
+
+
+class FtsResult(msgspec.Struct):
+    tokenizer: str
+    build_seconds: float
+    index_kib: float
+    """Size of the index's own pages, excluding the content table."""
+    latency: dict[str, LatencySummary]
+    """Time to fetch the top 25 results, by query set."""
+    matches: dict[str, int]
+    """Messages matched in total over every query in the set."""
+
+
+def strip_diacritics(text: str) -> str:
+    """Type Vietnamese the way it often is on a keyboard without an input method."""
+    decomposed = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def generate_corpus(messages: int, random_seed: int = 426) -> list[str]:
+    """Messages of a few words each, half of them in English and half in Vietnamese."""
+    rng = random.Random(random_seed)
+
+    return [
+        " ".join(
+            rng.choices(WORDS if i % 2 == 0 else VIETNAMESE_WORDS, k=rng.randint(4, 12))
+        )
+        for i in range(messages)
+    ]
+
+
+def query_sets() -> dict[str, list[str]]:
+    vietnamese = [
+        f"{a} {b}" for a, b in zip(VIETNAMESE_WORDS[::2], VIETNAMESE_WORDS[1::2])
+    ]
+
+    return {
+        "english": WORDS[::3],
+        # stems that only match inflected forms with a stemming tokenizer
+        "english_inflected": [f"{word}s" for word in WORDS[::6]],
+        "vietnamese": vietnamese,
+        "vietnamese_unaccented": [strip_diacritics(query) for query in vietnamese],
+    }
+
+
+def run_fts(
+    corpus: list[str], name: str, tokenizer: str, repeats: int = 5
+) -> FtsResult:
+    conn = sqlite3.connect(":memory:")
+    _ = conn.execute("CREATE TABLE messages (id INTEGER PRIMARY KEY, content TEXT)")
+    _ = conn.executemany(
+        "INSERT INTO messages (content) VALUES (?)", ((c,) for c in corpus)
+    )
+    # table options can't be bound as parameters, but the tokenizers are our own
+    _ = conn.execute(
+        "CREATE VIRTUAL TABLE message_search_index USING fts5("
+        + f"content, content=messages, content_rowid=id, tokenize='{tokenizer}')"
+    )
+
+    start = time.perf_counter()
+    _ = conn.execute(
+        "INSERT INTO message_search_index (rowid, content) "
+        + "SELECT id, content FROM messages"
+    )
+    _ = conn.execute(
+        "INSERT INTO message_search_index (message_search_index) VALUES ('optimize')"
+    )
+    conn.commit()
+    build_seconds = time.perf_counter() - start
+
+    (index_bytes,) = conn.execute(
+        "SELECT SUM(length(block)) FROM message_search_index_data"
+    ).fetchone()
+
+    latency: dict[str, LatencySummary] = {}
+    matches: dict[str, int] = {}
+
+    for query_set, queries in query_sets().items():
+        latencies: list[float] = []
+        matches[query_set] = 0
+
+        for query in queries:
+            match = to_match_query(query)
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM message_search_index "
+                + "WHERE message_search_index MATCH ?",
+                (match,),
+            ).fetchone()
+            matches[query_set] += count
+
+            for _ in range(repeats):
+                start = time.perf_counter()
+                _ = conn.execute(
+                    "SELECT rowid FROM message_search_index "
+                    + "WHERE message_search_index MATCH ? ORDER BY rank LIMIT 25",
+                    (match,),
+                ).fetchall()
+                latencies.append(time.perf_counter() - start)
+
+        latency[query_set] = summarize(latencies)
+
+    conn.close()
+
+    return FtsResult(
+        tokenizer=name,
+        build_seconds=build_seconds,
+        index_kib=index_bytes / 1024,
+        latency=latency,
+        matches=matches,
+    )
+
+
+def run_fts_bench(messages: int) -> list[FtsResult]:
+    """
+    Index the same English and Vietnamese corpus with each tokenizer the message
+    search index could use, and compare index size, build time, query latency, and
+    how many messages each set of queries finds.
+    """
+    corpus = generate_corpus(messages)
+
+    return [run_fts(corpus, name, tokenizer) for name, tokenizer in TOKENIZERS.items()]
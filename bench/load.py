@@ -0,0 +1,210 @@
+import asyncio
+import random
+import time
+import tracemalloc
+
+import httpx
+import msgspec
+from litestar import Litestar
+
+from .asgi import ASGIWebSocket
+from .seed import LoadSeedResult
+from .stats import LatencySummary, summarize
+
+
+class LoadResult(msgspec.Struct):
+    clients: int
+    conversations: int
+    messages: int
+    rate: float
+    send_errors: int
+    connect_seconds: float
+    memory_per_connection_kib: float
+    """Python heap allocated while connecting, divided by the number of clients."""
+    max_rss_mib: float
+    deliveries: int
+    missed_deliveries: int
+    send_latency: LatencySummary
+    """Time for `POST .../messages` to respond."""
+    delivery_latency: LatencySummary
+    """Time from sending a message until each member's socket received it."""
+    event_loop_lag: LatencySummary
+    """How late the event loop woke up a task sleeping for a fixed interval."""
+
+
+class _MessageData(msgspec.Struct):
+    content: str | None = None
+
+
+class _MessageEvent(msgspec.Struct):
+    d: _MessageData
+
+
+_message_decoder = msgspec.json.Decoder(_MessageEvent)
+
+
+def _max_rss_mib() -> float:
+    try:
+        import resource
+    except ImportError:  # windows
+        return 0.0
+
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _monitor_event_loop_lag(samples: list[float], interval: float = 0.05):
+    loop = asyncio.get_running_loop()
+
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+async def _send_heartbeats(sockets: list[ASGIWebSocket], interval: float):
+    heartbeat = msgspec.json.encode({"op": "HEARTBEAT"}).decode()
+
+    while True:
+        # spread over the interval instead of waking every client at once
+        for i, socket in enumerate(sockets):
+            socket.send_text(heartbeat)
+
+            if i % 100 == 99:
+                await asyncio.sleep(interval * 100 / len(sockets))
+
+        await asyncio.sleep(interval * (len(sockets) % 100) / len(sockets))
+
+
+async def run_load(
+    app: Litestar,
+    client: httpx.AsyncClient,
+    seed: LoadSeedResult,
+    tokens_by_user_id: dict[int, str],
+    messages: int,
+    rate: float,
+    connect_batch: int = 200,
+    heartbeat_interval: float = 30.0,
+    timeout: float = 10.0,
+    random_seed: int = 426,
+) -> LoadResult:
+    """
+    Connect a gateway client for every seeded user, then send `messages` messages at
+    `rate` per second through the REST API, each from a random member of a random
+    conversation, and measure how long they take to reach every member's socket.
+
+    The clients run on the same event loop as the app, so the event loop lag includes
+    the clients' own work and the latencies are an upper bound.
+    """
+    rng = random.Random(random_seed)
+    sent_at: dict[str, float] = {}
+    delivery_latencies: list[float] = []
+    expected_deliveries = 0
+
+    def on_message(received_at: float, data: str | bytes) -> None:
+        raw = data if isinstance(data, bytes) else data.encode()
+
+        if b'"t":"MESSAGE_CREATE"' not in raw:
+            return
+
+        content = _message_decoder.decode(raw).d.content
+
+        if content is None or (start := sent_at.get(content)) is None:
+            return
+
+        delivery_latencies.append(received_at - start)
+
+    sockets = [
+        ASGIWebSocket(
+            app,
+            "/api/v1/gateway",
+            headers={"Authorization": f"Bearer {tokens_by_user_id[user_id]}"},
+            on_message=on_message,
+        )
+        for user_id in seed.user_ids
+    ]
+
+    tracemalloc.start()
+    connect_start = time.perf_counter()
+
+    # in batches, like clients reconnecting after a deploy rather than all at once
+    for i in range(0, len(sockets), connect_batch):
+        _ = await asyncio.gather(
+            *(socket.connect() for socket in sockets[i : i + connect_batch])
+        )
+
+    connect_seconds = time.perf_counter() - connect_start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    heartbeats = asyncio.create_task(_send_heartbeats(sockets, heartbeat_interval))
+    lag_samples: list[float] = []
+    lag_monitor = asyncio.create_task(_monitor_event_loop_lag(lag_samples))
+
+    conversation_ids = list(seed.members_by_conversation_id)
+    send_latencies: list[float] = []
+    send_errors = 0
+    pending_sends: set[asyncio.Task[None]] = set()
+
+    async def send(i: int):
+        nonlocal expected_deliveries, send_errors
+
+        conversation_id = rng.choice(conversation_ids)
+        members = seed.members_by_conversation_id[conversation_id]
+        content = f"load message {i}"
+        start = sent_at[content] = time.perf_counter()
+        response = await client.post(
+            f"/api/v1/conversations/{conversation_id}/messages",
+            files={"content": (None, content)},
+            headers={
+                "Authorization": f"Bearer {tokens_by_user_id[rng.choice(members)]}"
+            },
+        )
+        send_latencies.append(time.perf_counter() - start)
+
+        if response.status_code == 201:
+            expected_deliveries += len(members)
+        else:
+            send_errors += 1
+
+    # open loop: messages go out on schedule whether or not earlier ones are done, so
+    # that a slow server shows up as latency instead of a lower send rate
+    send_start = time.perf_counter()
+
+    for i in range(messages):
+        delay = send_start + i / rate - time.perf_counter()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        task = asyncio.create_task(send(i))
+        pending_sends.add(task)
+        task.add_done_callback(pending_sends.discard)
+
+    _ = await asyncio.gather(*pending_sends)
+    deadline = time.perf_counter() + timeout
+
+    while (
+        len(delivery_latencies) < expected_deliveries and time.perf_counter() < deadline
+    ):
+        await asyncio.sleep(0.05)
+
+    _ = heartbeats.cancel()
+    _ = lag_monitor.cancel()
+    _ = await asyncio.gather(*(socket.close() for socket in sockets))
+
+    return LoadResult(
+        clients=len(sockets),
+        conversations=len(conversation_ids),
+        messages=messages,
+        rate=rate,
+        send_errors=send_errors,
+        connect_seconds=connect_seconds,
+        memory_per_connection_kib=allocated / len(sockets) / 1024 if sockets else 0.0,
+        max_rss_mib=_max_rss_mib(),
+        deliveries=len(delivery_latencies),
+        missed_deliveries=max(0, expected_deliveries - len(delivery_latencies)),
+        send_latency=summarize(send_latencies),
+        delivery_latency=summarize(delivery_latencies),
+        event_loop_lag=summarize(lag_samples),
+    )
@@ -0,0 +1,301 @@
+import asyncio
+import itertools
+import time
+import zlib
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import httpx
+import msgspec
+from litestar import Litestar
+from litestar.channels import ChannelsPlugin
+
+from app.domain.gateway.events import Encoding, encode_event
+
+from .asgi import ASGIWebSocket
+from .seed import SeedResult
+from .stats import LatencySummary, ScenarioResult, summarize
+
+Scenario = Callable[[int], Awaitable[bool]]
+
+
+# p99 latencies in milliseconds that `bench run` fails over, at the default concurrency
+LATENCY_BUDGETS_MS: dict[str, float] = {
+    # for a user in hundreds of conversations, e.g. with --groups 400
+    "global_search": 250.0,
+}
+
+
+@dataclass
+class BenchContext:
+    app: Litestar
+    client: httpx.AsyncClient
+    seed: SeedResult
+    token: str
+    tokens_by_user_id: dict[int, str]
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+class FanoutResult(msgspec.Struct):
+    receivers: int
+    events: int
+    timeouts: int
+    events_per_second: float
+    delivery_latency: LatencySummary
+    """Time from `channels.publish` until each individual receiver got the event."""
+    completion_latency: LatencySummary
+    """Time from `channels.publish` until the last receiver got the event."""
+
+
+async def run_scenario(
+    scenario: Scenario, requests: int, concurrency: int
+) -> ScenarioResult:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+
+        # the iterator is shared between workers, so each request index is used once
+        for i in counter:
+            start = time.perf_counter()
+            ok = await scenario(i)
+            latencies.append(time.perf_counter() - start)
+
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    _ = await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - start
+
+    return ScenarioResult(
+        requests=requests,
+        concurrency=concurrency,
+        errors=errors,
+        wall_time_s=wall_time,
+        throughput_rps=requests / wall_time if wall_time else 0.0,
+        latency=summarize(latencies),
+    )
+
+
+def http_scenarios(ctx: BenchContext) -> dict[str, Scenario]:
+    seed = ctx.seed
+    client = ctx.client
+    conversation_ids = itertools.cycle(seed.conversation_ids)
+    search_terms = itertools.cycle(seed.search_terms)
+    quiz_ids = itertools.cycle(seed.quiz_ids)
+    attachment = b"\x00" * 64 * 1024
+
+    async def login(_: int) -> bool:
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"username": seed.primary_username, "password": seed.password},
+        )
+        return response.status_code == 201
+
+    conversation_list_cursor: dict[str, str] = {}
+
+    async def conversation_list(_: int) -> bool:
+        nonlocal conversation_list_cursor
+
+        # pages through the list, starting over once it runs out
+        response = await client.get(
+            "/api/v1/users/me/conversations",
+            params={"limit": 10, **conversation_list_cursor},
+            headers=ctx.headers,
+        )
+
+        if response.status_code != 200:
+            return False
+
+        page: list[dict[str, object]] = response.json()
+        conversation_list_cursor = (
+            {
+                "before": str(page[-1]["last_activity_at"]),
+                "before_id": str(page[-1]["id"]),
+            }
+            if len(page) == 10
+            else {}
+        )
+
+        return True
+
+    async def message_list(_: int) -> bool:
+        response = await client.get(
+            f"/api/v1/conversations/{next(conversation_ids)}/messages",
+            params={"limit": 50},
+            headers=ctx.headers,
+        )
+        return response.status_code == 200
+
+    async def search(_: int) -> bool:
+        response = await client.get(
+            f"/api/v1/conversations/{next(conversation_ids)}/messages/search",
+            params={"content": next(search_terms)},
+            headers=ctx.headers,
+        )
+        return response.status_code == 200
+
+    async def global_search(_: int) -> bool:
+        response = await client.get(
+            "/api/v1/users/me/messages/search",
+            params={"content": next(search_terms)},
+            headers=ctx.headers,
+        )
+        return response.status_code == 200
+
+    async def task_list(_: int) -> bool:
+        response = await client.get("/api/v1/users/me/task-lists", headers=ctx.headers)
+        return response.status_code == 200
+
+    async def quiz_fetch(_: int) -> bool:
+        response = await client.get(
+            f"/api/v1/quizzes/{next(quiz_ids)}", headers=ctx.headers
+        )
+        return response.status_code == 200
+
+    async def message_send(i: int) -> bool:
+        response = await client.post(
+            f"/api/v1/conversations/{next(conversation_ids)}/messages",
+            files={"content": (None, f"benchmark message {i}")},
+            headers=ctx.headers,
+        )
+        return response.status_code == 201
+
+    async def message_send_attachments(i: int) -> bool:
+        response = await client.post(
+            f"/api/v1/conversations/{next(conversation_ids)}/messages",
+            files=[
+                ("content", (None, f"benchmark message {i} with attachments")),
+                ("attachments", ("a.bin", attachment, "application/octet-stream")),
+                ("attachments", ("b.bin", attachment, "application/octet-stream")),
+            ],
+            headers=ctx.headers,
+        )
+        return response.status_code == 201
+
+    # read-only scenarios go first so that the sends do not skew them
+    return {
+        "login": login,
+        "conversation_list": conversation_list,
+        "message_list": message_list,
+        "search": search,
+        "global_search": global_search,
+        "task_list": task_list,
+        "quiz_fetch": quiz_fetch,
+        "message_send": message_send,
+        "message_send_attachments": message_send_attachments,
+    }
+
+
+async def run_gateway_fanout(
+    ctx: BenchContext,
+    receivers: int,
+    events: int,
+    timeout: float = 10.0,
+    compress: bool = False,
+    encoding: Encoding = "json",
+) -> FanoutResult:
+    channels = ctx.app.plugins.get(ChannelsPlugin)
+    user_ids = ctx.seed.fanout_user_ids[:receivers]
+    channel = f"gateway_conversation_{ctx.seed.fanout_conversation_id}"
+
+    arrivals: dict[int, list[float]] = {}
+    arrived: dict[int, asyncio.Event] = {}
+
+    def on_message(received_at: float, data: str | bytes) -> None:
+        if b"BENCH_FANOUT" not in (data if isinstance(data, bytes) else data.encode()):
+            return
+
+        event = (  # pyright: ignore[reportAny]
+            msgspec.msgpack.decode(data)
+            if encoding == "msgpack"
+            else msgspec.json.decode(data)
+        )
+        bench_seq: int = event["d"]["bench_seq"]  # pyright: ignore[reportAny]
+        arrivals.setdefault(bench_seq, []).append(received_at)
+
+        if len(arrivals[bench_seq]) >= len(user_ids):
+            arrived.setdefault(bench_seq, asyncio.Event()).set()
+
+    def on_compressed_message() -> Callable[[float, str | bytes], None]:
+        decompressor = zlib.decompressobj()
+
+        def callback(received_at: float, data: str | bytes) -> None:
+            assert isinstance(data, bytes)
+            on_message(received_at, decompressor.decompress(data))
+
+        return callback
+
+    query_string = "&".join(
+        [f"encoding={encoding}"] + (["compress=zlib-stream"] if compress else [])
+    )
+    sockets = [
+        ASGIWebSocket(
+            ctx.app,
+            "/api/v1/gateway",
+            headers={"Authorization": f"Bearer {ctx.tokens_by_user_id[user_id]}"},
+            query_string=query_string,
+            on_message=on_compressed_message() if compress else on_message,
+        )
+        for user_id in user_ids
+    ]
+    _ = await asyncio.gather(*(socket.connect() for socket in sockets))
+
+    async def publish(bench_seq: int, timeout: float) -> tuple[float, bool]:
+        event = arrived.setdefault(bench_seq, asyncio.Event())
+        start = time.perf_counter()
+        channels.publish(  # pyright: ignore[reportUnknownMemberType]
+            encode_event(
+                "BENCH_FANOUT", {"bench_seq": bench_seq, "content": "x" * 256}
+            ),
+            channel,
+        )
+
+        try:
+            _ = await asyncio.wait_for(event.wait(), timeout)
+        except TimeoutError:
+            return start, False
+
+        return start, True
+
+    # subscriptions are set up asynchronously after the socket is accepted, keep
+    # publishing warm-up events until everyone is listening
+    warmup_seq = -1
+
+    while not (await publish(warmup_seq, 0.1))[1]:
+        warmup_seq -= 1
+
+    delivery_latencies: list[float] = []
+    completion_latencies: list[float] = []
+    timeouts = 0
+    bench_start = time.perf_counter()
+
+    for bench_seq in range(events):
+        start, ok = await publish(bench_seq, timeout)
+
+        if not ok:
+            timeouts += 1
+            continue
+
+        times = arrivals[bench_seq]
+        delivery_latencies.extend(t - start for t in times)
+        completion_latencies.append(max(times) - start)
+
+    bench_time = time.perf_counter() - bench_start
+
+    _ = await asyncio.gather(*(socket.close() for socket in sockets))
+
+    return FanoutResult(
+        receivers=len(user_ids),
+        events=events,
+        timeouts=timeouts,
+        events_per_second=events / bench_time if bench_time else 0.0,
+        delivery_latency=summarize(delivery_latencies),
+        completion_latency=summarize(completion_latencies),
+    )
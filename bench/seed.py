@@ -0,0 +1,336 @@
+import random
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from app.server.plugins.migrator import (
+    Migrator,
+    configure_connection,
+    ensure_migrations_table,
+)
+
+PASSWORD = "benchmark-password"
+
+WORDS = (
+    "lecture",
+    "exam",
+    "quiz",
+    "homework",
+    "deadline",
+    "project",
+    "slides",
+    "notes",
+    "chapter",
+    "review",
+    "algorithm",
+    "database",
+    "network",
+    "mobile",
+    "android",
+    "kotlin",
+    "swift",
+    "python",
+    "backend",
+    "frontend",
+    "design",
+    "pattern",
+    "library",
+    "meeting",
+    "tomorrow",
+    "tonight",
+    "morning",
+    "weekend",
+    "question",
+    "answer",
+    "explain",
+    "example",
+    "midterm",
+    "final",
+    "grade",
+    "teacher",
+    "group",
+    "study",
+    "library",
+    "coffee",
+    "dinner",
+    "schedule",
+    "reminder",
+    "upload",
+    "download",
+    "screenshot",
+    "photo",
+    "thanks",
+    "please",
+    "sorry",
+    "okay",
+    "great",
+    "awesome",
+    "maybe",
+    "later",
+    "today",
+    "yesterday",
+    "week",
+)
+
+
+@dataclass
+class SeedConfig:
+    users: int = 200
+    groups: int = 100
+    group_size: int = 8
+    direct_conversations: int = 50
+    messages_per_conversation: int = 100
+    tasks: int = 50
+    quizzes: int = 10
+    questions_per_quiz: int = 20
+    fanout_receivers: int = 100
+    random_seed: int = 426
+
+
+@dataclass
+class SeedResult:
+    primary_user_id: int
+    primary_username: str
+    password: str
+    conversation_ids: list[int] = field(default_factory=list)
+    quiz_ids: list[int] = field(default_factory=list)
+    task_list_ids: list[int] = field(default_factory=list)
+    fanout_conversation_id: int = 0
+    fanout_user_ids: list[int] = field(default_factory=list)
+    search_terms: list[str] = field(default_factory=list)
+
+
+def apply_migrations(conn: sqlite3.Connection, source: Path):
+    configure_connection(conn)
+    ensure_migrations_table(conn)
+
+    for migration in Migrator(source).resolve_migrations():
+        if migration.migration_type == "down":
+            continue
+
+        _ = conn.executescript(migration.sql)
+        _ = conn.execute(
+            "INSERT INTO _sqlx_migrations(version, description, success, checksum, execution_time) VALUES (?, ?, ?, ?, ?)",
+            (migration.version, migration.description, True, migration.checksum, -1),
+        )
+        conn.commit()
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(3, 16)))
+
+
+def _insert_conversation(
+    conn: sqlite3.Connection,
+    type: str,
+    name: str | None,
+    member_ids: list[int],
+) -> int:
+    cursor = conn.execute(
+        "INSERT INTO conversations (type, name, last_activity_at) VALUES (?, ?, CURRENT_TIMESTAMP) RETURNING id",
+        (type, name),
+    )
+    conversation_id: int = cursor.fetchone()[0]  # pyright: ignore[reportAny]
+
+    _ = conn.executemany(
+        "INSERT INTO conversation_participants (conversation_id, user_id, added_by_user_id, role) VALUES (?, ?, ?, ?)",
+        [
+            (conversation_id, user_id, member_ids[0], "admin" if i == 0 else "user")
+            for i, user_id in enumerate(member_ids)
+        ],
+    )
+
+    if type == "direct":
+        _ = conn.execute(
+            "INSERT INTO direct_conversations (user_low, user_high, conversation_id) VALUES (?, ?, ?)",
+            (min(member_ids), max(member_ids), conversation_id),
+        )
+
+    return conversation_id
+
+
+def seed_database(
+    database_path: Path,
+    migrations_path: Path,
+    hashed_password: str,
+    config: SeedConfig,
+) -> SeedResult:
+    rng = random.Random(config.random_seed)
+    conn = sqlite3.connect(database_path, autocommit=False)
+
+    apply_migrations(conn, migrations_path)
+
+    _ = conn.executemany(
+        "INSERT INTO users (name, email, hashed_password) VALUES (?, ?, ?)",
+        [
+            (f"Bench User {i}", f"user{i}@bench.local", hashed_password)
+            for i in range(1, config.users + 1)
+        ],
+    )
+
+    primary_user_id = 1
+    other_user_ids = list(range(2, config.users + 1))
+    result = SeedResult(
+        primary_user_id=primary_user_id,
+        primary_username="user1@bench.local",
+        password=PASSWORD,
+    )
+
+    for i in range(config.groups):
+        members = [primary_user_id] + rng.sample(
+            other_user_ids, min(config.group_size - 1, len(other_user_ids))
+        )
+        result.conversation_ids.append(
+            _insert_conversation(conn, "group", f"Study group {i}", members)
+        )
+
+    for recipient_id in other_user_ids[: config.direct_conversations]:
+        result.conversation_ids.append(
+            _insert_conversation(conn, "direct", None, [primary_user_id, recipient_id])
+        )
+
+    result.fanout_user_ids = other_user_ids[: config.fanout_receivers]
+    result.fanout_conversation_id = _insert_conversation(
+        conn, "group", "Fan-out", [primary_user_id, *result.fanout_user_ids]
+    )
+
+    now = datetime.now(UTC)
+
+    for conversation_id in result.conversation_ids:
+        members = [
+            row[0]  # pyright: ignore[reportAny]
+            for row in conn.execute(
+                "SELECT user_id FROM conversation_participants WHERE conversation_id = ?",
+                (conversation_id,),
+            )
+        ]
+        rows: list[tuple[int, int, str, str, str]] = []
+
+        for j in range(config.messages_per_conversation):
+            # spread messages over the past minutes so that time-based pagination
+            # has something to page through
+            timestamp = (
+                now - timedelta(minutes=config.messages_per_conversation - j)
+            ).strftime("%Y-%m-%d %H:%M:%S")
+            rows.append(
+                (
+                    conversation_id,
+                    rng.choice(members),  # pyright: ignore[reportAny]
+                    _sentence(rng),
+                    timestamp,
+                    timestamp,
+                )
+            )
+
+        _ = conn.executemany(
+            "INSERT INTO messages (conversation_id, user_id, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    # the app keeps these up to date as it creates messages
+    _ = conn.execute(
+        """
+        UPDATE conversations
+        SET
+            last_message_id = (SELECT MAX(id) FROM messages WHERE conversation_id = conversations.id),
+            last_activity_at = COALESCE(
+                (SELECT MAX(created_at) FROM messages WHERE conversation_id = conversations.id),
+                last_activity_at
+            )
+        """
+    )
+    _ = conn.execute(
+        """
+        UPDATE conversation_participants AS p
+        SET unread_count = (
+            SELECT COUNT(*)
+            FROM messages m
+            WHERE
+                m.conversation_id = p.conversation_id
+                AND m.id > p.last_read_message_id
+                AND m.user_id != p.user_id
+        )
+        """
+    )
+
+    task_list_row = conn.execute(
+        "SELECT id FROM task_lists WHERE user_id = ?", (primary_user_id,)
+    ).fetchone()
+    result.task_list_ids.append(task_list_row[0])  # pyright: ignore[reportAny]
+    _ = conn.executemany(
+        "INSERT INTO tasks (task_list_id, title, notes) VALUES (?, ?, ?)",
+        [
+            (result.task_list_ids[0], _sentence(rng), _sentence(rng))
+            for _ in range(config.tasks)
+        ],
+    )
+
+    for i in range(config.quizzes):
+        cursor = conn.execute(
+            "INSERT INTO quizzes (user_id, title) VALUES (?, ?) RETURNING id",
+            (primary_user_id, f"Quiz {i}"),
+        )
+        quiz_id: int = cursor.fetchone()[0]  # pyright: ignore[reportAny]
+        result.quiz_ids.append(quiz_id)
+        _ = conn.executemany(
+            "INSERT INTO quiz_questions (quiz_id, question, answer, explanation) VALUES (?, ?, ?, ?)",
+            [
+                (quiz_id, _sentence(rng), _sentence(rng), _sentence(rng))
+                for _ in range(config.questions_per_quiz)
+            ],
+        )
+
+    conn.commit()
+    conn.close()
+
+    result.search_terms = rng.sample(WORDS, 10)
+
+    return result
+
+
+@dataclass
+class LoadSeedConfig:
+    clients: int = 2000
+    conversations: int = 200
+    group_size: int = 20
+    random_seed: int = 426
+
+
+@dataclass
+class LoadSeedResult:
+    user_ids: list[int] = field(default_factory=list)
+    members_by_conversation_id: dict[int, list[int]] = field(default_factory=dict)
+
+
+def seed_load_database(
+    database_path: Path,
+    migrations_path: Path,
+    hashed_password: str,
+    config: LoadSeedConfig,
+) -> LoadSeedResult:
+    """Seed one user per simulated client, spread over many group conversations."""
+    rng = random.Random(config.random_seed)
+    conn = sqlite3.connect(database_path, autocommit=False)
+
+    apply_migrations(conn, migrations_path)
+
+    _ = conn.executemany(
+        "INSERT INTO users (name, email, hashed_password) VALUES (?, ?, ?)",
+        [
+            (f"Load User {i}", f"load{i}@bench.local", hashed_password)
+            for i in range(1, config.clients + 1)
+        ],
+    )
+
+    result = LoadSeedResult(user_ids=list(range(1, config.clients + 1)))
+
+    for i in range(config.conversations):
+        members = rng.sample(result.user_ids, min(config.group_size, config.clients))
+        conversation_id = _insert_conversation(conn, "group", f"Load {i}", members)
+        result.members_by_conversation_id[conversation_id] = members
+
+    conn.commit()
+    conn.close()
+
+    return result
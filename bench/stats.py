@@ -0,0 +1,46 @@
+import math
+from collections.abc import Sequence
+
+from msgspec import Struct
+
+
+class LatencySummary(Struct):
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class ScenarioResult(Struct):
+    requests: int
+    concurrency: int
+    errors: int
+    wall_time_s: float
+    throughput_rps: float
+    latency: LatencySummary
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+
+    # nearest-rank, so p100 is the maximum and p50 of two values is the lower one
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: Sequence[float]) -> LatencySummary:
+    """Summarize latencies given in seconds into milliseconds."""
+    values = sorted(x * 1000 for x in latencies)
+
+    return LatencySummary(
+        count=len(values),
+        mean_ms=sum(values) / len(values) if values else 0.0,
+        p50_ms=percentile(values, 50),
+        p90_ms=percentile(values, 90),
+        p99_ms=percentile(values, 99),
+        max_ms=values[-1] if values else 0.0,
+    )
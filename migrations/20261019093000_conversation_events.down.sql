@@ -0,0 +1,4 @@
+-- Add down migration script here
+DROP INDEX conversation_events_created_at_idx;
+DROP TABLE conversation_events;
+ALTER TABLE conversations DROP COLUMN event_seq;
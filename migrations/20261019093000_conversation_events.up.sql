@@ -0,0 +1,15 @@
+-- Add up migration script here
+ALTER TABLE conversations ADD COLUMN event_seq INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE conversation_events (
+    conversation_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (conversation_id, seq),
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX conversation_events_created_at_idx ON conversation_events (created_at);
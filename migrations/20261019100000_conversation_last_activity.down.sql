@@ -0,0 +1,4 @@
+-- Add down migration script here
+DROP INDEX conversations_last_activity_idx;
+ALTER TABLE conversations DROP COLUMN last_activity_at;
+ALTER TABLE conversations DROP COLUMN last_message_id;
@@ -0,0 +1,19 @@
+-- Add up migration script here
+ALTER TABLE conversations ADD COLUMN last_message_id INTEGER REFERENCES messages(id) ON DELETE SET NULL;
+ALTER TABLE conversations ADD COLUMN last_activity_at TIMESTAMP NOT NULL DEFAULT '1970-01-01 00:00:00';
+
+UPDATE conversations
+SET
+    last_message_id = (
+        SELECT id
+        FROM messages
+        WHERE conversation_id = conversations.id AND deleted_at IS NULL
+        ORDER BY created_at DESC, id DESC
+        LIMIT 1
+    ),
+    last_activity_at = COALESCE(
+        (SELECT MAX(created_at) FROM messages WHERE conversation_id = conversations.id),
+        created_at
+    );
+
+CREATE INDEX conversations_last_activity_idx ON conversations (last_activity_at DESC, id DESC);
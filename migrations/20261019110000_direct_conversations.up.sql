@@ -0,0 +1,22 @@
+-- Add up migration script here
+CREATE TABLE direct_conversations (
+    user_low INTEGER NOT NULL,
+    user_high INTEGER NOT NULL,
+    conversation_id INTEGER NOT NULL UNIQUE,
+
+    PRIMARY KEY (user_low, user_high),
+    FOREIGN KEY (user_low) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_high) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
+    CHECK (user_low <= user_high)
+) WITHOUT ROWID;
+
+-- if a pair of users somehow ended up with more than one direct conversation, the
+-- oldest one wins
+INSERT OR IGNORE INTO direct_conversations (user_low, user_high, conversation_id)
+SELECT MIN(p.user_id), MAX(p.user_id), c.id
+FROM conversations c
+JOIN conversation_participants p ON c.id = p.conversation_id
+WHERE c.type = 'direct'
+GROUP BY c.id
+ORDER BY c.id;
@@ -0,0 +1,13 @@
+-- Add up migration script here
+ALTER TABLE conversation_participants ADD COLUMN unread_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE conversation_participants AS p
+SET unread_count = (
+    SELECT COUNT(*)
+    FROM messages m
+    WHERE
+        m.conversation_id = p.conversation_id
+        AND m.created_at > p.read_at
+        AND m.user_id != p.user_id
+        AND m.deleted_at IS NULL
+);
@@ -0,0 +1,40 @@
+-- Add down migration script here
+DROP TRIGGER update_message_in_index2;
+DROP TRIGGER update_message_in_index;
+DROP TRIGGER soft_delete_message_in_index;
+DROP TRIGGER delete_message_in_index;
+DROP TRIGGER create_message_in_index;
+DROP TABLE message_search_index;
+
+CREATE VIRTUAL TABLE message_search_index USING fts5(content, content=messages, content_rowid=id, tokenize=porter);
+
+INSERT INTO message_search_index (rowid, content)
+SELECT id, content FROM messages
+WHERE content IS NOT NULL;
+
+CREATE TRIGGER create_message_in_index
+AFTER INSERT ON messages
+BEGIN
+    INSERT INTO message_search_index (rowid, content) VALUES (NEW.id, NEW.content);
+END;
+
+CREATE TRIGGER delete_message_in_index
+AFTER DELETE ON messages
+BEGIN
+    INSERT INTO message_search_index (message_search_index, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+END;
+
+CREATE TRIGGER update_message_in_index
+AFTER UPDATE OF content ON messages
+WHEN NEW.content IS NOT NULL
+BEGIN
+    INSERT INTO message_search_index (message_search_index, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+    INSERT INTO message_search_index (rowid, content) VALUES (NEW.id, NEW.content);
+END;
+
+CREATE TRIGGER update_message_in_index2
+AFTER UPDATE OF content ON messages
+WHEN NEW.content IS NULL
+BEGIN
+    INSERT INTO message_search_index (message_search_index, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+END;
@@ -0,0 +1,55 @@
+-- Add up migration script here
+DROP TRIGGER update_message_in_index2;
+DROP TRIGGER update_message_in_index;
+DROP TRIGGER delete_message_in_index;
+DROP TRIGGER create_message_in_index;
+DROP TABLE message_search_index;
+
+-- unicode61 with remove_diacritics folds Vietnamese text, so "tieng viet" also finds
+-- "tiếng Việt", while porter still stems English words
+CREATE VIRTUAL TABLE message_search_index USING fts5(
+    content,
+    content=messages,
+    content_rowid=id,
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+
+-- deleted messages are left out of the index instead of being filtered at query time
+INSERT INTO message_search_index (rowid, content)
+SELECT id, content FROM messages
+WHERE content IS NOT NULL AND deleted_at IS NULL;
+
+CREATE TRIGGER create_message_in_index
+AFTER INSERT ON messages
+BEGIN
+    INSERT INTO message_search_index (rowid, content) VALUES (NEW.id, NEW.content);
+END;
+
+CREATE TRIGGER delete_message_in_index
+AFTER DELETE ON messages
+WHEN OLD.deleted_at IS NULL
+BEGIN
+    INSERT INTO message_search_index (message_search_index, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+END;
+
+CREATE TRIGGER soft_delete_message_in_index
+AFTER UPDATE OF deleted_at ON messages
+WHEN OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL
+BEGIN
+    INSERT INTO message_search_index (message_search_index, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+END;
+
+CREATE TRIGGER update_message_in_index
+AFTER UPDATE OF content ON messages
+WHEN NEW.content IS NOT NULL AND OLD.deleted_at IS NULL
+BEGIN
+    INSERT INTO message_search_index (message_search_index, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+    INSERT INTO message_search_index (rowid, content) VALUES (NEW.id, NEW.content);
+END;
+
+CREATE TRIGGER update_message_in_index2
+AFTER UPDATE OF content ON messages
+WHEN NEW.content IS NULL AND OLD.deleted_at IS NULL
+BEGIN
+    INSERT INTO message_search_index (message_search_index, rowid, content) VALUES ('delete', OLD.id, OLD.content);
+END;
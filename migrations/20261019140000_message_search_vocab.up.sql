@@ -0,0 +1,4 @@
+-- Add up migration script here
+-- every occurrence of every term in the search index, with the message it's in, for
+-- autocompleting search terms within a conversation
+CREATE VIRTUAL TABLE message_search_vocab USING fts5vocab(message_search_index, instance);
@@ -0,0 +1,3 @@
+-- Add down migration script here
+DROP INDEX messages_reply_to_idx;
+DROP INDEX messages_deleted_at_idx;
@@ -0,0 +1,5 @@
+-- Add up migration script here
+CREATE INDEX messages_deleted_at_idx ON messages (deleted_at) WHERE deleted_at IS NOT NULL;
+
+-- for finding replies to a message, which deleting it also has to do to unlink them
+CREATE INDEX messages_reply_to_idx ON messages (reply_to_id) WHERE reply_to_id IS NOT NULL;
@@ -0,0 +1,9 @@
+-- Add up migration script here
+-- which monthly archive files old messages were moved to, and the range of message IDs
+-- in each, so that reads only open the archives that can have what they're after
+CREATE TABLE message_archives (
+    period TEXT PRIMARY KEY,
+    first_message_id INTEGER NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
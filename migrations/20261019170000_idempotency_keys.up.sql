@@ -0,0 +1,17 @@
+-- Add up migration script here
+-- responses to requests sent with an Idempotency-Key header, so that a client retrying
+-- one gets the same response instead of the work being done twice
+CREATE TABLE idempotency_keys (
+    user_id INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    content_type TEXT,
+    body BLOB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, method, path, key),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idempotency_keys_created_at_idx ON idempotency_keys (created_at);
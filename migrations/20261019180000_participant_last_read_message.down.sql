@@ -0,0 +1,2 @@
+-- Add down migration script here
+ALTER TABLE conversation_participants DROP COLUMN last_read_message_id;
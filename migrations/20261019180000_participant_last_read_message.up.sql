@@ -0,0 +1,26 @@
+-- Add up migration script here
+-- read markers point at a message rather than at when it was sent, since timestamps only
+-- have second precision and messages sent in the same second as the one that was read
+-- weren't counted as unread
+ALTER TABLE conversation_participants ADD COLUMN last_read_message_id INTEGER NOT NULL DEFAULT 0;
+
+UPDATE conversation_participants AS p
+SET last_read_message_id = COALESCE(
+    (
+        SELECT MAX(m.id)
+        FROM messages m
+        WHERE m.conversation_id = p.conversation_id AND m.created_at <= p.read_at
+    ),
+    0
+);
+
+UPDATE conversation_participants AS p
+SET unread_count = (
+    SELECT COUNT(*)
+    FROM messages m
+    WHERE
+        m.conversation_id = p.conversation_id
+        AND m.id > p.last_read_message_id
+        AND m.user_id != p.user_id
+        AND m.deleted_at IS NULL
+);
@@ -0,0 +1,29 @@
+-- Add up migration script here
+-- the messages each conversation has in each archive, so that listing or looking up a
+-- conversation's messages only opens the archives that can have them
+CREATE TABLE message_archive_conversations (
+    conversation_id INTEGER NOT NULL,
+    period TEXT NOT NULL,
+    first_message_id INTEGER NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    first_created_at TIMESTAMP NOT NULL,
+    last_created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (conversation_id, period),
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
+    FOREIGN KEY (period) REFERENCES message_archives(period) ON DELETE CASCADE
+);
+
+-- the archives made so far only know their range of message IDs, so every conversation
+-- that existed by the end of the month may have anything from that month in them
+INSERT INTO message_archive_conversations (
+    conversation_id, period, first_message_id, last_message_id, first_created_at, last_created_at
+)
+SELECT
+    c.id,
+    a.period,
+    a.first_message_id,
+    a.last_message_id,
+    datetime(a.period || '-01'),
+    datetime(a.period || '-01', '+1 month', '-1 second')
+FROM message_archives a
+JOIN conversations c ON c.created_at < datetime(a.period || '-01', '+1 month');
@@ -0,0 +1,2 @@
+-- Add down migration script here
+ALTER TABLE idempotency_keys DROP COLUMN request_hash;
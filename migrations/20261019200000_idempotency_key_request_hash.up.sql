@@ -0,0 +1,5 @@
+-- Add up migration script here
+-- a hash of the request each response was stored for, so that a key reused for a
+-- different request is rejected instead of answered with the other one's response.
+-- responses stored before have none and are replayed for any request with their key
+ALTER TABLE idempotency_keys ADD COLUMN request_hash BLOB NOT NULL DEFAULT x'';
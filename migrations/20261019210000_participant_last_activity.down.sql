@@ -0,0 +1,5 @@
+-- Add down migration script here
+DROP TRIGGER update_conversation_last_activity_in_participants;
+DROP INDEX conversation_participants_user_last_activity_idx;
+CREATE INDEX conversations_last_activity_idx ON conversations (last_activity_at DESC, id DESC);
+ALTER TABLE conversation_participants DROP COLUMN last_activity_at;
@@ -0,0 +1,21 @@
+-- Add up migration script here
+ALTER TABLE conversation_participants ADD COLUMN last_activity_at TIMESTAMP NOT NULL DEFAULT '1970-01-01 00:00:00';
+
+UPDATE conversation_participants AS p
+SET last_activity_at = (
+    SELECT last_activity_at FROM conversations WHERE id = p.conversation_id
+);
+
+-- a user's conversations are listed by activity, which only the participants can be
+-- indexed by together with the user
+DROP INDEX conversations_last_activity_idx;
+CREATE INDEX conversation_participants_user_last_activity_idx
+ON conversation_participants (user_id, last_activity_at DESC, conversation_id DESC);
+
+CREATE TRIGGER update_conversation_last_activity_in_participants
+AFTER UPDATE OF last_activity_at ON conversations
+BEGIN
+    UPDATE conversation_participants
+    SET last_activity_at = new.last_activity_at
+    WHERE conversation_id = new.id;
+END;
@@ -0,0 +1,71 @@
+import sqlite3
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+from litestar import Litestar
+from litestar.testing import TestClient
+
+from app.server.plugins.migrator import Migrator, configure_connection
+
+ROOT = Path(__file__).parent.parent
+
+User = tuple[int, dict[str, str]]
+"""A registered user's ID and the headers to make requests as them."""
+
+
+@pytest.fixture
+def database_path(tmp_path: Path) -> Path:
+    database_path = tmp_path / "database.sqlite3"
+
+    with sqlite3.connect(database_path) as conn:
+        configure_connection(conn)
+
+        for migration in Migrator(ROOT / "migrations").resolve_migrations():
+            if migration.migration_type == "up":
+                _ = conn.executescript(migration.sql)
+
+    return database_path
+
+
+@pytest.fixture
+def client(
+    database_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[TestClient[Litestar]]:
+    from app.asgi import create_app
+    from app.config import sqlite
+    from app.domain.chat.dependencies import message_archives
+
+    # the pool and the archives read their paths when opening connections, so that
+    # the database in `.env` is never touched
+    monkeypatch.setattr(sqlite, "database_path", database_path)
+    monkeypatch.setattr(message_archives, "directory", tmp_path / "archive")
+
+    with TestClient(create_app()) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(client: TestClient[Litestar]) -> Callable[[str], User]:
+    def make_user(name: str) -> User:
+        response = client.post(
+            "/api/v1/auth/register",
+            json={
+                "email": f"{name}@example.com",
+                "phone_number": None,
+                "password": "password123",
+                "name": name,
+            },
+        )
+        assert response.status_code == 201, response.text
+        user_id: int = response.json()["id"]
+
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"username": f"{name}@example.com", "password": "password123"},
+        )
+        assert response.is_success, response.text
+
+        return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return make_user
@@ -0,0 +1,271 @@
+import sqlite3
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import aiosqlite
+import pytest
+from litestar import Litestar
+from litestar.testing import TestClient
+
+from app.domain.chat.archive import archive_messages
+
+from .conftest import User
+
+
+def _send(
+    client: TestClient[Litestar],
+    user: User,
+    conversation_id: int,
+    content: str,
+    reply_to_id: int | None = None,
+) -> dict[str, Any]:
+    files = {"content": (None, content)}
+
+    if reply_to_id is not None:
+        files["reply_to_id"] = (None, str(reply_to_id))
+
+    response = client.post(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        files=files,
+        headers=user[1],
+    )
+
+    return response.json() | {"status_code": response.status_code}
+
+
+def _conversation(client: TestClient[Litestar], alice: User, bob: User) -> int:
+    response = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    )
+    assert response.status_code == 201, response.text
+
+    return response.json()["id"]
+
+
+def _list(
+    client: TestClient[Litestar], user: User, conversation_id: int, **params: str
+) -> list[int]:
+    response = client.get(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        params=params,
+        headers=user[1],
+    )
+    assert response.status_code == 200, response.text
+
+    return [m["id"] for m in response.json()]
+
+
+def _archive(
+    client: TestClient[Litestar], database_path: Path, sent_at: dict[int, str]
+) -> None:
+    """Backdate the messages to when they were sent, and archive them."""
+    from app.domain.chat.dependencies import message_archives
+
+    with sqlite3.connect(database_path) as conn:
+        _ = conn.executemany(
+            "UPDATE messages SET created_at = ? WHERE id = ?",
+            [(created_at, message_id) for message_id, created_at in sent_at.items()],
+        )
+
+    moved = client.blocking_portal.call(
+        archive_messages, message_archives, datetime.now(UTC)
+    )
+    assert moved == len(sent_at)
+
+
+@pytest.fixture
+def opened_archives(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """The periods of the archives opened to read from them."""
+    from app.domain.chat.dependencies import message_archives
+
+    opened: list[str] = []
+    open_archive = message_archives.open
+
+    def open(period: str) -> AbstractAsyncContextManager[aiosqlite.Connection]:
+        opened.append(period)
+        return open_archive(period)
+
+    monkeypatch.setattr(message_archives, "open", open)
+
+    return opened
+
+
+def test_listing_only_opens_the_archives_that_can_have_the_messages(
+    client: TestClient[Litestar],
+    database_path: Path,
+    make_user: Callable[[str], User],
+    opened_archives: list[str],
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+    other_conversation_id = _conversation(client, alice, bob)
+    january = [_send(client, alice, conversation_id, f"m{i}")["id"] for i in range(3)]
+    february = [_send(client, alice, other_conversation_id, "other")["id"]]
+    last = _send(client, alice, conversation_id, "last")["id"]
+    _ = _send(client, alice, other_conversation_id, "last")
+    _archive(
+        client,
+        database_path,
+        {
+            **{id: f"2025-01-15 10:00:0{i}" for i, id in enumerate(january)},
+            february[0]: "2025-02-15 10:00:00",
+        },
+    )
+
+    assert _list(client, bob, conversation_id) == [last, *january[::-1]]
+    assert opened_archives == ["2025-01"]
+
+    opened_archives.clear()
+
+    # everything in the archive was sent after the cursor
+    assert _list(client, bob, conversation_id, before="2025-01-01T00:00:00Z") == []
+    # or before it
+    assert _list(client, bob, conversation_id, after="2025-02-01T00:00:00Z") == [last]
+    assert opened_archives == []
+
+
+def test_archived_messages_can_be_found_and_acked_but_not_replied_to_or_deleted(
+    client: TestClient[Litestar],
+    database_path: Path,
+    make_user: Callable[[str], User],
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+    archived = _send(client, alice, conversation_id, "archived")["id"]
+    _ = _send(client, alice, conversation_id, "last")
+    _archive(client, database_path, {archived: "2025-01-15 10:00:00"})
+
+    response = client.get(
+        f"/api/v1/conversations/{conversation_id}/messages/search",
+        params={"content": "archived"},
+        headers=bob[1],
+    )
+    assert response.status_code == 200, response.text
+    assert [(m["id"], m["archive_period"]) for m in response.json()["items"]] == [
+        (archived, "2025-01")
+    ]
+
+    response = client.post(
+        f"/api/v1/conversations/{conversation_id}/messages/{archived}/ack",
+        headers=bob[1],
+    )
+    assert response.is_success, response.text
+    assert response.json()["unread_count"] == 1
+
+    reply = _send(client, bob, conversation_id, "reply", reply_to_id=archived)
+    assert reply["status_code"] == 400, reply
+
+    response = client.delete(
+        f"/api/v1/conversations/{conversation_id}/messages/{archived}",
+        headers=alice[1],
+    )
+    assert response.status_code == 400, response.text
+
+    # messages that were never there are still not found
+    response = client.delete(
+        f"/api/v1/conversations/{conversation_id}/messages/{archived + 100}",
+        headers=alice[1],
+    )
+    assert response.status_code == 404, response.text
+
+
+def test_search_pages_from_the_main_database_into_the_archives(
+    client: TestClient[Litestar],
+    database_path: Path,
+    make_user: Callable[[str], User],
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+    january = [
+        _send(client, alice, conversation_id, f"note {i}")["id"] for i in range(2)
+    ]
+    last = _send(client, alice, conversation_id, "last note")["id"]
+    _archive(
+        client,
+        database_path,
+        {id: f"2025-01-15 10:00:0{i}" for i, id in enumerate(january)},
+    )
+
+    received: list[tuple[int, str | None]] = []
+    params: dict[str, str | int] = {"content": "note", "limit": 1}
+
+    while True:
+        response = client.get(
+            f"/api/v1/conversations/{conversation_id}/messages/search",
+            params=params,
+            headers=bob[1],
+        )
+        assert response.status_code == 200, response.text
+        page = response.json()
+        # the total counts the archives' matches from the first page on
+        assert page["total"] == 3
+        received += [(m["id"], m["archive_period"]) for m in page["items"]]
+
+        if page["cursor"] is None:
+            break
+
+        params["cursor"] = page["cursor"]
+
+    assert received == [
+        (last, None),
+        (january[1], "2025-01"),
+        (january[0], "2025-01"),
+    ]
+
+
+def test_search_across_conversations_looks_through_the_archives(
+    client: TestClient[Litestar],
+    database_path: Path,
+    make_user: Callable[[str], User],
+    opened_archives: list[str],
+):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    conversation_id = _conversation(client, alice, bob)
+    other_conversation_id = _conversation(client, alice, bob)
+    archived = [
+        _send(client, alice, conversation_id, "note")["id"],
+        _send(client, alice, other_conversation_id, "note")["id"],
+    ]
+    # bob isn't in this one, and its archive is never opened for him
+    carols_conversation_id = _conversation(client, alice, carol)
+    not_bobs = _send(client, alice, carols_conversation_id, "note")["id"]
+    last = _send(client, alice, conversation_id, "last note")["id"]
+    _ = _send(client, alice, other_conversation_id, "last")
+    _ = _send(client, alice, carols_conversation_id, "last")
+    _archive(
+        client,
+        database_path,
+        {
+            archived[0]: "2025-01-15 10:00:00",
+            archived[1]: "2025-01-15 10:00:01",
+            not_bobs: "2025-02-15 10:00:00",
+        },
+    )
+
+    received: list[tuple[int, str | None]] = []
+    params: dict[str, str | int] = {"content": "note", "limit": 2}
+
+    while True:
+        response = client.get(
+            "/api/v1/users/me/messages/search", params=params, headers=bob[1]
+        )
+        assert response.status_code == 200, response.text
+        page = [(m["id"], m["archive_period"]) for m in response.json()]
+        received += page
+
+        if len(page) < 2:
+            break
+
+        params["before_id"] = page[-1][0]
+
+    assert received == [
+        (last, None),
+        (archived[1], "2025-01"),
+        (archived[0], "2025-01"),
+    ]
+    assert "2025-02" not in opened_archives
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any
+
+from app.domain.gateway.connections import (
+    CLOSE_SEND_QUEUE_OVERFLOW,
+    CLOSE_SEND_TIMEOUT,
+    ConnectionWriters,
+    GatewayConnection,
+)
+
+
+class _Socket:
+    """Stands in for a websocket, optionally one whose client stopped reading."""
+
+    def __init__(self, stalled: bool = False) -> None:
+        self.stalled: bool = stalled
+        self.sent: list[bytes] = []
+
+    async def send_text(self, data: bytes):
+        if self.stalled:
+            await asyncio.Event().wait()
+
+        self.sent.append(data)
+
+    async def close(self, code: int, reason: str):
+        if self.stalled:
+            await asyncio.Event().wait()
+
+
+def _connection(
+    socket: _Socket,
+    writers: ConnectionWriters,
+    max_queue_size: int = 16,
+    send_timeout: float = 60,
+) -> GatewayConnection:
+    return GatewayConnection(
+        socket,  # pyright: ignore[reportArgumentType]
+        writers,
+        max_queue_size,
+        send_timeout,
+    )
+
+
+def test_a_stalled_send_times_out_and_frees_the_writer():
+    async def main() -> dict[str, Any]:
+        writers = ConnectionWriters(1)
+        stalled_socket, socket = _Socket(stalled=True), _Socket()
+        stalled = _connection(stalled_socket, writers, send_timeout=0.05)
+        connection = _connection(socket, writers)
+
+        _ = stalled.send(b"{}")
+        _ = connection.send(b"{}")
+        await asyncio.sleep(0.2)
+
+        # the close frame can't get through either, and isn't waited on for good
+        await asyncio.wait_for(stalled.close(), 1)
+        await writers.close()
+
+        return {"close_code": stalled.close_code, "sent": socket.sent}
+
+    result = asyncio.run(main())
+
+    assert result == {"close_code": CLOSE_SEND_TIMEOUT, "sent": [b"{}"]}
+
+
+def test_an_overflowing_stalled_connection_frees_the_writer_right_away():
+    async def main() -> dict[str, Any]:
+        writers = ConnectionWriters(1)
+        stalled_socket, socket = _Socket(stalled=True), _Socket()
+        stalled = _connection(stalled_socket, writers, max_queue_size=1)
+        connection = _connection(socket, writers)
+
+        for _ in range(3):
+            _ = stalled.send(b"{}")
+
+        _ = connection.send(b"{}")
+        # far less than the send timeout
+        await asyncio.sleep(0.05)
+        await writers.close()
+
+        return {"close_code": stalled.close_code, "sent": socket.sent}
+
+    result = asyncio.run(main())
+
+    assert result == {"close_code": CLOSE_SEND_QUEUE_OVERFLOW, "sent": [b"{}"]}
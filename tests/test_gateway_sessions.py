@@ -0,0 +1,31 @@
+from collections.abc import Callable
+
+import pytest
+from litestar import Litestar
+from litestar.exceptions import WebSocketDisconnect
+from litestar.testing import TestClient
+
+from app.domain.gateway.sessions import GatewaySessions, sessions_gauge
+
+from .conftest import User
+
+
+def test_a_session_that_fails_to_start_is_deleted(
+    client: TestClient[Litestar],
+    make_user: Callable[[str], User],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    alice = make_user("alice")
+    gateway_sessions: GatewaySessions = client.app.state.gateway_sessions
+
+    def online_among(user_ids: set[int]) -> list[object]:
+        raise RuntimeError("presence is broken")
+
+    monkeypatch.setattr(gateway_sessions.presence, "online_among", online_among)
+    sessions = sessions_gauge.get()
+
+    with pytest.raises((WebSocketDisconnect, RuntimeError)):
+        with client.websocket_connect("/api/v1/gateway", headers=alice[1]) as socket:
+            _ = socket.receive_text()
+
+    assert sessions_gauge.get() == sessions
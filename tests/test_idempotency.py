@@ -0,0 +1,127 @@
+from collections.abc import Callable
+from datetime import timedelta
+
+import httpx
+from litestar import Litestar
+from litestar.testing import TestClient
+
+from app.server.idempotency import IdempotencyKeys
+
+from .conftest import User
+
+
+def _send(
+    client: TestClient[Litestar],
+    user: User,
+    conversation_id: int,
+    content: str,
+    idempotency_key: str,
+    boundary: str | None = None,
+) -> httpx.Response:
+    headers = user[1] | {"Idempotency-Key": idempotency_key}
+
+    if boundary is not None:
+        headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+
+    return client.post(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        files={"content": (None, content)},
+        headers=headers,
+    )
+
+
+def _conversation(client: TestClient[Litestar], alice: User, bob: User) -> int:
+    response = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    )
+    assert response.status_code == 201, response.text
+
+    return response.json()["id"]
+
+
+def _message_ids(
+    client: TestClient[Litestar], user: User, conversation_id: int
+) -> list[int]:
+    response = client.get(
+        f"/api/v1/conversations/{conversation_id}/messages", headers=user[1]
+    )
+    assert response.status_code == 200, response.text
+
+    return [m["id"] for m in response.json()]
+
+
+def test_a_retry_gets_the_stored_response(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    first = _send(client, alice, conversation_id, "hello", "key")
+    assert first.status_code == 201, first.text
+    assert "idempotent-replayed" not in first.headers
+
+    retry = _send(client, alice, conversation_id, "hello", "key")
+    assert retry.status_code == 201, retry.text
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+
+    # after a restart, from the database
+    client.app.state.idempotency_keys = IdempotencyKeys(10, timedelta(hours=1))
+
+    retry = _send(client, alice, conversation_id, "hello", "key")
+    assert retry.status_code == 201, retry.text
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+
+    assert _message_ids(client, alice, conversation_id) == [first.json()["id"]]
+
+
+def test_a_key_is_scoped_to_the_user(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    assert _send(client, alice, conversation_id, "hello", "key").status_code == 201
+    assert _send(client, bob, conversation_id, "hello", "key").status_code == 201
+
+    assert len(_message_ids(client, alice, conversation_id)) == 2
+
+
+def test_a_reused_key_with_a_different_body_is_rejected(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    first = _send(client, alice, conversation_id, "hello", "key")
+    assert first.status_code == 201, first.text
+
+    response = _send(client, alice, conversation_id, "goodbye", "key")
+    assert response.status_code == 422, response.text
+
+    client.app.state.idempotency_keys = IdempotencyKeys(10, timedelta(hours=1))
+
+    response = _send(client, alice, conversation_id, "goodbye", "key")
+    assert response.status_code == 422, response.text
+
+    assert _message_ids(client, alice, conversation_id) == [first.json()["id"]]
+
+
+def test_a_retry_may_use_a_different_multipart_boundary(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    first = _send(client, alice, conversation_id, "hello", "key", "first")
+    assert first.status_code == 201, first.text
+
+    retry = _send(client, alice, conversation_id, "hello", "key", "retry")
+    assert retry.status_code == 201, retry.text
+    assert retry.headers["idempotent-replayed"] == "true"
+
+    response = _send(client, alice, conversation_id, "goodbye", "key", "first")
+    assert response.status_code == 422, response.text
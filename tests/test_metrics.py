@@ -0,0 +1,30 @@
+import pytest
+from litestar import Litestar
+from litestar.testing import TestClient
+
+from app.config import settings
+
+
+def test_metrics_are_off_without_a_token(
+    client: TestClient[Litestar], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(settings.app, "METRICS_TOKEN", None)
+
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_need_the_token(
+    client: TestClient[Litestar], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(settings.app, "METRICS_TOKEN", "scraper")
+
+    assert client.get("/metrics").status_code == 401
+    assert (
+        client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code
+        == 401
+    )
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scraper"})
+
+    assert response.status_code == 200, response.text
+    assert "# TYPE" in response.text
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Any
+
+import pytest
+from litestar import Litestar
+
+from app.config import settings
+from app.domain.chat import retention
+from app.domain.chat.models import DeletedMessagesPurge
+
+
+def test_purging_carries_on_after_a_failed_round(monkeypatch: pytest.MonkeyPatch):
+    rounds: list[int] = []
+
+    async def purge_deleted_messages(*_: Any) -> DeletedMessagesPurge:
+        rounds.append(len(rounds))
+
+        if len(rounds) == 1:
+            raise RuntimeError("disk went away")
+
+        return DeletedMessagesPurge(deleted=0, redacted=0, attachment_bytes=0)
+
+    monkeypatch.setattr(settings.app, "DELETED_MESSAGES_PURGE_INTERVAL", 0.01)
+    monkeypatch.setattr(retention, "purge_deleted_messages", purge_deleted_messages)
+
+    async def main():
+        async with retention.deleted_messages_purge_lifespan(Litestar()):
+            await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+
+    assert len(rounds) > 1
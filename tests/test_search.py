@@ -0,0 +1,137 @@
+from collections.abc import Callable
+from typing import Any
+
+from litestar import Litestar
+from litestar.testing import TestClient
+
+from .conftest import User
+
+
+def _send(
+    client: TestClient[Litestar], user: User, conversation_id: int, content: str
+) -> dict[str, Any]:
+    response = client.post(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        files={"content": (None, content)},
+        headers=user[1],
+    )
+    assert response.status_code == 201, response.text
+
+    return response.json()
+
+
+def _search(
+    client: TestClient[Litestar],
+    user: User,
+    conversation_id: int,
+    content: str,
+    cursor: str | None = None,
+    limit: int = 25,
+) -> dict[str, Any]:
+    params: dict[str, str | int] = {"content": content, "limit": limit}
+
+    if cursor is not None:
+        params["cursor"] = cursor
+
+    response = client.get(
+        f"/api/v1/conversations/{conversation_id}/messages/search",
+        params=params,
+        headers=user[1],
+    )
+    assert response.status_code == 200, response.text
+
+    return response.json()
+
+
+def _conversation(client: TestClient[Litestar], alice: User, bob: User) -> int:
+    response = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    )
+    assert response.status_code == 201, response.text
+
+    return response.json()["id"]
+
+
+def test_search_pages_through_the_results(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+    sent = [_send(client, alice, conversation_id, "apple pie")["id"] for _ in range(5)]
+    sent.append(_send(client, alice, conversation_id, "apple apple apple")["id"])
+    _ = _send(client, alice, conversation_id, "banana split")
+
+    received: list[int] = []
+    cursor = None
+
+    while True:
+        page = _search(client, bob, conversation_id, "apple", cursor, limit=2)
+        assert page["total"] == 6
+        received += [m["id"] for m in page["items"]]
+        cursor = page["cursor"]
+
+        if cursor is None:
+            break
+
+        # a match sent in between, which changes every rank, doesn't move the pages
+        _ = _send(client, alice, conversation_id, "apple apple")
+
+    assert received == sent[::-1]
+
+
+def test_search_matches_quotes_and_operators_literally(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+    message = _send(client, alice, conversation_id, 'say "hi" OR NOT')
+
+    page = _search(client, bob, conversation_id, '"hi" OR')
+
+    assert [m["id"] for m in page["items"]] == [message["id"]]
+
+
+def test_search_rejects_a_bad_cursor(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    response = client.get(
+        f"/api/v1/conversations/{conversation_id}/messages/search",
+        params={"content": "apple", "cursor": "not a cursor"},
+        headers=bob[1],
+    )
+
+    assert response.status_code == 400
+
+
+def test_search_across_conversations_pages_by_id(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob, carol = make_user("alice"), make_user("bob"), make_user("carol")
+    conversation_id = _conversation(client, alice, bob)
+    sent = [_send(client, alice, conversation_id, f"note {i}")["id"] for i in range(2)]
+    sent.append(_send(client, bob, conversation_id, "note from bob")["id"])
+    # alice isn't in this one
+    _ = _send(client, bob, _conversation(client, bob, carol), "note for carol")
+
+    received: list[int] = []
+    params: dict[str, str | int] = {"content": "note", "limit": 2}
+
+    while True:
+        response = client.get(
+            "/api/v1/users/me/messages/search", params=params, headers=alice[1]
+        )
+        assert response.status_code == 200, response.text
+        page = [m["id"] for m in response.json()]
+        received += page
+
+        if len(page) < 2:
+            break
+
+        params["before_id"] = page[-1]
+
+    assert received == sent[::-1]
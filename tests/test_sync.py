@@ -0,0 +1,213 @@
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from litestar import Litestar
+from litestar.testing import TestClient
+
+from app.domain.chat.sync import compact_conversation_events
+
+from .conftest import User
+
+
+def _sync(
+    client: TestClient[Litestar],
+    user: User,
+    cursor: str | None = None,
+    limit: int = 500,
+) -> dict[str, Any]:
+    params: dict[str, str | int] = {"limit": limit}
+
+    if cursor is not None:
+        params["cursor"] = cursor
+
+    response = client.get("/api/v1/users/me/sync", params=params, headers=user[1])
+    assert response.status_code == 200, response.text
+
+    return response.json()
+
+
+def _send(
+    client: TestClient[Litestar], user: User, conversation_id: int, content: str
+) -> dict[str, Any]:
+    response = client.post(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        files={"content": (None, content)},
+        headers=user[1],
+    )
+    assert response.status_code == 201, response.text
+
+    return response.json()
+
+
+def test_first_sync_is_a_snapshot(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    ).json()
+    message = _send(client, alice, conversation["id"], "hello")
+
+    sync = _sync(client, bob)
+
+    assert sync["events"] == []
+    assert [c["id"] for c in sync["conversations"]] == [conversation["id"]]
+    assert sync["conversations"][0]["last_message"]["id"] == message["id"]
+    assert sync["has_more"] is False
+
+    # nothing happened since
+    sync = _sync(client, bob, sync["cursor"])
+
+    assert sync["events"] == []
+    assert sync["conversations"] == []
+
+
+def test_sync_returns_events_since_the_cursor(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    ).json()["id"]
+    cursor = _sync(client, bob)["cursor"]
+
+    kept = _send(client, alice, conversation_id, "kept")
+    deleted = _send(client, alice, conversation_id, "deleted")
+    response = client.delete(
+        f"/api/v1/conversations/{conversation_id}/messages/{deleted['id']}",
+        headers=alice[1],
+    )
+    assert response.status_code == 200, response.text
+
+    sync = _sync(client, bob, cursor)
+
+    # the message is loaded when syncing, and the one deleted since is only deleted
+    assert [(e["type"], e["data"]) for e in sync["events"]] == [
+        ("MESSAGE_CREATE", kept),
+        ("MESSAGE_DELETE", {"id": deleted["id"]}),
+    ]
+    assert sync["conversations"] == []
+
+
+def test_sync_pages_through_events(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    ).json()["id"]
+    cursor = _sync(client, bob)["cursor"]
+    sent = [_send(client, alice, conversation_id, f"m{i}")["id"] for i in range(5)]
+
+    received: list[int] = []
+
+    while True:
+        sync = _sync(client, bob, cursor, limit=2)
+        received += [e["data"]["id"] for e in sync["events"]]
+        cursor = sync["cursor"]
+
+        if not sync["has_more"]:
+            break
+
+    assert received == sent
+
+
+def test_sync_pages_past_deleted_messages(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    ).json()["id"]
+    cursor = _sync(client, bob)["cursor"]
+    sent = [_send(client, alice, conversation_id, f"m{i}")["id"] for i in range(3)]
+    response = client.delete(
+        f"/api/v1/conversations/{conversation_id}/messages/{sent[1]}",
+        headers=alice[1],
+    )
+    assert response.status_code == 200, response.text
+
+    # the deleted message's MESSAGE_CREATE is left out but still fills the page
+    sync = _sync(client, bob, cursor, limit=2)
+
+    assert [(e["type"], e["data"]["id"]) for e in sync["events"]] == [
+        ("MESSAGE_CREATE", sent[0])
+    ]
+    assert sync["has_more"] is True
+
+    sync = _sync(client, bob, sync["cursor"], limit=2)
+
+    assert [(e["type"], e["data"]["id"]) for e in sync["events"]] == [
+        ("MESSAGE_CREATE", sent[2]),
+        ("MESSAGE_DELETE", sent[1]),
+    ]
+    assert sync["has_more"] is False
+
+
+def test_sync_falls_back_to_a_snapshot_once_events_are_compacted(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    ).json()["id"]
+    cursor = _sync(client, bob)["cursor"]
+    _ = _send(client, alice, conversation_id, "gone from the log")
+
+    _ = client.blocking_portal.call(
+        compact_conversation_events,
+        client.app.state,
+        datetime.now(UTC) + timedelta(minutes=1),
+    )
+    last = _send(client, alice, conversation_id, "still in the log")
+
+    sync = _sync(client, bob, cursor)
+
+    assert sync["events"] == []
+    assert [c["id"] for c in sync["conversations"]] == [conversation_id]
+    assert sync["conversations"][0]["last_message"]["id"] == last["id"]
+
+    # and picks up from the snapshot
+    assert _sync(client, bob, sync["cursor"])["conversations"] == []
+
+
+def test_sync_reports_conversations_the_user_left(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    ).json()["id"]
+    cursor = _sync(client, bob)["cursor"]
+
+    response = client.delete(
+        f"/api/v1/conversations/{conversation_id}/participants/me", headers=bob[1]
+    )
+    assert response.is_success, response.text
+
+    assert _sync(client, bob, cursor)["removed_conversation_ids"] == [conversation_id]
+
+
+def test_sync_rejects_a_bad_cursor(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice = make_user("alice")
+
+    response = client.get(
+        "/api/v1/users/me/sync", params={"cursor": "not a cursor"}, headers=alice[1]
+    )
+
+    assert response.status_code == 400
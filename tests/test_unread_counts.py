@@ -0,0 +1,118 @@
+from collections.abc import Callable
+from typing import Any
+
+from litestar import Litestar
+from litestar.testing import TestClient
+
+from .conftest import User
+
+
+def _send(
+    client: TestClient[Litestar], user: User, conversation_id: int, content: str
+) -> dict[str, Any]:
+    response = client.post(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        files={"content": (None, content)},
+        headers=user[1],
+    )
+    assert response.status_code == 201, response.text
+
+    return response.json()
+
+
+def _ack(
+    client: TestClient[Litestar], user: User, conversation_id: int, message_id: int
+) -> int:
+    response = client.post(
+        f"/api/v1/conversations/{conversation_id}/messages/{message_id}/ack",
+        headers=user[1],
+    )
+    assert response.is_success, response.text
+
+    return response.json()["unread_count"]
+
+
+def _unread_count(client: TestClient[Litestar], user: User) -> int:
+    response = client.get("/api/v1/users/me/conversations", headers=user[1])
+    assert response.status_code == 200, response.text
+
+    return response.json()[0]["unread_count"]
+
+
+def _conversation(client: TestClient[Litestar], alice: User, bob: User) -> int:
+    response = client.post(
+        "/api/v1/users/me/conversations",
+        json={"type": "group", "recipient_ids": [bob[0]], "name": "g"},
+        headers=alice[1],
+    )
+    assert response.status_code == 201, response.text
+
+    return response.json()["id"]
+
+
+def test_messages_sent_in_the_same_second_as_the_read_one_are_unread(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    # timestamps only have second precision, so these are all sent in the same second
+    # as far as the database is concerned
+    read = _send(client, alice, conversation_id, "read")
+    assert _ack(client, bob, conversation_id, read["id"]) == 0
+
+    for i in range(3):
+        _ = _send(client, alice, conversation_id, f"m{i}")
+
+    assert _unread_count(client, bob) == 3
+
+    last = _send(client, alice, conversation_id, "last")
+    assert _ack(client, bob, conversation_id, last["id"]) == 0
+
+    _ = _send(client, alice, conversation_id, "after")
+
+    assert _unread_count(client, bob) == 1
+
+
+def test_own_messages_are_never_unread(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    _ = _send(client, alice, conversation_id, "hello")
+
+    assert _unread_count(client, alice) == 0
+    assert _unread_count(client, bob) == 1
+
+
+def test_deleting_an_unread_message_uncounts_it(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    kept = _send(client, alice, conversation_id, "kept")
+    deleted = _send(client, alice, conversation_id, "deleted")
+    response = client.delete(
+        f"/api/v1/conversations/{conversation_id}/messages/{deleted['id']}",
+        headers=alice[1],
+    )
+    assert response.status_code == 200, response.text
+
+    assert _unread_count(client, bob) == 1
+    assert _ack(client, bob, conversation_id, kept["id"]) == 0
+
+
+def test_acking_an_older_message_keeps_the_read_marker(
+    client: TestClient[Litestar], make_user: Callable[[str], User]
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation_id = _conversation(client, alice, bob)
+
+    first = _send(client, alice, conversation_id, "first")
+    second = _send(client, alice, conversation_id, "second")
+    assert _ack(client, bob, conversation_id, second["id"]) == 0
+
+    assert _ack(client, bob, conversation_id, first["id"]) == 0
+    assert _unread_count(client, bob) == 0